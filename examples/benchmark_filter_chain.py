@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+"""
+Cost of chaining filters to a query, per filter it should stay flat as
+the number of the filters grows, Q combines in O(1).
+
+usage: python examples/benchmark_filter_chain.py [max filters]
+"""
+
+import sys
+import time
+
+import graphic
+from graphic.query import Q
+from graphic.query.cypher.compiler import compile_with_params
+
+
+def build(filters):
+    query = graphic.node('Geek')._as('g').query
+    for index in range(filters):
+        query.filter(g__age__gte=index)
+    return query
+
+
+def build_right_nested(filters):
+    """The filters combined as Q(f=i) & q, nested on the right"""
+    where = Q()
+    for index in range(filters):
+        where = Q(g__age__gte=index) & where
+    return graphic.node('Geek')._as('g').query.filter(where)
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(max_filters):
+    print('{:>14} {:>8} {:>16} {:>16}'.format(
+        'chain', 'filters', 'build us/filter', 'compile us/filter'
+    ))
+
+    # warm up
+    compile_with_params(build(10))
+    compile_with_params(build_right_nested(10))
+
+    for name, builder in (('left', build),
+                          ('right nested', build_right_nested)):
+        filters = 10
+        while filters <= max_filters:
+            query, build_seconds = measure(builder, filters)
+            _, compile_seconds = measure(compile_with_params, query)
+            print('{:>14} {:>8} {:>16.2f} {:>16.2f}'.format(
+                name,
+                filters,
+                build_seconds * 1e6 / filters,
+                compile_seconds * 1e6 / filters
+            ))
+            filters *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
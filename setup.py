@@ -17,10 +17,8 @@ VERSION = None
 
 # What packages are required for this module to be executed?
 REQUIRED = [
-    'neo4j'
+    'neo4j>=5,<6'
 ]
-if sys.version_info.minor == 4:
-    REQUIRED.append('typing')
 
 
 TEST_REQUIREMENTS = [
@@ -83,7 +81,7 @@ setup(
     long_description=long_description,
     author=AUTHOR,
     author_email=EMAIL,
-    python_requires=">=3.4",
+    python_requires=">=3.7",
     url=URL,
     packages=find_packages('src'),
     package_dir={'': 'src'},
@@ -97,8 +95,6 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: Implementation :: CPython',
         'Programming Language :: Python :: Implementation :: PyPy',
@@ -112,5 +108,6 @@ setup(
     extras_require={
         'dev': ['check-manifest'],
         'test': ['coverage'],
+        'numpy': ['numpy'],
     },
 )
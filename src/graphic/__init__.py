@@ -4,8 +4,9 @@
 # flake8: noqa
 
 from .meta import __version__
-from .graph import Graph
-from .shortcuts import node, link, relationship, use_neo4j
+from .graph import Graph, GraphBuilder
+from .shortcuts import node, link, relationship, use_neo4j, use_neo4j_async
+from .shortcuts import use_memory, use_sqlite
 
 import logging
 
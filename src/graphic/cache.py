@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from itertools import chain
+
+
+__all__ = ['LRUCache', 'CacheInfo', 'ResultCache', 'ResultCacheInfo']
+
+
+CacheInfo = namedtuple(
+    'CacheInfo',
+    ['hits', 'misses', 'evictions', 'maxsize', 'currsize']
+)
+
+
+ResultCacheInfo = namedtuple(
+    'ResultCacheInfo',
+    CacheInfo._fields + ('expirations', 'invalidations')
+)
+
+
+class LRUCache:
+    """
+    Bounded mapping which evicts the least recently used entry when full.
+
+    Thread safe, the hit/miss/eviction counters can be used to size it.
+
+    Args:
+      maxsize: max entries to keep, 0 to disable the cache
+
+    """
+
+    __slots__ = ('_maxsize', '_data', '_lock',
+                 '_hits', '_misses', '_evictions')
+
+    def __init__(self, maxsize=128):
+        if maxsize < 0:
+            raise ValueError('maxsize must be >= 0')
+
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        if self._maxsize == 0:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = value
+
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self._maxsize,
+                len(self._data)
+            )
+
+
+class ResultCache(LRUCache):
+    """
+    LRUCache of which the entries expire after ttl seconds, and are tagged
+    by the labels, relationship types they read, so can be dropped by the
+    writes touch them, see invalidate.
+
+    An entry tagged with ANY is dropped by any invalidation.
+
+    Args:
+      maxsize: max entries to keep, 0 to disable the cache
+      ttl: seconds an entry lives, None for never expire
+      clock: callable return the current time in seconds
+
+    """
+
+    ANY = '*'
+
+    __slots__ = ('_ttl', '_clock', '_tags', '_generation',
+                 '_expirations', '_invalidations')
+
+    def __init__(self, maxsize=128, ttl=None, clock=time.monotonic):
+        super().__init__(maxsize)
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be > 0')
+
+        self._ttl = ttl
+        self._clock = clock
+        self._tags = {}
+        self._generation = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    @property
+    def generation(self):
+        """
+        Changed by each invalidation, take it before read the value to put,
+        see put
+        """
+        return self._generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+
+            value, expires, _ = entry
+            if expires is not None and self._clock() >= expires:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value, tags=(), generation=None):
+        """
+        Args:
+          tags: labels, relationship types or ANY the value depends on
+          generation: the generation when started to read the value, it is
+                      not kept if invalidated since then as it may be stale
+        """
+        if self._maxsize == 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            self._remove(key)
+
+            expires = None
+            if self._ttl is not None:
+                expires = self._clock() + self._ttl
+
+            tags = frozenset(tags)
+            self._data[key] = (value, expires, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._data) > self._maxsize:
+                self._remove(next(iter(self._data)))
+                self._evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._remove(key)
+
+        if entry is None:
+            return default
+        return entry[0]
+
+    def invalidate(self, tags):
+        """
+        Drop the entries tagged with any of the tags or ANY
+
+        Returns:
+          count of the entries dropped
+        """
+        with self._lock:
+            self._generation += 1
+
+            keys = set()
+            for tag in chain(tags, (self.ANY, )):
+                keys |= self._tags.pop(tag, set())
+
+            for key in keys:
+                self._remove(key)
+
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+            self._tags.clear()
+            self._hits = self._misses = self._evictions = 0
+            self._expirations = self._invalidations = 0
+
+    def info(self) -> ResultCacheInfo:
+        with self._lock:
+            return ResultCacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self._maxsize,
+                len(self._data),
+                self._expirations,
+                self._invalidations
+            )
+
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if len(keys) == 0:
+                del self._tags[tag]
+
+        return entry
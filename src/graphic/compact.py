@@ -0,0 +1,613 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Set
+from itertools import chain
+
+from .graph import Node, Relationship, SubGraph
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+__all__ = ['CompactGraph', 'CompactGraphBuilder']
+
+
+class CompactGraph:
+    """
+    Read only graph kept in integer arrays, for the large subgraphs of
+    which the Node, Relationship objects cost too much memory.
+
+    The nodes and the relationships are ordered by id. The endpoints of
+    the relationships are the indexes of the nodes, and the relationships
+    of each node are indexed by offsets, CSR for the outgoing ones and CSC
+    for the incoming ones, so are the relationships of each type. The
+    properties are kept in columns per label set of the nodes and per type
+    of the relationships, array if all the values are integers or floats,
+    list otherwise.
+
+    Node, Relationship are built only when accessed, the same id built
+    twice are two equal objects. The relationships are all with direction.
+
+    Supports the same set operations as SubGraph: |, &, -, ^
+    """
+
+    __slots__ = ('_node_ids', '_node_blocks', '_node_block_codes',
+                 '_node_rows', '_rel_ids', '_rel_blocks', '_rel_block_codes',
+                 '_rel_rows', '_starts', '_ends', '_out_offsets',
+                 '_out_edges', '_in_offsets', '_in_edges', '_type_offsets',
+                 '_type_edges')
+
+    def __init__(self, nodes=None, relationships=None):
+        """
+        Args:
+          nodes: graphic Node with id
+          relationships: graphic Relationship with id, the endpoints are
+                         added to the nodes
+
+        Raises:
+          ValueError: entity without id
+        """
+        builder = CompactGraphBuilder()
+        for node in chain(nodes or [], *(
+            rel.nodes for rel in relationships or []
+        )):
+            builder.add_node(_id_of(node), node.labels, node._kv_paires)
+        for rel in relationships or []:
+            builder.add_relationship(
+                _id_of(rel),
+                rel.type,
+                rel.node_from.id,
+                rel.node_to.id,
+                rel._kv_paires
+            )
+
+        builder._fill(self)
+
+    @classmethod
+    def from_subgraph(cls, subgraph):
+        return cls(subgraph.nodes, subgraph.relationships)
+
+    def to_subgraph(self) -> SubGraph:
+        """Build all the nodes, relationships, which share the nodes"""
+        nodes = [self._node(index) for index in range(len(self._node_ids))]
+        relationships = [
+            self._relationship(index, nodes)
+            for index in range(len(self._rel_ids))
+        ]
+        return SubGraph(nodes=nodes, relationships=relationships)
+
+    @property
+    def nodes(self):
+        """Set like view of the nodes, built when iterated"""
+        return _NodesView(self)
+
+    @property
+    def relationships(self):
+        """Set like view of the relationships, built when iterated"""
+        return _RelationshipsView(self)
+
+    def node(self, id) -> Node:
+        """
+        Raises:
+          KeyError: no node with the id
+        """
+        return self._node(self._node_index(id))
+
+    def relationship(self, id) -> Relationship:
+        """
+        Raises:
+          KeyError: no relationship with the id
+        """
+        return self._relationship(_index(self._rel_ids, id))
+
+    def is_empty(self):
+        return len(self._node_ids) == 0
+
+    def __iter__(self):
+        return chain(self.nodes, self.relationships)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactGraph):
+            return self._node_ids == other._node_ids and \
+                self._rel_ids == other._rel_ids
+
+        try:
+            return all([
+                self.nodes == other.nodes,
+                self.relationships == other.relationships
+            ])
+        except (AttributeError, TypeError):
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # the same as SubGraph of the same entities
+        value = 0
+        for id in self._node_ids:
+            value ^= id
+        for id in self._rel_ids:
+            value ^= hash(('relationship', id))
+        return value
+
+    def __or__(self, other):
+        other = _compact(other)
+        return self._select(
+            other,
+            set(self._node_ids) | set(other._node_ids),
+            set(self._rel_ids) | set(other._rel_ids)
+        )
+
+    def __and__(self, other):
+        other = _compact(other)
+        return self._select(
+            other,
+            set(self._node_ids) & set(other._node_ids),
+            set(self._rel_ids) & set(other._rel_ids)
+        )
+
+    def __sub__(self, other):
+        other = _compact(other)
+        return self._select(
+            other,
+            set(self._node_ids) - set(other._node_ids),
+            set(self._rel_ids) - set(other._rel_ids)
+        )
+
+    def __xor__(self, other):
+        other = _compact(other)
+        return self._select(
+            other,
+            set(self._node_ids) ^ set(other._node_ids),
+            set(self._rel_ids) ^ set(other._rel_ids)
+        )
+
+    def neighbors(self, node, direction=SubGraph.BOTH) -> frozenset:
+        """See also SubGraph.neighbors"""
+        index = self._find_node(node)
+        if index is None:
+            return frozenset()
+
+        ends = set()
+        for rel, other in self._edges(index, direction):
+            ends.add(other)
+        return frozenset(self._node(other) for other in ends)
+
+    def degree(self, node, direction=SubGraph.BOTH) -> int:
+        """See also SubGraph.degree, in O(1) by the offsets"""
+        index = self._find_node(node)
+        if index is None:
+            return 0
+
+        degree = 0
+        for offsets, _ in self._adjacency(direction):
+            degree += offsets[index + 1] - offsets[index]
+        return degree
+
+    def edges_between(self, node_a, node_b,
+                      direction=SubGraph.BOTH) -> frozenset:
+        """See also SubGraph.edges_between"""
+        a, b = self._find_node(node_a), self._find_node(node_b)
+        if a is None or b is None:
+            return frozenset()
+
+        return frozenset(
+            self._relationship(rel)
+            for rel, other in self._edges(a, direction) if other == b
+        )
+
+    def relationships_of_type(self, type) -> frozenset:
+        for code, block in enumerate(self._rel_blocks):
+            if block.key == type:
+                offsets = self._type_offsets
+                return frozenset(
+                    self._relationship(index) for index in
+                    self._type_edges[offsets[code]:offsets[code + 1]]
+                )
+        return frozenset()
+
+    def node_columns(self, *labels) -> OrderedDict:
+        """
+        Property columns of the nodes with the label set
+
+        Returns:
+          OrderedDict, 'id' -> ids of the nodes, then property name -> the
+          values of the nodes, None for the missing ones. Empty if no node
+          with the labels.
+        """
+        return _block_columns(self._node_blocks, frozenset(labels))
+
+    def relationship_columns(self, type) -> OrderedDict:
+        """Property columns of the relationships of the type"""
+        return _block_columns(self._rel_blocks, type)
+
+    def csr(self, direction=SubGraph.OUT) -> tuple:
+        """
+        The offsets and the relationship indexes by node, the
+        relationships of the ith node are edges[offsets[i]:offsets[i + 1]]
+
+        Args:
+          direction: SubGraph.OUT(CSR) or SubGraph.IN(CSC)
+
+        Returns:
+          (offsets, edges), numpy arrays if numpy installed, without copy
+        """
+        if direction == SubGraph.OUT:
+            offsets, edges = self._out_offsets, self._out_edges
+        elif direction == SubGraph.IN:
+            offsets, edges = self._in_offsets, self._in_edges
+        else:
+            raise ValueError('unknown direction {!r}'.format(direction))
+
+        if np is None:
+            return offsets, edges
+        return (np.frombuffer(offsets, dtype='int64'),
+                np.frombuffer(edges, dtype='int64'))
+
+    def _node_index(self, id):
+        return _index(self._node_ids, id)
+
+    def _find_node(self, node):
+        id = node.id if isinstance(node, Node) else node
+        try:
+            return self._node_index(id)
+        except KeyError:
+            return None
+
+    def _adjacency(self, direction):
+        if direction == SubGraph.OUT:
+            return [(self._out_offsets, self._out_edges)]
+        if direction == SubGraph.IN:
+            return [(self._in_offsets, self._in_edges)]
+        if direction == SubGraph.BOTH:
+            return [(self._out_offsets, self._out_edges),
+                    (self._in_offsets, self._in_edges)]
+        raise ValueError('unknown direction {!r}'.format(direction))
+
+    def _edges(self, index, direction):
+        """Iterate (relationship index, the other node index)"""
+        for offsets, edges in self._adjacency(direction):
+            ends = self._ends if edges is self._out_edges else self._starts
+            for position in range(offsets[index], offsets[index + 1]):
+                rel = edges[position]
+                yield rel, ends[rel]
+
+    def _node(self, index) -> Node:
+        block = self._node_blocks[self._node_block_codes[index]]
+        return Node.stored(
+            block.key,
+            self._node_ids[index],
+            block.properties(self._node_rows[index])
+        )
+
+    def _relationship(self, index, nodes=None) -> Relationship:
+        block = self._rel_blocks[self._rel_block_codes[index]]
+        start, end = self._starts[index], self._ends[index]
+        if nodes is None:
+            node_from, node_to = self._node(start), self._node(end)
+        else:
+            node_from, node_to = nodes[start], nodes[end]
+
+        return Relationship.stored(
+            node_from,
+            node_to,
+            block.key,
+            self._rel_ids[index],
+            block.properties(self._rel_rows[index])
+        )
+
+    def _select(self, other, node_ids, rel_ids):
+        """New graph of the entities with the ids, from self or other"""
+        builder = CompactGraphBuilder()
+
+        for id in sorted(rel_ids):
+            graph = self if _contains(self._rel_ids, id) else other
+            index = _index(graph._rel_ids, id)
+            for end in (graph._starts[index], graph._ends[index]):
+                node_ids.add(graph._node_ids[end])
+            graph._copy_relationship(builder, index)
+
+        for id in sorted(node_ids):
+            graph = self if _contains(self._node_ids, id) else other
+            graph._copy_node(builder, graph._node_index(id))
+
+        return builder.build()
+
+    def _copy_node(self, builder, index):
+        block = self._node_blocks[self._node_block_codes[index]]
+        builder.add_node(
+            self._node_ids[index],
+            block.key,
+            block.properties(self._node_rows[index])
+        )
+
+    def _copy_relationship(self, builder, index):
+        block = self._rel_blocks[self._rel_block_codes[index]]
+        builder.add_relationship(
+            self._rel_ids[index],
+            block.key,
+            self._node_ids[self._starts[index]],
+            self._node_ids[self._ends[index]],
+            block.properties(self._rel_rows[index])
+        )
+
+
+class CompactGraphBuilder:
+    """
+    Collect the nodes, relationships by their ids, labels and properties,
+    without building Node, Relationship objects, then build CompactGraph.
+
+    The entity added twice is kept as the first one.
+    """
+
+    __slots__ = ('_node_ids', '_node_blocks', '_node_block_codes',
+                 '_node_rows', '_rel_ids', '_rel_blocks', '_rel_block_codes',
+                 '_rel_rows', '_starts', '_ends', '_seen_nodes',
+                 '_seen_relationships')
+
+    def __init__(self):
+        self._node_ids = array('q')
+        self._node_blocks = OrderedDict()
+        self._node_block_codes = array('l')
+        self._node_rows = array('q')
+        self._rel_ids = array('q')
+        self._rel_blocks = OrderedDict()
+        self._rel_block_codes = array('l')
+        self._rel_rows = array('q')
+        self._starts = array('q')
+        self._ends = array('q')
+        self._seen_nodes = set()
+        self._seen_relationships = set()
+
+    def add_node(self, id, labels, properties):
+        if id in self._seen_nodes:
+            return self
+        self._seen_nodes.add(id)
+
+        code, block = _block(self._node_blocks, frozenset(labels))
+        self._node_ids.append(id)
+        self._node_block_codes.append(code)
+        self._node_rows.append(block.append(id, properties))
+        return self
+
+    def add_relationship(self, id, type, start_id, end_id, properties):
+        """The endpoints should be added as node as well before build"""
+        if id in self._seen_relationships:
+            return self
+        self._seen_relationships.add(id)
+
+        code, block = _block(self._rel_blocks, type)
+        self._rel_ids.append(id)
+        self._rel_block_codes.append(code)
+        self._rel_rows.append(block.append(id, properties))
+        self._starts.append(start_id)
+        self._ends.append(end_id)
+        return self
+
+    def build(self) -> CompactGraph:
+        """
+        Raises:
+          KeyError: endpoint of relationship is not added as node
+        """
+        graph = CompactGraph.__new__(CompactGraph)
+        self._fill(graph)
+        return graph
+
+    def _fill(self, graph):
+        node_order = sorted(range(len(self._node_ids)),
+                            key=self._node_ids.__getitem__)
+        graph._node_ids = _reorder(self._node_ids, node_order)
+        graph._node_block_codes = _reorder(self._node_block_codes, node_order)
+        graph._node_rows = _reorder(self._node_rows, node_order)
+        graph._node_blocks = _freeze(self._node_blocks)
+
+        rel_order = sorted(range(len(self._rel_ids)),
+                           key=self._rel_ids.__getitem__)
+        graph._rel_ids = _reorder(self._rel_ids, rel_order)
+        graph._rel_block_codes = _reorder(self._rel_block_codes, rel_order)
+        graph._rel_rows = _reorder(self._rel_rows, rel_order)
+        graph._rel_blocks = _freeze(self._rel_blocks)
+
+        node_ids = graph._node_ids
+        graph._starts = array('q', (
+            _index(node_ids, self._starts[i]) for i in rel_order
+        ))
+        graph._ends = array('q', (
+            _index(node_ids, self._ends[i]) for i in rel_order
+        ))
+
+        graph._out_offsets, graph._out_edges = _offsets(
+            len(node_ids), graph._starts
+        )
+        graph._in_offsets, graph._in_edges = _offsets(
+            len(node_ids), graph._ends
+        )
+        # the relationships grouped by the block of their type
+        graph._type_offsets, graph._type_edges = _offsets(
+            len(graph._rel_blocks), graph._rel_block_codes
+        )
+
+
+class _Block:
+    """Property columns of the entities with the same labels or type"""
+
+    __slots__ = ('key', 'ids', 'columns')
+
+    def __init__(self, key):
+        self.key = key
+        self.ids = array('q')
+        self.columns = OrderedDict()
+
+    def append(self, id, properties) -> int:
+        row = len(self.ids)
+        self.ids.append(id)
+
+        columns = self.columns
+        for name, value in properties.items():
+            if value is None:
+                continue
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * row
+            column.append(value)
+
+        for column in columns.values():
+            if len(column) == row:
+                column.append(None)
+        return row
+
+    def properties(self, row) -> dict:
+        properties = {}
+        for name, column in self.columns.items():
+            value = column[row]
+            if value is not None:
+                properties[name] = value
+        return properties
+
+    def freeze(self):
+        for name, column in self.columns.items():
+            self.columns[name] = _compact_column(column)
+        return self
+
+
+class _NodesView(Set):
+
+    __slots__ = ('_graph', )
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __len__(self):
+        return len(self._graph._node_ids)
+
+    def __iter__(self):
+        graph = self._graph
+        return (graph._node(index) for index in range(len(self)))
+
+    def __contains__(self, node):
+        return isinstance(node, Node) and node.id is not None and \
+            _contains(self._graph._node_ids, node.id)
+
+    def __hash__(self):
+        return self._hash()
+
+
+class _RelationshipsView(Set):
+
+    __slots__ = ('_graph', )
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __len__(self):
+        return len(self._graph._rel_ids)
+
+    def __iter__(self):
+        graph = self._graph
+        return (graph._relationship(index) for index in range(len(self)))
+
+    def __contains__(self, rel):
+        return isinstance(rel, Relationship) and rel.id is not None and \
+            _contains(self._graph._rel_ids, rel.id)
+
+    def __hash__(self):
+        return self._hash()
+
+
+def _id_of(entity):
+    if entity.id is None:
+        raise ValueError('{} without id can not be compacted'.format(entity))
+    return entity.id
+
+
+def _compact(graph):
+    if isinstance(graph, CompactGraph):
+        return graph
+    return CompactGraph.from_subgraph(graph)
+
+
+def _index(ids, id):
+    """Index of the id in the sorted ids"""
+    index = bisect_left(ids, id)
+    if index == len(ids) or ids[index] != id:
+        raise KeyError(id)
+    return index
+
+
+def _contains(ids, id):
+    index = bisect_left(ids, id)
+    return index < len(ids) and ids[index] == id
+
+
+def _block(blocks, key):
+    """
+    Returns:
+      (code, block), the code is the position of the block in the frozen
+      list, see _freeze
+    """
+    try:
+        return blocks[key]
+    except KeyError:
+        pass
+
+    blocks[key] = (len(blocks), _Block(key))
+    return blocks[key]
+
+
+def _freeze(blocks):
+    return [block.freeze() for _, block in blocks.values()]
+
+
+def _reorder(values, order):
+    return array(values.typecode, (values[i] for i in order))
+
+
+def _offsets(size, ends):
+    """
+    Returns:
+      (offsets, edges) of the relationships grouped by their ends
+    """
+    offsets = array('q', bytes(8 * (size + 1)))
+    for end in ends:
+        offsets[end + 1] += 1
+    for index in range(size):
+        offsets[index + 1] += offsets[index]
+
+    edges = array('q', bytes(8 * len(ends)))
+    positions = array('q', offsets[:-1])
+    for rel, end in enumerate(ends):
+        edges[positions[end]] = rel
+        positions[end] += 1
+    return offsets, edges
+
+
+def _compact_column(column):
+    if len(column) == 0:
+        return column
+
+    if all(type(value) is int for value in column):
+        try:
+            return array('q', column)
+        except OverflowError:
+            return column
+
+    if all(type(value) is float for value in column):
+        return array('d', column)
+
+    return column
+
+
+def _block_columns(blocks, key):
+    for block in blocks:
+        if block.key == key:
+            columns = OrderedDict([('id', block.ids)])
+            columns.update(block.columns)
+            return columns
+    return OrderedDict()
@@ -1,16 +1,24 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
-# TODO(chuter):
-#   1. Unify the defination of Graph, Node, Relationship and Path used
-#      both in query description and fetch result.
-#   2. Implement hydrator for neo4j bolt
+import weakref
+from collections import namedtuple
 
+from graphic.graph import GraphEntity
 
-from graphic import Graph
+from .columns import to_columns
+from .hydrator import Hydrator, Record, compact_graph
 
 
-__all__ = ['Result']
+__all__ = ['Result', 'PushResult', 'BatchReport', 'RecordStream',
+           'FailedProxy', 'RowsProxy', 'NodeIds']
+
+
+# kind: 'node' or 'relationship'
+# key: labels tuple of the nodes or type of the relationships
+# count: entities written by the batch
+# seconds: wall time of the batch, include the commit if it has its own
+BatchReport = namedtuple('BatchReport', ['kind', 'key', 'count', 'seconds'])
 
 
 class Result:
@@ -18,24 +26,225 @@ class Result:
     Unify the interface for interact with the specific driver result.
 
     Current only for neo4j, It proxy to the neo4j-driver native object
-    for the actual data.
+    for the actual data, which is hydrated to graphic Node, Relationship
+    when accessed. The graph and the records share the same entities.
 
     """
 
-    __slots__ = ('_proxyto', )
+    __slots__ = ('_proxyto', '_hydrator')
 
     def __init__(self, proxyto):
         self._proxyto = proxyto
+        self._hydrator = Hydrator()
 
     @property
     def graph(self):
-        _native_graph = self._proxyto.graph()
+        return self._hydrator.graph(self._proxyto.graph())
 
-        return Graph(
-            nodes=iter(_native_graph.nodes),
-            relationships=iter(_native_graph.relationships)
-        )
+    @property
+    def records(self):
+        return (Record(record, self._hydrator)
+                for record in self._proxyto.records())
+
+    def compact_graph(self):
+        """
+        The graph as graphic.compact.CompactGraph, for the large ones, the
+        nodes, relationships are built only when accessed
+        """
+        return compact_graph(self._proxyto.graph())
 
     @property
+    def error(self):
+        """The exception if the query failed, see also FailedProxy"""
+        return getattr(self._proxyto, 'error', None)
+
+    def to_columns(self, columns=None, dtypes=None, strings='object',
+                   size_hint=None):
+        """
+        Export the records to numpy arrays per column, need numpy installed,
+        see graphic.engine.columns.to_columns for the arguments
+
+        Returns:
+          OrderedDict of column name to numpy array
+        """
+        return to_columns(
+            self._proxyto.records(),
+            self._hydrator,
+            columns=columns,
+            dtypes=dtypes,
+            strings=strings,
+            size_hint=size_hint
+        )
+
+
+class FailedProxy:
+    """Proxy for the result of a failed query, access to the data raise"""
+
+    __slots__ = ('error', )
+
+    def __init__(self, error):
+        self.error = error
+
+    def graph(self):
+        raise self.error
+
     def records(self):
-        return self._proxyto.records()
+        raise self.error
+
+
+class RowsProxy:
+    """
+    Proxy for the rows evaluated by the local engines, ie: memory, sqlite,
+    their values are graphic entities already
+    """
+
+    __slots__ = ('_rows', )
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def records(self):
+        return iter(self._rows)
+
+    def graph(self):
+        return _CollectedGraph(self._rows)
+
+
+class _CollectedGraph:
+
+    __slots__ = ('nodes', 'relationships')
+
+    def __init__(self, rows):
+        nodes = []
+        relationships = []
+
+        def collect(value):
+            if isinstance(value, (list, tuple)):
+                for item in value:
+                    collect(item)
+            elif isinstance(value, GraphEntity):
+                if value.is_edge():
+                    relationships.append(value)
+                    nodes.extend(value.nodes)
+                elif value.is_node():
+                    nodes.append(value)
+
+        for row in rows:
+            for value in row.values():
+                collect(value)
+
+        self.nodes = nodes
+        self.relationships = relationships
+
+
+class PushResult(Result):
+    """Result of push, with the report of each batch written"""
+
+    __slots__ = ('_batches', )
+
+    def __init__(self, proxyto, batches=()):
+        super().__init__(proxyto)
+        self._batches = tuple(batches)
+
+    @property
+    def batches(self):
+        return self._batches
+
+    @property
+    def count(self):
+        return sum(batch.count for batch in self._batches)
+
+
+class RecordStream:
+    """
+    Iterator over the records as they arrive from the server.
+
+    It holds the underlying resource(ie: session) until all the records
+    consumed or it is closed, use it as context manager to make sure it
+    is released:
+
+    with graph.fetch(query, stream=True) as records:
+        for record in records:
+            ...
+
+    """
+
+    __slots__ = ('_records', '_on_close', '_closed')
+
+    def __init__(self, records, on_close=None):
+        self._records = iter(records)
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+
+        try:
+            return next(self._records)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        if self._closed:
+            return
+
+        self._closed = True
+        self._records = iter(())
+        if self._on_close is not None:
+            self._on_close()
+
+
+class NodeIds:
+    """
+    The ids of the written nodes, keyed by the node object, not its hash:
+    the nodes without id are equal by alias and labels only.
+
+    An entry is dropped when its node is garbage collected, since nothing
+    can refer to it any more, so push_stream only keeps the nodes the
+    caller or the pending relationships still hold.
+    """
+
+    __slots__ = ('_ids', )
+
+    def __init__(self):
+        # id(node) -> (weak reference to the node, id)
+        self._ids = {}
+
+    def __contains__(self, node):
+        return id(node) in self._ids
+
+    def __getitem__(self, node):
+        return self._ids[id(node)][1]
+
+    def __setitem__(self, node, value):
+        ids = self._ids
+        key = id(node)
+
+        def drop(ref):
+            # the address may be reused by a node added after
+            if key in ids and ids[key][0] is ref:
+                del ids[key]
+
+        ids[key] = (weakref.ref(node, drop), value)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def update(self, pairs):
+        for node, value in pairs:
+            self[node] = value
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+__all__ = ['to_columns']
+
+
+_SCALAR_TYPES = (bool, int, float, str)
+
+# the numpy dtype of the python scalars, the latter can hold the former
+_NUMERIC_DTYPES = OrderedDict([
+    (bool, 'bool'),
+    (int, 'int64'),
+    (float, 'float64'),
+])
+
+
+def to_columns(records, hydrator, columns=None, dtypes=None,
+               strings='object', size_hint=None):
+    """
+    Fill the values of the records into numpy array per column, consumed
+    one by one from the records without building python lists.
+
+    Args:
+      records: iterable of the native records
+      hydrator: graphic.engine.hydrator.Hydrator, used for the values
+                which are not scalar, ie: nodes, they are kept in object
+                array
+      columns: names of the columns to export, all the returned by default
+      dtypes: mapping of column name to numpy dtype, the dtype of the
+              others are inferred from the values
+      strings: 'object' or 'fixed', string column is object array or
+               fixed width unicode array
+      size_hint: rows expected, the arrays are allocated once if correct,
+                 grow if more
+
+    Returns:
+      OrderedDict of column name to numpy array, numpy.ma.MaskedArray if
+      the column has missing(None) values
+
+    Raises:
+      ImportError: numpy is not installed
+    """
+    if np is None:
+        raise ImportError(
+            'numpy is required for to_columns, please install it first'
+        )
+
+    if strings not in ('object', 'fixed'):
+        raise ValueError("strings should be 'object' or 'fixed'")
+
+    dtypes = dtypes or {}
+    capacity = size_hint or 1024
+    builders = None
+    size = 0
+
+    for record in records:
+        if builders is None:
+            if columns is None:
+                columns = list(record.keys())
+            builders = [
+                _ColumnBuilder(capacity, dtypes.get(name)) for name in columns
+            ]
+
+        for name, builder in zip(columns, builders):
+            builder.append(size, _export(record[name], hydrator))
+        size += 1
+
+    if builders is None:
+        builders = [
+            _ColumnBuilder(0, dtypes.get(name)) for name in columns or ()
+        ]
+
+    return OrderedDict(
+        (name, builder.finish(size, strings))
+        for name, builder in zip(columns or (), builders)
+    )
+
+
+def _export(value, hydrator):
+    if value is None or isinstance(value, _SCALAR_TYPES):
+        return value
+    return hydrator.hydrate(value)
+
+
+class _ColumnBuilder:
+    """
+    Growable array of one column, the dtype is given or inferred from the
+    first value and widened when a later value does not fit, numeric to
+    the wider numeric, others to object.
+    """
+
+    __slots__ = ('_data', '_mask', '_pytype', '_fixed_dtype')
+
+    def __init__(self, capacity, dtype=None):
+        self._fixed_dtype = dtype is not None
+        self._pytype = None
+        self._mask = np.zeros(capacity, dtype='bool')
+        self._data = None if dtype is None else np.empty(capacity, dtype)
+
+    def append(self, index, value):
+        if index == len(self._mask):
+            self._grow()
+
+        if value is None:
+            self._mask[index] = True
+            return
+
+        if self._data is None:
+            self._pytype = type(value)
+            self._data = np.empty(len(self._mask), _dtype_of(self._pytype))
+        elif not self._fixed_dtype and type(value) is not self._pytype:
+            self._widen(index, type(value))
+
+        try:
+            self._data[index] = value
+        except OverflowError:
+            # int out of int64
+            self._data = self._data.astype('object')
+            self._pytype = object
+            self._data[index] = value
+
+    def _grow(self):
+        capacity = max(len(self._mask) * 2, 1024)
+        self._mask = np.concatenate(
+            (self._mask, np.zeros(capacity - len(self._mask), dtype='bool'))
+        )
+        if self._data is not None:
+            data = np.empty(capacity, self._data.dtype)
+            data[:len(self._data)] = self._data
+            self._data = data
+
+    def _widen(self, index, pytype):
+        if self._pytype is object:
+            return
+
+        if self._pytype in _NUMERIC_DTYPES and pytype in _NUMERIC_DTYPES:
+            numeric = list(_NUMERIC_DTYPES)
+            if numeric.index(pytype) < numeric.index(self._pytype):
+                return
+        else:
+            pytype = object
+
+        # the missing ones are garbage after astype, but masked
+        self._data = self._data.astype(_dtype_of(pytype))
+        self._pytype = pytype
+
+    def finish(self, size, strings):
+        mask = self._mask[:size]
+
+        if self._data is None:
+            # all missing
+            data = np.empty(size, 'object')
+        else:
+            data = self._data[:size]
+
+        if strings == 'fixed' and self._pytype is str:
+            data = np.where(mask, '', data).astype('U')
+
+        if not mask.any():
+            return data
+        return np.ma.MaskedArray(data, mask=mask)
+
+
+def _dtype_of(pytype):
+    return _NUMERIC_DTYPES.get(pytype, 'object')
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from collections import namedtuple
+
+
+__all__ = ['PlanNode', 'PlanIssue', 'plan_issues', 'SCAN_OPERATORS']
+
+
+# operators read more than the index would, flagged by plan_issues
+SCAN_OPERATORS = frozenset(
+    ('AllNodesScan', 'NodeByLabelScan', 'CartesianProduct')
+)
+
+
+PlanIssue = namedtuple('PlanIssue', ['operator', 'identifiers', 'details'])
+PlanIssue.__doc__ = """
+Operator of a plan which scans
+
+  operator: operator name, ie: NodeByLabelScan
+  identifiers: tuple of the variables it produces
+  details: the details argument of the server, ie: g:Geek
+"""
+
+
+class PlanNode:
+    """
+    One operator of the plan tree returned by EXPLAIN or PROFILE
+
+    The rows, db hits and page cache stats are only measured by PROFILE,
+    they are None for EXPLAIN.
+
+    """
+
+    __slots__ = ('_operator', '_arguments', '_identifiers', '_children',
+                 '_rows', '_db_hits', '_page_cache_hits',
+                 '_page_cache_misses')
+
+    def __init__(self, operator, arguments=None, identifiers=(),
+                 children=(), rows=None, db_hits=None, page_cache_hits=None,
+                 page_cache_misses=None):
+        self._operator = operator
+        self._arguments = dict(arguments or {})
+        self._identifiers = tuple(identifiers)
+        self._children = tuple(children)
+        self._rows = rows
+        self._db_hits = db_hits
+        self._page_cache_hits = page_cache_hits
+        self._page_cache_misses = page_cache_misses
+
+    @classmethod
+    def from_plan(cls, plan):
+        """
+        Args:
+          plan: the plan or profile of the result summary, a dict(neo4j
+                driver >= 4) or the Plan object of the older drivers
+
+        Returns:
+          PlanNode instance, None if no plan
+        """
+        if plan is None:
+            return None
+
+        if isinstance(plan, dict):
+            def get(key, attr):
+                return plan.get(key)
+        else:
+            def get(key, attr):
+                return getattr(plan, attr, None)
+
+        arguments = dict(get('args', 'arguments') or {})
+        page_cache_hits = get('pageCacheHits', 'page_cache_hits')
+        if page_cache_hits is None:
+            page_cache_hits = arguments.get('PageCacheHits')
+        page_cache_misses = get('pageCacheMisses', 'page_cache_misses')
+        if page_cache_misses is None:
+            page_cache_misses = arguments.get('PageCacheMisses')
+
+        # the operators are suffixed by the runtime, ie: Filter@neo4j
+        operator = get('operatorType', 'operator_type') or ''
+        return cls(
+            operator.split('@')[0],
+            arguments,
+            get('identifiers', 'identifiers') or (),
+            [cls.from_plan(child) for child in
+             get('children', 'children') or ()],
+            rows=get('rows', 'rows'),
+            db_hits=get('dbHits', 'db_hits'),
+            page_cache_hits=page_cache_hits,
+            page_cache_misses=page_cache_misses
+        )
+
+    @property
+    def operator(self):
+        return self._operator
+
+    @property
+    def arguments(self):
+        return dict(self._arguments)
+
+    @property
+    def identifiers(self):
+        return self._identifiers
+
+    @property
+    def children(self):
+        return self._children
+
+    @property
+    def details(self):
+        return self._arguments.get('Details')
+
+    @property
+    def estimated_rows(self):
+        return self._arguments.get('EstimatedRows')
+
+    @property
+    def rows(self):
+        return self._rows
+
+    @property
+    def db_hits(self):
+        return self._db_hits
+
+    @property
+    def page_cache_hits(self):
+        return self._page_cache_hits
+
+    @property
+    def page_cache_misses(self):
+        return self._page_cache_misses
+
+    @property
+    def total_db_hits(self):
+        """db hits of the whole tree, None if not profiled"""
+        hits = [node.db_hits for node in self.walk()
+                if node.db_hits is not None]
+        return sum(hits) if hits else None
+
+    def walk(self):
+        """Iterate the operators of the tree, the root first"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def find(self, operator):
+        """
+        Returns:
+          list of the operators with the name in the tree
+        """
+        return [node for node in self.walk() if node.operator == operator]
+
+    def pretty(self, indent=0):
+        """The tree as text, one operator per line"""
+        stats = [
+            '{}={}'.format(name, value) for name, value in (
+                ('estimated_rows', self.estimated_rows),
+                ('rows', self.rows),
+                ('db_hits', self.db_hits),
+            ) if value is not None
+        ]
+        line = '{}{}'.format('  ' * indent, self.operator)
+        if self.details:
+            line = '{}({})'.format(line, self.details)
+        if stats:
+            line = '{} {}'.format(line, ' '.join(stats))
+
+        return '\n'.join(
+            [line] + [child.pretty(indent + 1) for child in self.children]
+        )
+
+    def __repr__(self):
+        return '<PlanNode: {}>'.format(self.operator)
+
+
+def plan_issues(plan, operators=SCAN_OPERATORS):
+    """
+    Flag the operators scan the nodes instead of seeking by an index, and
+    the cartesian products, so the hot queries can be asserted index
+    backed, ie:
+
+        assert plan_issues(graph.explain(query)) == []
+
+    Args:
+      plan: PlanNode instance
+      operators: names of the operators flagged
+
+    Returns:
+      list of PlanIssue, in the order of PlanNode.walk
+    """
+    return [
+        PlanIssue(node.operator, node.identifiers, node.details)
+        for node in plan.walk() if node.operator in operators
+    ]
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from collections import Mapping
+
+from graphic.compact import CompactGraphBuilder
+from graphic.graph import GraphEntity, Node, Relationship, SubGraph
+
+
+__all__ = ['Hydrator', 'Record', 'compact_graph']
+
+
+class Hydrator:
+    """
+    Turn the values of the bolt records into graphic Node, Relationship.
+
+    The entities are deduplicated by their id, the same node hydrated
+    twice is the same graphic.Node instance, so the endpoints of the
+    relationships are shared with the nodes of the records. One hydrator
+    should be used for all the records of a result.
+
+    A path is hydrated to a Graph with its nodes and relationships, lists
+    and maps are hydrated item by item, other values are kept as they are.
+
+    """
+
+    __slots__ = ('_nodes', '_relationships')
+
+    def __init__(self):
+        self._nodes = {}
+        self._relationships = {}
+
+    def hydrate(self, value):
+        if isinstance(value, GraphEntity):
+            # already graphic one, ie: from the memory engine
+            return value
+
+        if _is_path(value):
+            return SubGraph(
+                nodes=[self.node(node) for node in value.nodes],
+                relationships=[
+                    self.relationship(rel) for rel in value.relationships
+                ]
+            )
+
+        if _is_relationship(value):
+            return self.relationship(value)
+
+        if _is_node(value):
+            return self.node(value)
+
+        if isinstance(value, (list, tuple)):
+            return [self.hydrate(item) for item in value]
+
+        if isinstance(value, dict):
+            return {k: self.hydrate(v) for k, v in value.items()}
+
+        return value
+
+    def node(self, native):
+        key = _identity(native)
+        try:
+            return self._nodes[key]
+        except KeyError:
+            pass
+
+        node = Node.stored(
+            native.labels, _legacy_id(native), dict(native.items())
+        )
+        self._nodes[key] = node
+        return node
+
+    def relationship(self, native):
+        key = _identity(native)
+        try:
+            return self._relationships[key]
+        except KeyError:
+            pass
+
+        rel = Relationship.stored(
+            self.node(native.start_node),
+            self.node(native.end_node),
+            native.type,
+            _legacy_id(native),
+            dict(native.items())
+        )
+        self._relationships[key] = rel
+        return rel
+
+    def graph(self, native_graph):
+        """Hydrate the graph of the driver, which has nodes, relationships"""
+        return SubGraph(
+            nodes=[self.hydrate(node) for node in native_graph.nodes],
+            relationships=[
+                self.hydrate(rel) for rel in native_graph.relationships
+            ]
+        )
+
+
+class Record(Mapping):
+    """
+    Record of which the values are hydrated when accessed for the first
+    time, the untouched ones are never built.
+    """
+
+    __slots__ = ('_native', '_hydrator', '_values')
+
+    def __init__(self, native, hydrator):
+        self._native = native
+        self._hydrator = hydrator
+        self._values = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        value = self._hydrator.hydrate(self._native[key])
+        self._values[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._native.keys())
+
+    def __len__(self):
+        return len(self._native)
+
+    def __repr__(self):
+        return '<Record {}>'.format(
+            ' '.join('{}={!r}'.format(k, self[k]) for k in self)
+        )
+
+
+def compact_graph(native_graph):
+    """
+    Build CompactGraph from the graph of the driver, without hydrating
+    the nodes, relationships
+
+    Returns:
+      graphic.compact.CompactGraph
+    """
+    builder = CompactGraphBuilder()
+
+    def add_node(node):
+        builder.add_node(_graphic_id(node), node.labels, _properties(node))
+
+    for node in native_graph.nodes:
+        add_node(node)
+
+    for rel in native_graph.relationships:
+        if isinstance(rel, GraphEntity):
+            start, end = rel.node_from, rel.node_to
+        else:
+            start, end = rel.start_node, rel.end_node
+
+        add_node(start)
+        add_node(end)
+        builder.add_relationship(_graphic_id(rel), rel.type,
+                                 _graphic_id(start), _graphic_id(end),
+                                 _properties(rel))
+
+    return builder.build()
+
+
+def _is_path(value):
+    return hasattr(value, 'relationships') and hasattr(value, 'start_node')
+
+
+def _is_relationship(value):
+    return hasattr(value, 'start_node') and hasattr(value, 'type')
+
+
+def _is_node(value):
+    return hasattr(value, 'labels') and hasattr(value, 'items')
+
+
+def _identity(entity):
+    # element_id since neo4j 5, id before
+    return getattr(entity, 'element_id', None) or entity.id
+
+
+def _legacy_id(entity):
+    # graphic use the integer id, which is deprecated since neo4j 5 and
+    # only kept private there
+    if getattr(entity, 'element_id', None) is not None:
+        return entity._id
+    return entity.id
+
+
+def _graphic_id(entity):
+    if isinstance(entity, GraphEntity):
+        return entity.id
+    return _legacy_id(entity)
+
+
+def _properties(entity):
+    if isinstance(entity, GraphEntity):
+        return entity._kv_paires
+    return dict(entity.items())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import copy
+import threading
+
+from graphic.engine import Result, PushResult, RecordStream
+from graphic.engine import RowsProxy, NodeIds
+from graphic.engine.push import MergeKeys, LocalWriter, split_entities
+from graphic.engine.push import reporter
+from graphic.graph import RemoteGraph
+from graphic.gquery import BoundQuery
+
+from .plan import compile_plan
+from .store import Store
+
+
+__all__ = ['MemoryGraph']
+
+
+_DEFAULT_CONFIG = {
+    "MERGE_KEYS": {},
+}
+
+
+class MemoryGraph(RemoteGraph):
+    """
+    Graph kept in the memory of the process, the queries are evaluated
+    locally on the hash indexes of the labels, properties and the sorted
+    indexes of the properties, see graphic.engine.memory.plan.QueryPlan.
+
+    Useful as a local replica for hot reads, or as the backend of tests.
+
+    Thread safe, the fetches and pushes are serialized by a lock. The
+    fetched nodes and relationships are the ones kept in the graph, they
+    should be taken as read only.
+    """
+
+    __slots__ = ('_config', '_store', '_lock', '_merge_keys')
+
+    engine = 'graphic.engine.memory'
+
+    def __init__(self, *args, **config):
+        self._config = copy.copy(_DEFAULT_CONFIG)
+        self._config.update(config)
+
+        self._store = Store()
+        self._lock = threading.RLock()
+        self._merge_keys = MergeKeys(self._config['MERGE_KEYS'])
+
+    @property
+    def config(self):
+        return self._config
+
+    def compile(self, gquery):
+        """
+        Args:
+          gquery: GQuery or BoundQuery instance
+
+        Returns:
+          (QueryPlan, params), params are the values of the placeholders
+        """
+        if isinstance(gquery, BoundQuery):
+            return gquery.compile(compile_plan)
+
+        return compile_plan(gquery)
+
+    def fetch(self, gquery, stream=False):
+        """
+        Args:
+          gquery: GQuery or BoundQuery instance
+          stream: return RecordStream of the records, for the interface of
+                  Neo4jGraph.fetch only, it is not honored: the records are
+                  all evaluated at once
+
+        Returns:
+          Result or RecordStream if stream
+        """
+        if gquery is None or gquery.limit() == 0:
+            if stream:
+                return RecordStream(())
+            return Result(RowsProxy([]))
+
+        plan, params = self.compile(gquery)
+        with self._lock:
+            _, rows = plan.execute(self._store, params)
+
+        if stream:
+            return RecordStream(rows)
+        return Result(RowsProxy(rows))
+
+    def push(self, *graph_entities, batch_size=None, on_batch=None):
+        """
+        Add nodes, relationships to the graph, see also Neo4jGraph.push
+
+        All the entities are written at once, batch_size only split the
+        reported batches.
+
+        Raises:
+          KeyError: node with id which is not in the graph
+          ValueError: node without its merge keys, nothing is written
+
+        Returns:
+          PushResult, with the BatchReport of each batch
+        """
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        _nodes, _relationships = split_entities(graph_entities)
+        if len(_nodes) == 0:
+            return PushResult(RowsProxy([]))
+
+        batches = []
+        with self._lock:
+            self._writer(NodeIds()).write(
+                _nodes,
+                _relationships,
+                batch_size,
+                reporter(batches, on_batch)
+            )
+
+        return PushResult(RowsProxy([]), batches)
+
+    def push_stream(self, graph_entities, batch_size=1000, on_batch=None):
+        """See also Neo4jGraph.push_stream"""
+        if batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        batches = []
+        report = reporter(batches, on_batch)
+        writer = self._writer(NodeIds())
+
+        def flush(buffered):
+            nodes, relationships = split_entities(buffered)
+            with self._lock:
+                writer.write(nodes, relationships, batch_size, report)
+
+        buffered = []
+        for ent in graph_entities:
+            buffered.append(ent)
+            if len(buffered) >= batch_size:
+                flush(buffered)
+                buffered = []
+
+        if len(buffered) > 0:
+            flush(buffered)
+
+        return PushResult(RowsProxy([]), batches)
+
+    def close(self):
+        """Nothing to release, the data is kept"""
+
+    def _writer(self, node_ids):
+        """
+        Args:
+          node_ids: NodeIds to the stored nodes, of the nodes written
+                    before, updated with the nodes written
+        """
+        return _StoreWriter(self._store, self._merge_keys, node_ids)
+
+
+class _StoreWriter(LocalWriter):
+    """Write the entities into the Store, see LocalWriter"""
+
+    __slots__ = ('_store', )
+
+    def __init__(self, store, merge_keys, node_ids):
+        super().__init__(merge_keys, node_ids)
+        self._store = store
+
+    def check(self, ids):
+        missing = [id for id in ids if id not in self._store.nodes]
+        if missing:
+            raise KeyError('node {} not in the graph'.format(
+                ', '.join(str(id) for id in sorted(missing))
+            ))
+
+    def stored(self, node):
+        if node.id is None:
+            return self.node_ids[node]
+        return self._store.nodes[node.id]
+
+    def write_nodes(self, labels, keys, chunk):
+        store = self._store
+        key_label, keys = keys
+        for node, row in chunk:
+            existing = None
+            if key_label is not None:
+                existing = store.find_node(
+                    key_label,
+                    dict((key, row[key]) for key in keys)
+                )
+
+            if existing is None:
+                self.node_ids[node] = store.add_node(labels, row)
+            else:
+                store.update_node(existing, labels, row)
+                self.node_ids[node] = existing
+
+    def write_relationships(self, type, chunk):
+        store = self._store
+        for rel in chunk:
+            node_from = self.stored(rel.node_from)
+            node_to = self.stored(rel.node_to)
+            props = dict((key, val) for key, val in rel)
+
+            existing = None
+            if self.merge_keys.merges(rel):
+                existing = store.find_relationship(type, node_from, node_to)
+
+            if existing is None:
+                store.add_relationship(type, node_from, node_to, props)
+            else:
+                store.update_relationship(existing, props)
@@ -0,0 +1,570 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import heapq
+from collections import OrderedDict
+from itertools import islice
+
+from graphic.graph import GraphEntity
+from graphic.query.func import Func, Aggregation
+from graphic.query.query_utils import Q, Field, Param
+
+
+__all__ = ['QueryPlan', 'compile_plan']
+
+
+# filters the indexes of the store can answer
+_INDEXED_FUNCS = frozenset([
+    'eq', 'in', 'gt', 'gte', 'lt', 'lte', 'startswith'
+])
+
+
+def compile_plan(gquery) -> tuple:
+    """
+    Compiler of the memory engine, see PreparedQuery.compiled
+
+    Returns:
+      (QueryPlan, params), params is always empty, the filter values are
+      kept in the plan
+    """
+    return QueryPlan(gquery), {}
+
+
+class QueryPlan:
+    """
+    GQuery evaluated on the Store of the memory engine, in the cypher
+    semantics: compare with null or between different kinds of values is
+    null, the rows with null filter result are dropped.
+
+    The filter is split into the top level AND conjuncts. The ones with
+    an indexed func on a node property narrow the candidates of the node
+    by the indexes, each conjunct is checked as soon as all the entities it
+    refers to are bound, so the rows are dropped before joined with the
+    later entities.
+
+    """
+
+    __slots__ = ('_steps', '_index_filters', '_columns', '_grouped',
+                 '_order_by', '_limit')
+
+    def __init__(self, gquery):
+        context = gquery.context
+        conjuncts = [
+            (_aliases(q, context), _predicate(q, context))
+            for q in _conjuncts(gquery.where)
+        ]
+
+        self._index_filters = {}
+        for q in _conjuncts(gquery.where):
+            if isinstance(q, Func) and type(q).__name__ in _INDEXED_FUNCS:
+                field = _resolve(context, q.field)
+                if field.entity.is_node():
+                    self._index_filters.setdefault(
+                        field.entity.alias, []
+                    ).append((field.name, type(q).__name__, q.value))
+
+        self._steps = []
+        bound = set()
+        for entity in gquery.queryfor:
+            bound.update(_entity_aliases(entity))
+            checks = [pred for aliases, pred in conjuncts
+                      if aliases <= bound]
+            conjuncts = [(aliases, pred) for aliases, pred in conjuncts
+                         if not aliases <= bound]
+            self._steps.append((entity, checks))
+
+        self._columns = _columns(gquery, context)
+        self._grouped = any(
+            kind is not None for _, kind, _ in self._columns
+        )
+        self._order_by = _order_by(gquery, context, self._columns,
+                                   self._grouped)
+        self._limit = gquery.limit()
+
+    def execute(self, store, values=None) -> tuple:
+        """
+        Args:
+          store: graphic.engine.memory.store.Store
+          values: values of the Param placeholders
+
+        Returns:
+          (keys, rows), rows is a list of dict
+        """
+        values = values or {}
+        candidates = {}
+        for entity, _ in self._steps:
+            nodes = entity.nodes if entity.is_edge() else (entity, )
+            for node in nodes:
+                candidates[node.alias] = self._candidates(store, node, values)
+
+        rows = iter([{}])
+        for entity, checks in self._steps:
+            rows = self._join(store, rows, entity, checks, candidates, values)
+
+        if self._grouped:
+            rows = self._aggregate(rows, values)
+            if self._order_by is not None:
+                rows = self._sort(rows, self._order_by)
+            rows = rows[:self._limit]
+        else:
+            if self._order_by is not None:
+                rows = self._sort(rows, self._order_by)
+            rows = [self._project(row, values)
+                    for row in islice(rows, self._limit)]
+
+        return [key for key, _, _ in self._columns], rows
+
+    def _join(self, store, rows, entity, checks, candidates, values):
+        for row in rows:
+            for bound in self._match(store, row, entity, candidates):
+                if all(check(bound, values) is True for check in checks):
+                    yield bound
+
+    def _match(self, store, row, entity, candidates):
+        if entity.is_node():
+            for id in candidates[entity.alias]:
+                bound = dict(row)
+                bound[entity.alias] = store.nodes[id]
+                yield bound
+            return
+
+        from_ids = candidates[entity.node_from.alias]
+        to_ids = candidates[entity.node_to.alias]
+        rel_ids = store.relationship_ids(entity.type)
+
+        if len(from_ids) < len(rel_ids):
+            pairs = _pairs_by_nodes(store, from_ids, entity)
+        else:
+            pairs = _pairs_by_relationships(store, rel_ids, entity)
+
+        for rel, node_from, node_to in pairs:
+            if node_from.id not in from_ids or node_to.id not in to_ids:
+                continue
+            # a relationship is matched once in a pattern
+            if any(value is rel for value in row.values()):
+                continue
+
+            bound = dict(row)
+            bound[entity.alias] = rel
+            bound[entity.node_from.alias] = node_from
+            bound[entity.node_to.alias] = node_to
+            yield bound
+
+    def _candidates(self, store, node, values):
+        ids = None
+        for label in node.labels:
+            ids = _intersect(ids, store.node_ids(label))
+
+        for name, func, value in self._index_filters.get(node.alias, ()):
+            value = _bind(value, values)
+            if name == Field.PK:
+                found = _id_lookup(store, func, value)
+            else:
+                found = store.lookup(name, func, value)
+
+            if found is not None:
+                ids = _intersect(ids, found)
+
+        if ids is None:
+            return store.node_ids()
+        return ids
+
+    def _project(self, row, values):
+        return dict(
+            (key, get(row, values)) for key, _, get in self._columns
+        )
+
+    def _aggregate(self, rows, values):
+        groups = OrderedDict()
+        group_keys = [
+            (key, get) for key, kind, get in self._columns if kind is None
+        ]
+
+        for row in rows:
+            group = tuple(get(row, values) for _, get in group_keys)
+            group_key = tuple(_group_key(value) for value in group)
+            if group_key not in groups:
+                groups[group_key] = (group, [])
+            groups[group_key][1].append(row)
+
+        if len(groups) == 0 and len(group_keys) == 0:
+            # aggregate on nothing still returns one row
+            groups[()] = ((), [])
+
+        result = []
+        for group, group_rows in groups.values():
+            record = dict(zip((key for key, _ in group_keys), group))
+            for key, kind, get in self._columns:
+                if kind is not None:
+                    record[key] = _AGGREGATIONS[kind](
+                        [get(row, values) for row in group_rows]
+                    )
+            result.append(record)
+
+        return result
+
+    def _sort(self, rows, order_by):
+        descending = order_by[0][1]
+        if all(desc == descending for _, desc in order_by):
+            def key(row):
+                return tuple(_order_key(get(row)) for get, _ in order_by)
+
+            if descending:
+                return heapq.nlargest(self._limit, rows, key=key)
+            return heapq.nsmallest(self._limit, rows, key=key)
+
+        # mixed directions, sorted by the last key first as sort is stable
+        rows = list(rows)
+        for get, desc in reversed(order_by):
+            rows.sort(key=lambda row, get=get: _order_key(get(row)),
+                      reverse=desc)
+        return rows[:self._limit]
+
+
+def _conjuncts(q):
+    if isinstance(q, Func):
+        return [q]
+
+    if q.negated:
+        return [q]
+
+    if q.connector == Q.AND or len(q) == 1:
+        return [c for child in q.children for c in _conjuncts(child)]
+
+    return [q]
+
+
+def _resolve(context, exp) -> Field:
+    field = context.lookup_field(exp)
+    if field.entity is None:
+        raise KeyError('{} refer to none of the query entities'.format(exp))
+    return field
+
+
+def _aliases(q, context):
+    if isinstance(q, Func):
+        return {_resolve(context, q.field).entity.alias}
+
+    return set().union(*(_aliases(child, context) for child in q.children))
+
+
+def _entity_aliases(entity):
+    if entity.is_edge():
+        return {entity.alias, entity.node_from.alias, entity.node_to.alias}
+    return {entity.alias}
+
+
+def _getter(field):
+    alias, name = field.entity.alias, field.name
+
+    if name == Field.PK:
+        return lambda row: row[alias].id
+
+    return lambda row: row[alias].get(name)
+
+
+def _predicate(q, context):
+    """
+    Returns:
+      callable(row, values) -> True, False or None(null)
+    """
+    if isinstance(q, Func):
+        get = _getter(_resolve(context, q.field))
+        op = _OPERATORS[type(q).__name__]
+        value = q.value
+        return lambda row, values: op(get(row), _bind(value, values))
+
+    children = [_predicate(child, context) for child in q.children]
+    combine = _all if q.connector == Q.AND else _any
+
+    if q.negated:
+        return lambda row, values: _not(combine(children, row, values))
+    return lambda row, values: combine(children, row, values)
+
+
+def _columns(gquery, context):
+    """
+    Returns:
+      list of (key, aggregation name or None, callable(row, values)),
+      ordered by the key
+    """
+    returns = gquery.returns
+    if len(returns) == 0:
+        return [
+            (entity.alias, None, _alias_getter(entity.alias))
+            for entity in gquery.queryfor
+        ]
+
+    columns = []
+    for select in returns:
+        if isinstance(select, Aggregation):
+            get = _getter(_resolve(context, select.field))
+            columns.append((
+                select(lookup_field=context.lookup_field),
+                type(select).__name__,
+                _row_getter(get)
+            ))
+        elif isinstance(select, Func):
+            columns.append((
+                select(lookup_field=context.lookup_field),
+                None,
+                _predicate(select, context)
+            ))
+        else:
+            columns.append((str(select), None, _row_getter(_getter(select))))
+
+    return sorted(columns, key=lambda column: column[0])
+
+
+def _alias_getter(alias):
+    return lambda row, values: row[alias]
+
+
+def _row_getter(get):
+    return lambda row, values: get(row)
+
+
+def _order_by(gquery, context, columns, grouped):
+    """
+    Returns:
+      list of (callable(row), descending) or None
+    """
+    order_by = [
+        (_order_getter(_resolve(context, exp), columns, grouped), descending)
+        for exp, descending in gquery.order_keys()
+    ]
+    return order_by or None
+
+
+def _order_getter(field, columns, grouped):
+    if not grouped:
+        return _getter(field)
+
+    # the aggregated rows only have the returned columns
+    key = str(field)
+    if key not in [column_key for column_key, _, _ in columns]:
+        raise ValueError(
+            'can not order by {} which is not returned'.format(key)
+        )
+    return lambda row: row[key]
+
+
+def _bind(value, values):
+    if isinstance(value, Param):
+        return values[value.name]
+    return value
+
+
+def _intersect(ids, other):
+    if ids is None:
+        return other
+    return ids & other
+
+
+def _id_lookup(store, func, value):
+    if func == 'eq' and isinstance(value, int):
+        return {value} if value in store.nodes else set()
+    if func == 'in' and isinstance(value, (list, tuple)):
+        return set(
+            id for id in value if isinstance(id, int) and id in store.nodes
+        )
+    return None
+
+
+def _pairs_by_relationships(store, rel_ids, entity):
+    for id in rel_ids:
+        rel = store.relationships[id]
+        yield rel, rel.node_from, rel.node_to
+        if not entity.with_direction and rel.node_from is not rel.node_to:
+            yield rel, rel.node_to, rel.node_from
+
+
+def _pairs_by_nodes(store, node_ids, entity):
+    for node_id in node_ids:
+        for id in store.outgoing(node_id):
+            rel = store.relationships[id]
+            if entity.type is None or rel.type == entity.type:
+                yield rel, rel.node_from, rel.node_to
+
+        if entity.with_direction:
+            continue
+
+        for id in store.incoming(node_id):
+            rel = store.relationships[id]
+            if rel.node_from is rel.node_to:
+                continue
+            if entity.type is None or rel.type == entity.type:
+                yield rel, rel.node_to, rel.node_from
+
+
+def _kind(value):
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, (list, tuple)):
+        return 'list'
+    return type(value).__name__
+
+
+def _equals(a, b):
+    if a is None or b is None:
+        return None
+    if _kind(a) != _kind(b):
+        return False
+    if _kind(a) != 'list':
+        return a == b
+    if len(a) != len(b):
+        return False
+
+    result = True
+    for x, y in zip(a, b):
+        equals = _equals(x, y)
+        if equals is False:
+            return False
+        if equals is None:
+            result = None
+    return result
+
+
+def _comparator(compare):
+    def op(a, b):
+        if a is None or b is None:
+            return None
+        if _kind(a) != _kind(b) or _kind(a) not in (
+            'number', 'string', 'boolean'
+        ):
+            return None
+        return compare(a, b)
+
+    return op
+
+
+def _string_op(op):
+    def _op(a, b):
+        if not isinstance(a, str) or not isinstance(b, str):
+            return None
+        return op(a, b)
+
+    return _op
+
+
+def _in(a, b):
+    if b is None or not isinstance(b, (list, tuple)):
+        return None
+
+    result = False
+    for item in b:
+        equals = _equals(a, item)
+        if equals is True:
+            return True
+        if equals is None:
+            result = None
+    return result
+
+
+def _not_equals(a, b):
+    return _not(_equals(a, b))
+
+
+_OPERATORS = {
+    'eq': _equals,
+    'neq': _not_equals,
+    'gt': _comparator(lambda a, b: a > b),
+    'gte': _comparator(lambda a, b: a >= b),
+    'lt': _comparator(lambda a, b: a < b),
+    'lte': _comparator(lambda a, b: a <= b),
+    'in': _in,
+    'startswith': _string_op(lambda a, b: a.startswith(b)),
+    'endswith': _string_op(lambda a, b: a.endswith(b)),
+    'contains': _string_op(lambda a, b: b in a),
+}
+
+
+def _all(predicates, row, values):
+    result = True
+    for predicate in predicates:
+        value = predicate(row, values)
+        if value is False:
+            return False
+        if value is None:
+            result = None
+    return result
+
+
+def _any(predicates, row, values):
+    result = False
+    for predicate in predicates:
+        value = predicate(row, values)
+        if value is True:
+            return True
+        if value is None:
+            result = None
+    return result
+
+
+def _not(value):
+    if value is None:
+        return None
+    return not value
+
+
+def _numbers(values):
+    return [value for value in values if value is not None]
+
+
+def _avg(values):
+    values = _numbers(values)
+    if len(values) == 0:
+        return None
+    return sum(values) / len(values)
+
+
+def _min(values):
+    values = _numbers(values)
+    if len(values) == 0:
+        return None
+    return min(values, key=_order_key)
+
+
+def _max(values):
+    values = _numbers(values)
+    if len(values) == 0:
+        return None
+    return max(values, key=_order_key)
+
+
+_AGGREGATIONS = {
+    'count': lambda values: len(_numbers(values)),
+    'sum': lambda values: sum(_numbers(values)),
+    'avg': _avg,
+    'min': _min,
+    'max': _max,
+}
+
+
+# the order of the kinds in ORDER BY
+_KIND_ORDER = {'string': 0, 'boolean': 1, 'number': 2}
+
+
+def _order_key(value):
+    """Sort key as cypher, null is the last in ascending"""
+    if value is None:
+        return (1, 0, 0)
+
+    kind = _kind(value)
+    if kind in _KIND_ORDER:
+        return (0, _KIND_ORDER[kind], value)
+    if isinstance(value, GraphEntity):
+        return (0, 3, value.id)
+    return (0, 4, repr(value))
+
+
+def _group_key(value):
+    try:
+        hash(value)
+    except TypeError:
+        return (_kind(value), repr(value))
+    return (_kind(value), value)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from bisect import bisect_left, bisect_right
+
+from graphic.graph import Node, Relationship
+
+
+__all__ = ['Store', 'HashIndex', 'SortedIndex']
+
+
+_INF = float('inf')
+
+
+class HashIndex:
+    """
+    Property value -> ids of the entities with the value, for equality
+    lookups. Only hashable values are indexed, the others never equal to
+    a hashable one anyway.
+    """
+
+    __slots__ = ('_entries', )
+
+    def __init__(self):
+        self._entries = {}
+
+    def add(self, value, id):
+        key = _hash_key(value)
+        if key is not None:
+            self._entries.setdefault(key, set()).add(id)
+
+    def discard(self, value, id):
+        key = _hash_key(value)
+        if key is None:
+            return
+
+        ids = self._entries.get(key)
+        if ids is None:
+            return
+
+        ids.discard(id)
+        if len(ids) == 0:
+            del self._entries[key]
+
+    def get(self, value):
+        """Returns the ids, should not be modified"""
+        key = _hash_key(value)
+        if key is None:
+            return frozenset()
+        return self._entries.get(key, frozenset())
+
+
+class SortedIndex:
+    """
+    (value, id) pairs kept in order, the numbers and the strings apart, for
+    range lookups. Other values are not indexed.
+
+    The added pairs are appended aside and sorted in at once by the next
+    lookup, so a bulk load is sorted once instead of inserted one by one.
+    """
+
+    __slots__ = ('_numbers', '_strings', '_pending')
+
+    def __init__(self):
+        self._numbers = []
+        self._strings = []
+        self._pending = []
+
+    def _bucket(self, value):
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            # nan is not ordered
+            return self._numbers if value == value else None
+        if isinstance(value, str):
+            return self._strings
+        return None
+
+    def add(self, value, id):
+        if self._bucket(value) is not None:
+            self._pending.append((value, id))
+
+    def discard(self, value, id):
+        bucket = self._bucket(value)
+        if bucket is None:
+            return
+
+        if not _remove_sorted(bucket, (value, id)) and self._pending:
+            self._flush()
+            _remove_sorted(bucket, (value, id))
+
+    def _flush(self):
+        if len(self._pending) == 0:
+            return
+
+        for value, id in self._pending:
+            self._bucket(value).append((value, id))
+        self._pending = []
+        self._numbers.sort()
+        self._strings.sort()
+
+    def supports(self, value):
+        return self._bucket(value) is not None
+
+    def range(self, lower=None, upper=None, lower_inclusive=True,
+              upper_inclusive=True):
+        """
+        Ids of the values between the bounds, which are of the same kind,
+        number or string, at least one of them given.
+        """
+        bucket = self._bucket(lower if lower is not None else upper)
+        if bucket is None:
+            return []
+        self._flush()
+
+        start, end = 0, len(bucket)
+        if lower is not None:
+            if lower_inclusive:
+                start = bisect_left(bucket, (lower, -_INF))
+            else:
+                start = bisect_right(bucket, (lower, _INF))
+        if upper is not None:
+            if upper_inclusive:
+                end = bisect_right(bucket, (upper, _INF))
+            else:
+                end = bisect_left(bucket, (upper, -_INF))
+
+        return [id for _, id in bucket[start:end]]
+
+
+class Store:
+    """
+    Nodes, relationships of the memory graph and their indexes:
+
+      label -> node ids
+      property -> HashIndex and SortedIndex of the node properties
+      type -> relationship ids
+      node id -> ids of its outgoing, incoming relationships
+
+    Not thread safe, it is guarded by the graph.
+    """
+
+    __slots__ = ('nodes', 'relationships', '_labels', '_hash_indexes',
+                 '_sorted_indexes', '_types', '_outgoing', '_incoming',
+                 '_next_node_id', '_next_relationship_id')
+
+    def __init__(self):
+        self.nodes = {}
+        self.relationships = {}
+        self._labels = {}
+        self._hash_indexes = {}
+        self._sorted_indexes = {}
+        self._types = {}
+        self._outgoing = {}
+        self._incoming = {}
+        self._next_node_id = 0
+        self._next_relationship_id = 0
+
+    def add_node(self, labels, properties) -> Node:
+        node = Node.stored(labels, self._next_node_id, {})
+        self._next_node_id += 1
+
+        self.nodes[node.id] = node
+        self._outgoing[node.id] = set()
+        self._incoming[node.id] = set()
+        self.update_node(node, labels, properties)
+        return node
+
+    def update_node(self, node, labels, properties):
+        """Add the labels and set the properties, like SET n:L SET n += p"""
+        for label in labels:
+            self._labels.setdefault(label, set()).add(node.id)
+        node._labels = node.labels.union(labels)
+
+        for name, value in properties.items():
+            if name in node._kv_paires:
+                self._unindex(name, node._kv_paires.pop(name), node.id)
+            # set to null remove the property
+            if value is not None:
+                node._kv_paires[name] = value
+                self._index(name, value, node.id)
+
+    def add_relationship(self, type, node_from, node_to,
+                         properties) -> Relationship:
+        rel = Relationship.stored(
+            node_from, node_to, type, self._next_relationship_id, {}
+        )
+        self._next_relationship_id += 1
+        self.update_relationship(rel, properties)
+
+        self.relationships[rel.id] = rel
+        self._types.setdefault(type, set()).add(rel.id)
+        self._outgoing[node_from.id].add(rel.id)
+        self._incoming[node_to.id].add(rel.id)
+        return rel
+
+    def update_relationship(self, rel, properties):
+        """Set the properties, like SET r += p"""
+        for name, value in properties.items():
+            if value is None:
+                rel._kv_paires.pop(name, None)
+            else:
+                rel._kv_paires[name] = value
+
+    def find_node(self, label, properties):
+        """First node with the label and all the properties, or None"""
+        ids = self._labels.get(label, frozenset())
+        for name, value in properties.items():
+            found = self.lookup(name, 'eq', value)
+            if found is not None:
+                ids = ids & found
+
+        for id in ids:
+            node = self.nodes[id]
+            if all(node.get(k) == v for k, v in properties.items()):
+                return node
+        return None
+
+    def find_relationship(self, type, node_from, node_to):
+        ids = self._outgoing[node_from.id] & self.relationship_ids(type)
+        for id in ids:
+            rel = self.relationships[id]
+            if rel.node_to.id == node_to.id:
+                return rel
+        return None
+
+    def node_ids(self, label=None):
+        """Returns the ids, should not be modified"""
+        if label is None:
+            return self.nodes.keys()
+        return self._labels.get(label, frozenset())
+
+    def relationship_ids(self, type=None):
+        """Returns the ids, should not be modified"""
+        if type is None:
+            return self.relationships.keys()
+        return self._types.get(type, frozenset())
+
+    def outgoing(self, node_id):
+        return self._outgoing.get(node_id, frozenset())
+
+    def incoming(self, node_id):
+        return self._incoming.get(node_id, frozenset())
+
+    def lookup(self, name, func, value):
+        """
+        Ids of the nodes of which the property may match the filter func,
+        by the indexes
+
+        Returns:
+          set of ids, or None if the indexes can not answer
+        """
+        if value is None:
+            # compare with null is never true
+            return set()
+
+        if func == 'eq':
+            if _hash_key(value) is None:
+                return None
+            return self._hash_indexes.get(name, HashIndex()).get(value)
+
+        if func == 'in':
+            if not isinstance(value, (list, tuple)) or any(
+                _hash_key(item) is None for item in value
+            ):
+                return None
+            index = self._hash_indexes.get(name, HashIndex())
+            return set().union(*(index.get(item) for item in value))
+
+        index = self._sorted_indexes.get(name, SortedIndex())
+        if not index.supports(value):
+            return None
+
+        if func in ('gt', 'gte'):
+            return set(index.range(lower=value,
+                                   lower_inclusive=func == 'gte'))
+        if func in ('lt', 'lte'):
+            return set(index.range(upper=value,
+                                   upper_inclusive=func == 'lte'))
+        if func == 'startswith' and isinstance(value, str) and value \
+                and ord(value[-1]) < 0x10ffff:
+            # all the strings with the prefix are in [prefix, successor)
+            successor = value[:-1] + chr(ord(value[-1]) + 1)
+            return set(index.range(lower=value, upper=successor,
+                                   upper_inclusive=False))
+        return None
+
+    def _index(self, name, value, id):
+        self._hash_indexes.setdefault(name, HashIndex()).add(value, id)
+        self._sorted_indexes.setdefault(name, SortedIndex()).add(value, id)
+
+    def _unindex(self, name, value, id):
+        self._hash_indexes[name].discard(value, id)
+        self._sorted_indexes[name].discard(value, id)
+
+
+def _remove_sorted(bucket, pair):
+    index = bisect_left(bucket, pair)
+    if index < len(bucket) and bucket[index] == pair:
+        del bucket[index]
+        return True
+    return False
+
+
+def _hash_key(value):
+    try:
+        hash(value)
+    except TypeError:
+        return None
+
+    # True == 1 in python but not in cypher
+    return (isinstance(value, bool), value)
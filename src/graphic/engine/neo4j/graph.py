@@ -2,33 +2,86 @@
 # -*- encoding: utf-8 -*-
 
 import copy
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from neo4j import GraphDatabase, basic_auth
 
-from graphic.engine import Result
+from graphic.cache import LRUCache, ResultCache
+from graphic.engine import Result, PushResult, BatchReport, RecordStream
+from graphic.engine import FailedProxy, NodeIds
+from graphic.engine.explain import PlanNode
+from graphic.engine.hydrator import _identity
+from graphic.engine.push import MergeKeys, split_entities, reporter, chunks
+from graphic.engine.push import group_nodes, group_relationships
 from graphic.graph import RemoteGraph
-from graphic.query.cypher.compiler import compile as compile_as_cypher
-from graphic.query.cypher.compiler import build as build_create_cypher
+from graphic.gquery import BoundQuery
+from graphic.schema import Index, SchemaCatalog, filtered_properties
+from graphic.query.cypher.compiler import compile_with_params
+from graphic.query.cypher.compiler import fingerprint as cypher_fingerprint
+from graphic.query.cypher.compiler import build_node_batch
+from graphic.query.cypher.compiler import build_node_merge_batch
+from graphic.query.cypher.compiler import build_relationship_batch
+from graphic.query.cypher.compiler import build_index
 
 
-__all__ = ['Neo4jGraph']
+__all__ = ['Neo4jGraph', 'Neo4jTransaction']
+
+
+logger = logging.getLogger(__name__)
 
 
 _DEFAULT_CONFIG = {
     "URI": "bolt://localhost",
     "USER": "neo4j",
-    "PASSWORD": "test"
+    "PASSWORD": "test",
+    "COMPILE_CACHE_SIZE": 256,
+    "RESULT_CACHE_SIZE": 0,
+    "RESULT_CACHE_TTL": 60,
+    "MERGE_KEYS": {},
+    "INDEX_HINTS": False,
+    "MAX_CONNECTION_POOL_SIZE": None,
+    "CONNECTION_ACQUISITION_TIMEOUT": None
 }
 
 
+# config key -> driver config key, passed to the driver only when set
+_DRIVER_CONFIG = (
+    ("MAX_CONNECTION_POOL_SIZE", "max_connection_pool_size"),
+    ("CONNECTION_ACQUISITION_TIMEOUT", "connection_acquisition_timeout"),
+)
+
+
+# the node property indexes the planner can be hinted to
+_SHOW_INDEXES = (
+    "SHOW INDEXES YIELD labelsOrTypes, properties, type, entityType, "
+    "owningConstraint WHERE entityType = 'NODE' AND type IN ['RANGE', 'BTREE']"
+)
+
+
+# driver key -> [driver, graphs refer to it]
+_drivers = {}
+_drivers_lock = threading.Lock()
+
+
 # TODO(chuter):
 #   1. excpetions process
 #   2. hydrate to graphic Result, Graph
 
 class Neo4jGraph(RemoteGraph):
-    """Not thread safe!!!"""
+    """
+    Thread safe, one instance can be shared by all the threads.
+
+    All the instances with the same engine, URI, auth and pool config share
+    one driver and its connection pool, the driver is closed when the last
+    of them is closed.
+    """
 
-    __slots__ = ('_driver', '_config')
+    __slots__ = ('_driver', '_config', '_compile_cache', '_result_cache',
+                 '_merge_keys', '_schema')
 
     engine = 'graphic.engine.neo4j'
 
@@ -37,56 +90,879 @@ class Neo4jGraph(RemoteGraph):
         self._config.update(config)
 
         self._driver = None
+        self._compile_cache = LRUCache(self._config['COMPILE_CACHE_SIZE'])
+        self._result_cache = ResultCache(
+            self._config['RESULT_CACHE_SIZE'],
+            self._config['RESULT_CACHE_TTL']
+        )
+
+        self._schema = SchemaCatalog()
+        self._merge_keys = MergeKeys(self._config['MERGE_KEYS'])
+        for label, keys in self._merge_keys.items():
+            self._schema.declare(label, *keys)
 
     def compile(self, gquery):
-        return compile_as_cypher(gquery)
+        """
+        The compiled cypher is cached by the shape of the query, a query
+        with a seen shape only costs the fingerprint and parameter bind.
+        The filters are optimized before, see GQuery.optimized
 
-    def fetch(self, gquery):
-        if gquery is None or gquery.limit() == 0:
+        The node properties filtered by each compiled query are counted in
+        the schema catalog. With the config INDEX_HINTS, the nodes are
+        hinted to be found by the known indexes of the properties.
+
+        The template of a BoundQuery goes the same way once, at its first
+        compile by the graph, and is kept by its PreparedQuery, so it is
+        hinted by the indexes known then.
+
+        Args:
+          gquery: GQuery or BoundQuery instance
+        """
+        if isinstance(gquery, BoundQuery):
+            template = gquery.prepared.query
+            self._observe(template.optimized() or template)
+            return gquery.compile(self._compile_template)
+
+        # the contradicted filters are compiled as they are, fetch never
+        # sends them
+        gquery = gquery.optimized() or gquery
+        return self._compile(gquery, self._observe(gquery))
+
+    def _observe(self, gquery):
+        """
+        Returns:
+          list of the filtered_properties of the query, counted in schema
+        """
+        properties = list(filtered_properties(gquery))
+        self._schema.observe(
+            (label, property) for _, label, property, _ in properties
+        )
+        return properties
+
+    def _compile(self, gquery, properties):
+        shape, params = cypher_fingerprint(gquery)
+        hinted = self._config['INDEX_HINTS']
+        if hinted:
+            # compiled again when the known indexes change
+            shape = (shape, self._schema.version)
+
+        cypher_query = self._compile_cache.get(shape)
+        if cypher_query is None:
+            hints = _index_hints(self._schema, properties) if hinted else ()
+            cypher_query, params = compile_with_params(gquery, hints=hints)
+            self._compile_cache.put(shape, cypher_query)
+
+        return cypher_query, params
+
+    def _compile_template(self, template):
+        """The compiler of the PreparedQuery templates, see compile"""
+        template = template.optimized() or template
+        return self._compile(template, list(filtered_properties(template)))
+
+    @property
+    def compile_cache(self):
+        """LRUCache of compiled cypher, see compile_cache.info()"""
+        return self._compile_cache
+
+    @property
+    def result_cache(self):
+        """
+        ResultCache of the fetched records, keyed by the compiled query and
+        its params. Disabled by default, enable it by the config
+        RESULT_CACHE_SIZE and RESULT_CACHE_TTL(seconds).
+
+        The entries read the labels or relationship types written by push,
+        push_stream or a committed transaction are dropped when the write
+        is done.
+        """
+        return self._result_cache
+
+    def fetch(self, gquery, stream=False, fetch_size=None):
+        """
+        Args:
+          gquery: GQuery or BoundQuery instance
+          stream: return RecordStream iterate the records as they arrive,
+                  the session is kept open until it is drained or closed
+          fetch_size: records pulled from the server each time when stream
+
+        Returns:
+          Result or RecordStream if stream
+        """
+        if _never_matches(gquery):
+            if stream:
+                return RecordStream(())
             return Result(DummyEmptyGraphProxy())
 
-        cypher_query = self.compile(gquery)
-        return Result(self._run(cypher_query))
+        cypher_query, params = self.compile(gquery)
+        if not stream:
+            return Result(self._run_cached(gquery, cypher_query, params))
+
+        if fetch_size is None:
+            session = self._session()
+        else:
+            session = self._session(fetch_size=fetch_size)
+
+        try:
+            records = session.run(cypher_query, params)
+        except BaseException:
+            session.close()
+            raise
+
+        return RecordStream(records, session.close)
+
+    def fetch_many(self, gqueries, max_workers=None):
+        """
+        Fetch the queries concurrently, they are compiled first then run on
+        a pool of worker threads over the shared driver.
+
+        A failed query not abort the others, its Result carry the exception
+        in Result.error and raise it when access the data.
+
+        Args:
+          gqueries: iterable of GQuery or BoundQuery instance
+          max_workers: max queries run at the same time, default as many as
+                       the queries, up to 32
 
-    def push(self, *graph_entities):
+        Returns:
+          list of Result, in the order of the queries
+        """
+        results = []
+        pending = []
+
+        for gquery in gqueries:
+            if _never_matches(gquery):
+                results.append(Result(DummyEmptyGraphProxy()))
+                continue
+
+            try:
+                statement = self.compile(gquery)
+            except Exception as error:
+                results.append(Result(FailedProxy(error)))
+                continue
+
+            pending.append((len(results), gquery, statement))
+            results.append(None)
+
+        if len(pending) == 0:
+            return results
+
+        if max_workers is None:
+            max_workers = min(32, len(pending))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (index, executor.submit(self._run_cached, gquery, *statement))
+                for index, gquery, statement in pending
+            ]
+
+            for index, future in futures:
+                try:
+                    results[index] = Result(future.result())
+                except Exception as error:
+                    results[index] = Result(FailedProxy(error))
+
+        return results
+
+    def explain(self, gquery):
+        """
+        Plan the compiled query by the server without running it
+
+        examples:
+
+        plan = graph.explain(query)
+        print(plan.pretty())
+        assert plan_issues(plan) == []  # see graphic.engine.explain
+
+        Args:
+          gquery: GQuery or BoundQuery instance
+
+        Returns:
+          PlanNode of the root operator, with the estimated rows
+        """
+        return self._plan('EXPLAIN', gquery)
+
+    def profile(self, gquery):
+        """
+        Run the compiled query and return its plan with the rows, db hits
+        and page cache stats measured of each operator, see explain. The
+        records are discarded.
+
+        Returns:
+          PlanNode of the root operator
+        """
+        return self._plan('PROFILE', gquery)
+
+    def _plan(self, prefix, gquery):
+        cypher_query, params = self.compile(gquery)
+        with self._session() as session:
+            summary = session.run(
+                '{} {}'.format(prefix, cypher_query), params
+            ).consume()
+
+        return PlanNode.from_plan(
+            summary.profile if prefix == 'PROFILE' else summary.plan
+        )
+
+    def transaction(self):
+        """
+        Run fetches and pushes on one session in one explicit transaction,
+        committed once when leaving the with block, rolled back if an
+        exception raised.
+
+        examples:
+
+        with graph.transaction() as tx:
+            tx.push(geek)
+            geeks = tx.fetch(graphic.node('Geek').query)
+            companies = tx.fetch(graphic.node('Company').query)
+
+        Returns:
+          Neo4jTransaction instance
+        """
+        return Neo4jTransaction(self)
+
+    def merge_on(self, label, *keys):
+        """
+        See also RemoteGraph.merge_on, the keys are declared as wanted
+        indexes of the schema as well
+        """
+        super().merge_on(label, *keys)
+        self._schema.declare(label, *keys)
+        return self
+
+    @property
+    def schema(self):
+        """
+        SchemaCatalog of the graph, the merge keys(see merge_on) are
+        declared as wanted indexes
+        """
+        return self._schema
+
+    def refresh_schema(self):
+        """
+        Load the node property indexes, including the ones owned by the
+        constraints, from the server into the schema catalog
+
+        Returns:
+          SchemaCatalog
+        """
+        with self._session() as session:
+            records = list(session.run(_SHOW_INDEXES))
+
+        self._schema.load(_parse_indexes(records))
+        return self._schema
+
+    def ensure_indexes(self, min_count=1, dry_run=False):
+        """
+        Create the indexes the schema catalog misses in bulk, see
+        SchemaCatalog.missing, each statement runs in its own transaction
+        as the schema changes must. The created ones are known by the
+        catalog after.
+
+        Args:
+          min_count: only the observed properties filtered by at least so
+                     many compiled queries
+          dry_run: only return the statements, nothing is created
+
+        Returns:
+          list of the statements
+        """
+        missing = self._schema.missing(min_count)
+        statements = [
+            build_index(label, properties) for label, properties in missing
+        ]
+        if dry_run or len(statements) == 0:
+            return statements
+
+        with self._session() as session:
+            for statement in statements:
+                list(session.run(statement))
+
+        self._schema.load(
+            (Index(label, properties, False)
+             for label, properties in missing),
+            replace=False
+        )
+        return statements
+
+    def push(self, *graph_entities, batch_size=None, on_batch=None):
         """
         Add nodes, relationships to the neo4j server instance
 
-        It first deal with all the nodes, then all the relationships,
+        It first deal with all the nodes, then all the relationships.
+        Entities are grouped by label set or relationship type and each
+        group is sent as UNWIND statements, with the properties as
+        parameters. Nodes with merge keys(see merge_on) are merged.
+
+        Nodes with id are taken as already in the server, only the
+        relationships refer to them are created.
+
+        Args:
+          graph_entities: nodes, relationships
+          batch_size: max entities of one statement, each batch is committed
+                      in its own transaction and the relationships are only
+                      written after all the nodes committed. By default all
+                      is written in one transaction
+          on_batch: callable receive the BatchReport when a batch is done
+
+        Returns:
+          PushResult, with the BatchReport of each batch
         """
         # TODO(chuter):
         #   0. add path surpport
-        #   1. auto covert create to merge to avoid duplicate!!!
-        #   2. auto build alias for each entity whichout one
-        _nodes = []
-        _relationships = []
-
-        for ent in graph_entities:
-            if ent.is_node():
-                _nodes.append(ent)
-            if ent.is_edge():
-                _relationships.append(ent)
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
 
+        _nodes, _relationships = split_entities(graph_entities)
         if len(_nodes) == 0:
-            return Result(DummyEmptyGraphProxy())
+            return PushResult(DummyEmptyGraphProxy())
+
+        _nodes = [n for n in _nodes if n.id is None]
+        batches = []
+        report = reporter(batches, on_batch)
+
+        try:
+            with self._session() as session:
+                if batch_size is None:
+                    with session.begin_transaction() as tx:
+                        self._write(
+                            lambda query, params: list(tx.run(query, params)),
+                            _nodes,
+                            _relationships,
+                            batch_size,
+                            report
+                        )
+                else:
+                    self._write(
+                        lambda query, params: _run_in_transaction(
+                            session,
+                            query,
+                            params
+                        ),
+                        _nodes,
+                        _relationships,
+                        batch_size,
+                        report
+                    )
+        finally:
+            self._invalidate(batches)
+
+        return PushResult(DummyEmptyGraphProxy(), batches)
+
+    def push_stream(self, graph_entities, batch_size=1000, on_batch=None):
+        """
+        Add nodes, relationships consumed from any iterable, ie: generator
+
+        Only one batch of entities is buffered, when it is full the nodes
+        are written then the relationships, each batch in its own
+        transaction. The ids of the written nodes are kept to resolve the
+        relationships of later batches only while the nodes are referred,
+        see NodeIds.
+
+        Args:
+          graph_entities: iterable of nodes, relationships
+          batch_size: max entities buffered and written by one statement
+          on_batch: callable receive the BatchReport when a batch is done
+
+        Returns:
+          PushResult, with the BatchReport of each batch
+        """
+        if batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        batches = []
+        report = reporter(batches, on_batch)
+        node_ids = NodeIds()
+
+        try:
+            with self._session() as session:
+                def run(query, params):
+                    return _run_in_transaction(session, query, params)
+
+                def flush(nodes, relationships):
+                    for rel in relationships:
+                        nodes.extend(rel.nodes)
 
-        cypher_query = build_create_cypher(_nodes, _relationships)
-        return Result(self._run(cypher_query))
+                    self._write(
+                        run,
+                        [
+                            n for n in nodes
+                            if n.id is None and n not in node_ids
+                        ],
+                        relationships,
+                        batch_size,
+                        report,
+                        node_ids=node_ids
+                    )
+
+                _nodes = []
+                _relationships = []
+                for ent in graph_entities:
+                    if ent.is_node():
+                        _nodes.append(ent)
+                    if ent.is_edge():
+                        _relationships.append(ent)
+
+                    if len(_nodes) + len(_relationships) >= batch_size:
+                        flush(_nodes, _relationships)
+                        _nodes = []
+                        _relationships = []
+
+                if len(_nodes) + len(_relationships) > 0:
+                    flush(_nodes, _relationships)
+        finally:
+            self._invalidate(batches)
+
+        return PushResult(DummyEmptyGraphProxy(), batches)
+
+    def _write(self, run, nodes, relationships, batch_size, report,
+               node_ids=None):
+        """
+        Write the nodes then the relationships by UNWIND statements
+
+        Args:
+          run: callable run (query, params) and return the records
+          nodes: nodes to create or merge, without id
+          relationships: relationships to create or merge
+          batch_size: max entities of one statement, None for no limit
+          report: callable receive the BatchReport
+          node_ids: NodeIds of the nodes written before, updated with the
+                    nodes written
+        """
+        if node_ids is None:
+            node_ids = NodeIds()
+
+        for kind, key, chunk, statement in self._batches(
+            nodes,
+            relationships,
+            batch_size,
+            node_ids
+        ):
+            started = time.perf_counter()
+            records = run(*statement)
+            if kind == 'node':
+                node_ids.update(zip(
+                    chunk,
+                    (record['id'] for record in records)
+                ))
+            report(BatchReport(
+                kind, key, len(chunk), time.perf_counter() - started
+            ))
+
+    def _batches(self, nodes, relationships, batch_size, node_ids):
+        """
+        Plan the UNWIND statements write the nodes then the relationships
+
+        The relationship statements are built lazily, the ids of the written
+        nodes must be put into node_ids before iterate to them.
+
+        Yields:
+          (kind, key, chunk, (query, params))
+        """
+        merge_keys = self._merge_keys
+
+        for labels, group in group_nodes(nodes).items():
+            key_label, keys = merge_keys.of(labels)
+            if key_label is None:
+                build_batch = functools.partial(build_node_batch, labels)
+            else:
+                build_batch = functools.partial(
+                    build_node_merge_batch,
+                    key_label,
+                    keys,
+                    labels
+                )
+
+            for chunk in chunks(group, batch_size):
+                yield 'node', labels, chunk, build_batch(chunk)
+
+        for type, group in group_relationships(relationships).items():
+            created = []
+            merged = []
+            for rel in group:
+                if merge_keys.merges(rel):
+                    merged.append(rel)
+                else:
+                    created.append(rel)
+
+            for merge, rels in ((False, created), (True, merged)):
+                if len(rels) == 0:
+                    continue
+
+                for chunk in chunks(rels, batch_size):
+                    statement = build_relationship_batch(
+                        type,
+                        chunk,
+                        node_ids,
+                        merge=merge
+                    )
+                    yield 'relationship', type, chunk, statement
 
     @property
     def config(self):
         return copy.copy(self._config)
 
-    def _run(self, cypher_query):
-        if self._driver is None:
-            config = self.config
-            self._driver = GraphDatabase.driver(
-                config['URI'],
-                auth=basic_auth(config["USER"], config["PASSWORD"])
-            )
+    def close(self):
+        """Release the driver, it is closed if no other graph refers to it"""
+        driver = self._release_driver()
+        if driver is not None:
+            driver.close()
+
+    def _driver_key(self):
+        config = self._config
+        return (self.engine, config['URI'], config['USER'],
+                config['PASSWORD']) + tuple(
+            config.get(key) for key, _ in _DRIVER_CONFIG
+        )
+
+    def _driver_config(self):
+        config = self._config
+        return dict(
+            (driver_key, config[key]) for key, driver_key in _DRIVER_CONFIG
+            if config.get(key) is not None
+        )
+
+    def _acquire_driver(self):
+        with _drivers_lock:
+            if self._driver is None:
+                key = self._driver_key()
+                entry = _drivers.get(key)
+                if entry is None:
+                    entry = _drivers[key] = [self._new_driver(), 0]
+
+                entry[1] += 1
+                self._driver = entry[0]
+
+            return self._driver
+
+    def _release_driver(self):
+        """
+        Returns:
+          the driver should be closed, None if still in use or no driver
+        """
+        with _drivers_lock:
+            driver, self._driver = self._driver, None
+            if driver is None:
+                return None
+
+            key = self._driver_key()
+            entry = _drivers.get(key)
+            if entry is None or entry[0] is not driver:
+                return driver
+
+            entry[1] -= 1
+            if entry[1] > 0:
+                return None
+
+            del _drivers[key]
+            return driver
+
+    def _new_driver(self):
+        config = self.config
+        return GraphDatabase.driver(
+            config['URI'],
+            auth=basic_auth(config["USER"], config["PASSWORD"]),
+            **self._driver_config()
+        )
+
+    def _session(self, **session_config):
+        driver = self._driver
+        if driver is None:
+            driver = self._acquire_driver()
+
+        return driver.session(**session_config)
+
+    def _run(self, cypher_query, params=None):
+        """
+        Returns:
+          RecordsProxy of the records, they are buffered before the session
+          closed, the driver result can't be read after
+        """
+        with self._session() as session:
+            return RecordsProxy(session.run(cypher_query, params)).buffer()
+
+    def _run_cached(self, gquery, cypher_query, params):
+        cache = self._result_cache
+        if cache.maxsize == 0:
+            return self._run(cypher_query, params)
+
+        key = (cypher_query, _freeze(params))
+        proxy = cache.get(key)
+        if proxy is None:
+            generation = cache.generation
+            proxy = self._run(cypher_query, params)
+            cache.put(key, proxy, _query_tags(gquery), generation)
+
+        return proxy
+
+    def _invalidate(self, batches):
+        """Drop the cached results read what the batches written"""
+        if self._result_cache.maxsize == 0 or len(batches) == 0:
+            return
+
+        tags = set()
+        for batch in batches:
+            if batch.kind == 'node':
+                tags.update(batch.key)
+            else:
+                tags.add(batch.key)
+
+        self._result_cache.invalidate(tags)
+
+
+class Neo4jTransaction:
+    """
+    Explicit transaction on one session, see Neo4jGraph.transaction
+
+    The statements are sent without waiting for the results of the former
+    ones, the driver pipelines them, only the node batches of push wait for
+    the created ids. The fetched records are buffered before the commit so
+    the results can be read after it.
+
+    """
+
+    __slots__ = ('_graph', '_session', '_tx', '_pending', '_batches',
+                 '_closed')
+
+    def __init__(self, graph):
+        self._graph = graph
+        self._session = graph._session()
+        try:
+            self._tx = self._session.begin_transaction()
+        except BaseException:
+            self._session.close()
+            raise
+
+        self._pending = []
+        self._batches = []
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if self._closed:
+            return
+
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def fetch(self, gquery):
+        """
+        Returns:
+          Result, the records are pulled when first accessed or at commit
+        """
+        self._check_open()
+
+        if _never_matches(gquery):
+            return Result(DummyEmptyGraphProxy())
+
+        proxy = RecordsProxy(self._tx.run(*self._graph.compile(gquery)))
+        self._pending.append(proxy)
+        return Result(proxy)
+
+    def push(self, *graph_entities, batch_size=None, on_batch=None):
+        """
+        See also Neo4jGraph.push, all the batches are in this transaction
+        """
+        self._check_open()
+
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        _nodes, _relationships = split_entities(graph_entities)
+        if len(_nodes) == 0:
+            return PushResult(DummyEmptyGraphProxy())
+
+        batches = []
+        self._graph._write(
+            self._tx.run,
+            [n for n in _nodes if n.id is None],
+            _relationships,
+            batch_size,
+            reporter(batches, on_batch)
+        )
+        self._batches.extend(batches)
+        return PushResult(DummyEmptyGraphProxy(), batches)
+
+    def commit(self):
+        self._check_open()
+        try:
+            for proxy in self._pending:
+                proxy.buffer()
+            self._tx.commit()
+        except BaseException:
+            self._close(rollback=True, quiet=True)
+            raise
+
+        self._graph._invalidate(self._batches)
+        self._close()
+
+    def rollback(self):
+        self._check_open()
+        self._close(rollback=True)
+
+    def _close(self, rollback=False, quiet=False):
+        self._closed = True
+        self._pending = []
+        self._batches = []
+        try:
+            if rollback:
+                self._tx.rollback()
+        except Exception:
+            if not quiet:
+                raise
+            logger.debug('rollback failed', exc_info=True)
+        finally:
+            self._session.close()
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError('transaction is closed')
+
+
+def _parse_indexes(records):
+    indexes = []
+    for record in records:
+        labels, properties = record['labelsOrTypes'], record['properties']
+        if not labels or not properties:
+            continue
+
+        for label in labels:
+            indexes.append(Index(
+                label,
+                tuple(properties),
+                record['owningConstraint'] is not None
+            ))
+    return indexes
+
+
+def _index_hints(schema, properties):
+    """
+    Returns:
+      (alias, label, property) of the indexes to hint, one per node
+    """
+    hints = []
+    aliases = set()
+    for alias, label, property, hintable in properties:
+        if not hintable or alias in aliases or \
+                schema.index_for(label, property) is None:
+            continue
+        aliases.add(alias)
+        hints.append((alias, label, property))
+    return hints
+
+
+def _never_matches(gquery):
+    """Whether the query is known to fetch nothing without a round trip"""
+    if gquery is None or gquery.limit() == 0:
+        return True
+
+    if isinstance(gquery, BoundQuery):
+        gquery = gquery.prepared.query
+    return gquery.optimized() is None
+
+
+def _query_tags(gquery):
+    """Labels and relationship types read by the query, for ResultCache"""
+    if isinstance(gquery, BoundQuery):
+        gquery = gquery.prepared.query
+
+    tags = set()
+    for entity in gquery.queryfor:
+        if entity.is_edge():
+            tags.add(entity.type or ResultCache.ANY)
+            entities = list(entity.nodes)
+        else:
+            entities = [entity]
+
+        for ent in entities:
+            if ent.is_node() and len(ent.labels) > 0:
+                tags.update(ent.labels)
+            else:
+                tags.add(ResultCache.ANY)
+
+    return tags
+
+
+def _freeze(value):
+    """Hashable equivalent of the params"""
+    if isinstance(value, dict):
+        return tuple(sorted(
+            ((k, _freeze(v)) for k, v in value.items()),
+            key=lambda item: item[0]
+        ))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _run_in_transaction(session, cypher_query, params):
+    with session.begin_transaction() as tx:
+        return list(tx.run(cypher_query, params))
+
+
+class RecordsProxy:
+    """
+    Proxy for the records of a query, they are buffered when first accessed
+    or by buffer(), the graph is collected from them
+    """
+
+    __slots__ = ('_source', '_records')
+
+    def __init__(self, records):
+        self._source = records
+        self._records = None
+
+    def buffer(self):
+        if self._records is None:
+            self._records = list(self._source)
+            self._source = None
+        return self
+
+    def records(self):
+        return iter(self.buffer()._records)
+
+    def graph(self):
+        return _CollectedGraph(self.buffer()._records)
+
+
+class _CollectedGraph:
+
+    __slots__ = ('nodes', 'relationships')
+
+    def __init__(self, records):
+        nodes = {}
+        relationships = {}
+
+        def collect(value):
+            if hasattr(value, 'relationships') and hasattr(value, 'nodes'):
+                for node in value.nodes:
+                    collect(node)
+                for rel in value.relationships:
+                    collect(rel)
+            elif hasattr(value, 'start_node'):
+                relationships[_identity(value)] = value
+                collect(value.start_node)
+                collect(value.end_node)
+            elif hasattr(value, 'labels'):
+                nodes[_identity(value)] = value
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    collect(item)
+
+        for record in records:
+            for value in record.values():
+                collect(value)
 
-        with self._driver.session() as session:
-            return session.run(cypher_query)
+        self.nodes = tuple(nodes.values())
+        self.relationships = tuple(relationships.values())
 
 
 class DummyEmptyGraphProxy:
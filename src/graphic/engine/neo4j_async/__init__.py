@@ -0,0 +1,6 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+# flake8: noqa
+
+from .graph import AsyncNeo4jGraph, AsyncRecordStream
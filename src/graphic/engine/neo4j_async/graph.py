@@ -0,0 +1,517 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import asyncio
+import time
+
+from neo4j import AsyncGraphDatabase, basic_auth
+
+from graphic.engine import Result, PushResult, BatchReport, NodeIds
+from graphic.engine import FailedProxy
+from graphic.engine.explain import PlanNode
+from graphic.engine.push import split_entities, reporter
+from graphic.engine.neo4j.graph import Neo4jGraph, DummyEmptyGraphProxy
+from graphic.engine.neo4j.graph import RecordsProxy
+from graphic.engine.neo4j.graph import _query_tags, _freeze
+from graphic.engine.neo4j.graph import _never_matches
+from graphic.engine.neo4j.graph import _SHOW_INDEXES, _parse_indexes
+from graphic.query.cypher.compiler import build_index
+from graphic.schema import Index
+
+
+__all__ = ['AsyncNeo4jGraph', 'AsyncNeo4jTransaction',
+           'AsyncRecordStream']
+
+
+class AsyncNeo4jGraph(Neo4jGraph):
+    """
+    Asyncio engine for neo4j, fetch and push are awaitable
+
+    It shares the compiler, compile cache and merge keys with Neo4jGraph.
+    Each call runs on its own session taken from the connection pool of one
+    driver, so many queries can be in flight without blocking the event
+    loop. Need the neo4j driver with asyncio support(neo4j>=5).
+
+    """
+
+    __slots__ = ()
+
+    engine = 'graphic.engine.neo4j_async'
+
+    async def fetch(self, gquery, stream=False, fetch_size=None):
+        """
+        Args:
+          gquery: GQuery or BoundQuery instance
+          stream: return AsyncRecordStream iterate the records as they
+                  arrive, the session is kept open until it is drained or
+                  closed
+          fetch_size: records pulled from the server each time
+
+        Returns:
+          Result or AsyncRecordStream if stream
+        """
+        if _never_matches(gquery):
+            if stream:
+                return AsyncRecordStream(_NoRecords())
+            return Result(DummyEmptyGraphProxy())
+
+        cypher_query, params = self.compile(gquery)
+
+        cache = self._result_cache
+        if not stream and cache.maxsize > 0:
+            key = (cypher_query, _freeze(params))
+            proxy = cache.get(key)
+            if proxy is not None:
+                return Result(proxy)
+            generation = cache.generation
+
+        if fetch_size is None:
+            session = self._session()
+        else:
+            session = self._session(fetch_size=fetch_size)
+
+        try:
+            result = await session.run(cypher_query, params)
+            if stream:
+                return AsyncRecordStream(result, session.close)
+
+            records = [record async for record in result]
+        except BaseException:
+            await session.close()
+            raise
+
+        await session.close()
+
+        proxy = RecordsProxy(records)
+        if cache.maxsize > 0:
+            cache.put(key, proxy, _query_tags(gquery), generation)
+        return Result(proxy)
+
+    async def fetch_many(self, gqueries, max_workers=None):
+        """
+        See also Neo4jGraph.fetch_many, the queries run on the event loop
+
+        Args:
+          max_workers: max queries in flight at the same time, default as
+                       many as the queries, up to 32
+        """
+        gqueries = list(gqueries)
+        if len(gqueries) == 0:
+            return []
+
+        if max_workers is None:
+            max_workers = min(32, len(gqueries))
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(gquery):
+            async with semaphore:
+                try:
+                    return await self.fetch(gquery)
+                except Exception as error:
+                    return Result(FailedProxy(error))
+
+        return list(await asyncio.gather(
+            *(fetch(gquery) for gquery in gqueries)
+        ))
+
+    async def push(self, *graph_entities, batch_size=None, on_batch=None):
+        """See also Neo4jGraph.push"""
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        _nodes, _relationships = split_entities(graph_entities)
+        if len(_nodes) == 0:
+            return PushResult(DummyEmptyGraphProxy())
+
+        _nodes = [n for n in _nodes if n.id is None]
+        batches = []
+        report = reporter(batches, on_batch)
+
+        try:
+            async with self._session() as session:
+                if batch_size is None:
+                    tx = await session.begin_transaction()
+                    async with tx:
+                        async def run(query, params):
+                            result = await tx.run(query, params)
+                            return [record async for record in result]
+
+                        await self._write_async(
+                            run, _nodes, _relationships, batch_size, report
+                        )
+                else:
+                    await self._write_async(
+                        lambda query, params: _run_in_transaction(
+                            session,
+                            query,
+                            params
+                        ),
+                        _nodes,
+                        _relationships,
+                        batch_size,
+                        report
+                    )
+        finally:
+            self._invalidate(batches)
+
+        return PushResult(DummyEmptyGraphProxy(), batches)
+
+    async def push_stream(self, graph_entities, batch_size=1000,
+                          on_batch=None):
+        """
+        See also Neo4jGraph.push_stream
+
+        Args:
+          graph_entities: iterable or async iterable of nodes, relationships
+        """
+        if batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        batches = []
+        report = reporter(batches, on_batch)
+        node_ids = NodeIds()
+
+        try:
+            async with self._session() as session:
+                async def flush(nodes, relationships):
+                    for rel in relationships:
+                        nodes.extend(rel.nodes)
+
+                    await self._write_async(
+                        lambda query, params: _run_in_transaction(
+                            session,
+                            query,
+                            params
+                        ),
+                        [
+                            n for n in nodes
+                            if n.id is None and n not in node_ids
+                        ],
+                        relationships,
+                        batch_size,
+                        report,
+                        node_ids=node_ids
+                    )
+
+                _nodes = []
+                _relationships = []
+                async for ent in _aiter(graph_entities):
+                    if ent.is_node():
+                        _nodes.append(ent)
+                    if ent.is_edge():
+                        _relationships.append(ent)
+
+                    if len(_nodes) + len(_relationships) >= batch_size:
+                        await flush(_nodes, _relationships)
+                        _nodes = []
+                        _relationships = []
+
+                if len(_nodes) + len(_relationships) > 0:
+                    await flush(_nodes, _relationships)
+        finally:
+            self._invalidate(batches)
+
+        return PushResult(DummyEmptyGraphProxy(), batches)
+
+    def transaction(self):
+        """
+        See also Neo4jGraph.transaction, begun by async with:
+
+        async with graph.transaction() as tx:
+            await tx.push(geek)
+            geeks = await tx.fetch(graphic.node('Geek').query)
+
+        Returns:
+          AsyncNeo4jTransaction instance
+        """
+        return AsyncNeo4jTransaction(self)
+
+    async def explain(self, gquery):
+        """See also Neo4jGraph.explain"""
+        return await self._plan('EXPLAIN', gquery)
+
+    async def profile(self, gquery):
+        """See also Neo4jGraph.profile"""
+        return await self._plan('PROFILE', gquery)
+
+    async def _plan(self, prefix, gquery):
+        cypher_query, params = self.compile(gquery)
+        async with self._session() as session:
+            result = await session.run(
+                '{} {}'.format(prefix, cypher_query), params
+            )
+            summary = await result.consume()
+
+        return PlanNode.from_plan(
+            summary.profile if prefix == 'PROFILE' else summary.plan
+        )
+
+    async def refresh_schema(self):
+        """See also Neo4jGraph.refresh_schema"""
+        async with self._session() as session:
+            result = await session.run(_SHOW_INDEXES)
+            records = [record async for record in result]
+
+        self._schema.load(_parse_indexes(records))
+        return self._schema
+
+    async def ensure_indexes(self, min_count=1, dry_run=False):
+        """See also Neo4jGraph.ensure_indexes"""
+        missing = self._schema.missing(min_count)
+        statements = [
+            build_index(label, properties) for label, properties in missing
+        ]
+        if dry_run or len(statements) == 0:
+            return statements
+
+        async with self._session() as session:
+            for statement in statements:
+                result = await session.run(statement)
+                async for _ in result:
+                    pass
+
+        self._schema.load(
+            (Index(label, properties, False)
+             for label, properties in missing),
+            replace=False
+        )
+        return statements
+
+    async def close(self):
+        """Release the driver, it is closed if no other graph refers to it"""
+        driver = self._release_driver()
+        if driver is not None:
+            await driver.close()
+
+    def __enter__(self):
+        raise TypeError('use async with for {}'.format(type(self).__name__))
+
+    def __exit__(self, *args):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _write_async(self, run, nodes, relationships, batch_size,
+                           report, node_ids=None):
+        """See also Neo4jGraph._write, run is a coroutine function"""
+        if node_ids is None:
+            node_ids = NodeIds()
+
+        for kind, key, chunk, statement in self._batches(
+            nodes,
+            relationships,
+            batch_size,
+            node_ids
+        ):
+            started = time.perf_counter()
+            records = await run(*statement)
+            if kind == 'node':
+                node_ids.update(zip(
+                    chunk,
+                    (record['id'] for record in records)
+                ))
+            report(BatchReport(
+                kind, key, len(chunk), time.perf_counter() - started
+            ))
+
+    def _new_driver(self):
+        config = self.config
+        return AsyncGraphDatabase.driver(
+            config['URI'],
+            auth=basic_auth(config["USER"], config["PASSWORD"]),
+            **self._driver_config()
+        )
+
+
+class AsyncNeo4jTransaction:
+    """
+    Explicit transaction on one session, see AsyncNeo4jGraph.transaction
+
+    The session is opened when entering the async with block, the fetched
+    records are pulled at once.
+    """
+
+    __slots__ = ('_graph', '_session', '_tx', '_batches', '_closed')
+
+    def __init__(self, graph):
+        self._graph = graph
+        self._session = None
+        self._tx = None
+        self._batches = []
+        self._closed = False
+
+    async def __aenter__(self):
+        if self._closed or self._tx is not None:
+            raise RuntimeError('transaction is begun')
+
+        self._session = self._graph._session()
+        try:
+            self._tx = await self._session.begin_transaction()
+        except BaseException:
+            self._closed = True
+            await self._session.close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, *args):
+        if self._closed:
+            return
+
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.rollback()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    async def fetch(self, gquery):
+        """Returns Result, the pushes of the transaction are seen"""
+        self._check_open()
+
+        if _never_matches(gquery):
+            return Result(DummyEmptyGraphProxy())
+
+        return Result(RecordsProxy(await self._run(
+            *self._graph.compile(gquery)
+        )))
+
+    async def push(self, *graph_entities, batch_size=None, on_batch=None):
+        """
+        See also Neo4jGraph.push, all the batches are in this transaction
+        """
+        self._check_open()
+
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        _nodes, _relationships = split_entities(graph_entities)
+        if len(_nodes) == 0:
+            return PushResult(DummyEmptyGraphProxy())
+
+        batches = []
+        await self._graph._write_async(
+            self._run,
+            [n for n in _nodes if n.id is None],
+            _relationships,
+            batch_size,
+            reporter(batches, on_batch)
+        )
+        self._batches.extend(batches)
+        return PushResult(DummyEmptyGraphProxy(), batches)
+
+    async def commit(self):
+        self._check_open()
+        try:
+            await self._tx.commit()
+        except BaseException:
+            await self._close(rollback=True, quiet=True)
+            raise
+
+        self._graph._invalidate(self._batches)
+        await self._close()
+
+    async def rollback(self):
+        self._check_open()
+        await self._close(rollback=True)
+
+    async def _run(self, query, params):
+        result = await self._tx.run(query, params)
+        return [record async for record in result]
+
+    async def _close(self, rollback=False, quiet=False):
+        self._closed = True
+        self._batches = []
+        try:
+            if rollback:
+                await self._tx.rollback()
+        except Exception:
+            if not quiet:
+                raise
+        finally:
+            await self._session.close()
+
+    def _check_open(self):
+        if self._closed or self._tx is None:
+            raise RuntimeError('transaction is not open')
+
+
+class AsyncRecordStream:
+    """
+    Async iterator over the records as they arrive from the server, see
+    also graphic.engine.RecordStream
+
+    async with await graph.fetch(query, stream=True) as records:
+        async for record in records:
+            ...
+
+    """
+
+    __slots__ = ('_records', '_on_close', '_closed')
+
+    def __init__(self, records, on_close=None):
+        self._records = records.__aiter__()
+        self._on_close = on_close
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+
+        try:
+            return await self._records.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    async def aclose(self):
+        if self._closed:
+            return
+
+        self._closed = True
+        self._records = _NoRecords()
+        if self._on_close is not None:
+            await self._on_close()
+
+
+class _NoRecords:
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+async def _run_in_transaction(session, cypher_query, params):
+    tx = await session.begin_transaction()
+    async with tx:
+        result = await tx.run(cypher_query, params)
+        return [record async for record in result]
+
+
+async def _aiter(iterable):
+    if hasattr(iterable, '__aiter__'):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
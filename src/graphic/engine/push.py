@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import logging
+import time
+from collections import OrderedDict
+
+from graphic.engine import BatchReport
+
+
+__all__ = ['MergeKeys', 'LocalWriter', 'merge_rows', 'split_entities',
+           'group_nodes', 'group_relationships', 'reporter', 'chunks']
+
+
+logger = logging.getLogger(__name__)
+
+
+class MergeKeys:
+    """
+    The merge keys declared per label, see RemoteGraph.merge_on, shared by
+    the engines to tell which pushed nodes, relationships are merged
+    instead of created
+    """
+
+    __slots__ = ('_keys', )
+
+    def __init__(self, config=None):
+        """
+        Args:
+          config: label -> key or tuple of keys, ie: the MERGE_KEYS config
+        """
+        self._keys = {}
+        for label, keys in (config or {}).items():
+            if isinstance(keys, str):
+                keys = (keys, )
+            self.declare(label, *keys)
+
+    def declare(self, label, *keys):
+        if len(keys) == 0:
+            raise ValueError('merge on {} without keys'.format(label))
+
+        self._keys[label] = tuple(keys)
+
+    def items(self):
+        return self._keys.items()
+
+    def as_dict(self):
+        return dict(self._keys)
+
+    def __bool__(self):
+        return len(self._keys) > 0
+
+    def of(self, labels):
+        """
+        Returns:
+          (label, keys) of the first declared label, (None, ()) if none
+        """
+        for label in labels:
+            if label in self._keys:
+                return label, self._keys[label]
+        return None, ()
+
+    def rows(self, labels, nodes):
+        """
+        The properties of the nodes with the labels, to create or merge
+
+        Raises:
+          ValueError: node without its merge keys
+
+        Returns:
+          ((label, keys), rows), see of and merge_rows
+        """
+        keys = self.of(labels)
+        return keys, merge_rows(keys[1], nodes)
+
+    def is_merged(self, node):
+        """Whether the node is matched instead of created, or has an id"""
+        return node.id is not None or any(
+            label in self._keys for label in node.labels
+        )
+
+    def merges(self, relationship):
+        """
+        Whether the relationship is merged, only when any keys declared,
+        ie: the upsert mode, and both of its nodes are matched, so pushing
+        it again is idempotent
+        """
+        return len(self._keys) > 0 and all(
+            self.is_merged(node) for node in relationship.nodes
+        )
+
+
+class LocalWriter:
+    """
+    The push of the engines write the entities in process, ie: memory and
+    sqlite. The given node ids and the merge keys of the new nodes are all
+    checked before anything written, then the nodes and the relationships
+    are written group by group in chunks of batch_size, each chunk is
+    reported as a BatchReport.
+
+    The engines implement check, write_nodes and write_relationships.
+
+    """
+
+    __slots__ = ('merge_keys', 'node_ids')
+
+    def __init__(self, merge_keys, node_ids):
+        """
+        Args:
+          merge_keys: MergeKeys of the graph
+          node_ids: NodeIds of the nodes written before, updated with the
+                    nodes written
+        """
+        self.merge_keys = merge_keys
+        self.node_ids = node_ids
+
+    def write(self, nodes, relationships, batch_size, report):
+        """
+        Raises:
+          KeyError: node with id which is not in the graph
+          ValueError: node without its merge keys
+        """
+        node_ids = self.node_ids
+        self.check(set(node.id for node in nodes if node.id is not None))
+
+        relationship_groups = group_relationships(relationships)
+        node_groups = []
+        for labels, group in group_nodes(
+            n for n in nodes if n.id is None and n not in node_ids
+        ).items():
+            keys, rows = self.merge_keys.rows(labels, group)
+            node_groups.append((labels, keys, list(zip(group, rows))))
+
+        for labels, keys, pairs in node_groups:
+            for chunk in chunks(pairs, batch_size):
+                start = time.perf_counter()
+                self.write_nodes(labels, keys, chunk)
+                report(BatchReport(
+                    'node', labels, len(chunk), time.perf_counter() - start
+                ))
+
+        for type, group in relationship_groups.items():
+            for chunk in chunks(group, batch_size):
+                start = time.perf_counter()
+                self.write_relationships(type, chunk)
+                report(BatchReport(
+                    'relationship', type, len(chunk),
+                    time.perf_counter() - start
+                ))
+
+    def stored(self, node):
+        """The id of the node in the graph, given or written"""
+        if node.id is None:
+            return self.node_ids[node]
+        return node.id
+
+    def check(self, ids):
+        """
+        Raises:
+          KeyError: of the node ids not in the graph
+        """
+        raise NotImplementedError
+
+    def write_nodes(self, labels, keys, chunk):
+        """
+        Write the new nodes, and put their ids into node_ids
+
+        Args:
+          keys: (key label, keys), see MergeKeys.of
+          chunk: list of (node, properties)
+        """
+        raise NotImplementedError
+
+    def write_relationships(self, type, chunk):
+        """
+        Args:
+          chunk: list of the relationships of the type
+        """
+        raise NotImplementedError
+
+
+def merge_rows(keys, nodes):
+    """
+    The properties of the nodes to create or merge on the keys
+
+    Raises:
+      ValueError: node without the keys
+
+    Returns:
+      list of dict
+    """
+    rows = []
+    for node in nodes:
+        row = dict((key, val) for key, val in node)
+        missing = [key for key in keys if key not in row]
+        if missing:
+            raise ValueError('{} miss merge keys {}'.format(
+                node, ', '.join(missing)
+            ))
+        rows.append(row)
+    return rows
+
+
+def split_entities(graph_entities):
+    """
+    Returns:
+      (nodes, relationships), nodes include the relationship endpoints
+    """
+    nodes = []
+    relationships = []
+
+    for ent in graph_entities:
+        if ent.is_node():
+            nodes.append(ent)
+        if ent.is_edge():
+            relationships.append(ent)
+            nodes.extend(ent.nodes)
+
+    return nodes, relationships
+
+
+def group_nodes(iterable_nodes):
+    """
+    Group the nodes by label set, the same node object passed twice is
+    kept once. Equal nodes are not dropped, without id they equal by alias
+    and labels only.
+
+    Returns:
+      OrderedDict, sorted labels tuple -> list of nodes
+    """
+    groups = OrderedDict()
+    seen = set()
+    for node in iterable_nodes:
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        groups.setdefault(tuple(sorted(node.labels)), []).append(node)
+
+    return groups
+
+
+def group_relationships(iterable_relationships):
+    """
+    Group the relationships by type, the same relationship object passed
+    twice is kept once
+
+    Returns:
+      OrderedDict, type -> list of relationships
+    """
+    groups = OrderedDict()
+    seen = set()
+    for rel in iterable_relationships:
+        if rel.type is None:
+            raise KeyError('New relationship must with type')
+        if id(rel) in seen:
+            continue
+        seen.add(id(rel))
+        groups.setdefault(rel.type, []).append(rel)
+
+    return groups
+
+
+def reporter(batches, on_batch):
+    """
+    Returns:
+      callable collect the BatchReport into batches and pass it to the
+      on_batch callback if given
+    """
+    def report(batch):
+        logger.debug(
+            'pushed %s batch %s: %d in %.3fs',
+            batch.kind, batch.key, batch.count, batch.seconds
+        )
+        batches.append(batch)
+        if on_batch is not None:
+            on_batch(batch)
+
+    return report
+
+
+def chunks(seq, size):
+    """Slices of the size, the whole seq if size is None"""
+    if size is None:
+        yield seq
+        return
+
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from collections import OrderedDict, namedtuple
+
+from graphic.query.cypher.compiler import Parameters
+from graphic.query.func import Func, Aggregation
+from graphic.query.query_utils import Q, Field
+
+
+__all__ = ['Statement', 'compile_sql']
+
+
+Statement = namedtuple('Statement', ['sql', 'columns', 'list_params'])
+Statement.__doc__ = """
+SQL compiled from a GQuery
+
+  sql: the SELECT, the filter values are named parameters($p0, ...)
+  columns: (key, kind) of the selected columns, kind is one of node,
+           relationship(the id is selected), value, predicate
+  list_params: names of the parameters compared by IN
+"""
+
+
+_COMPARISONS = {'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+# compare between different kinds of values is null in cypher, SQLite
+# orders them instead
+_SAME_KIND = (
+    "(typeof({x}) IN ('integer', 'real') AND "
+    "typeof({v}) IN ('integer', 'real') OR "
+    "typeof({x}) = 'text' AND typeof({v}) = 'text')"
+)
+
+_TEXTS = "typeof({x}) = 'text' AND typeof({v}) = 'text'"
+
+_STRING_OPERATORS = {
+    'startswith': 'substr({x}, 1, length({v})) = {v}',
+    'endswith': '(length({v}) = 0 OR substr({x}, -length({v})) = {v})',
+    'contains': 'instr({x}, {v}) > 0',
+}
+
+_AGGREGATIONS = {
+    'count': 'count({})',
+    'sum': 'coalesce(sum({}), 0)',
+    'avg': 'avg({})',
+    'min': 'min({})',
+    'max': 'max({})',
+}
+
+
+def compile_sql(gquery) -> tuple:
+    """
+    Compile the query to SQL on the tables of graphic.engine.sqlite.schema,
+    see PreparedQuery.compiled
+
+    Each node is matched by its label rows, or the nodes table if it has
+    no labels, each relationship by a row of the relationships table
+    joined to its endpoints. The properties referred are left joined by
+    (id, key), so a missing one is null.
+
+    The predicates keep the cypher null semantics as SQL does, the top
+    level AND conjuncts are written so the indexes of the property values
+    can be used.
+
+    Returns:
+      (Statement, params), params are the filter values not encoded yet,
+      see graphic.engine.sqlite.schema.encode_params
+    """
+    scope = _Scope(gquery.context)
+    for entity in gquery.queryfor:
+        scope.match(entity)
+
+    params = Parameters()
+    list_params = set()
+    where = _compile_q(gquery.where, scope, params, list_params, top=True)
+
+    columns = _columns(gquery, scope, params, list_params)
+    grouped = any(kind == 'aggregation' for _, kind, _ in columns)
+    # may join the property ordered by
+    order_by = _order_by(gquery, scope, columns, grouped)
+
+    clause_list = [
+        'SELECT {}'.format(', '.join(expr for _, _, expr in columns)),
+        'FROM {}'.format(', '.join(scope.tables)),
+    ]
+    clause_list.extend(scope.joins)
+
+    conditions = list(scope.conditions)
+    if where:
+        conditions.append(where)
+    if conditions:
+        clause_list.append('WHERE {}'.format(' AND '.join(conditions)))
+
+    group_by = [expr for _, kind, expr in columns if kind != 'aggregation']
+    if grouped and group_by:
+        clause_list.append('GROUP BY {}'.format(', '.join(group_by)))
+
+    if order_by:
+        clause_list.append(order_by)
+
+    clause_list.append('LIMIT {:d}'.format(gquery.limit()))
+
+    statement = Statement(
+        ' '.join(clause_list),
+        tuple(
+            (key, 'value' if kind == 'aggregation' else kind)
+            for key, kind, _ in columns
+        ),
+        frozenset(list_params)
+    )
+    return statement, params.values
+
+
+class _Scope:
+    """Tables, joins and conditions of the matched entities"""
+
+    __slots__ = ('_context', '_ids', '_relationships', '_properties',
+                 'tables', 'joins', 'conditions')
+
+    def __init__(self, context):
+        self._context = context
+        # alias -> (kind, id expression)
+        self._ids = {}
+        self._relationships = []
+        # (alias, key) -> value expression
+        self._properties = OrderedDict()
+        self.tables = []
+        self.joins = []
+        self.conditions = []
+
+    def match(self, entity):
+        if entity.is_node():
+            return self._match_node(entity)
+
+        if entity.is_edge():
+            return self._match_relationship(entity)
+
+        raise NotImplementedError('Not support path yet!')
+
+    def _match_node(self, node):
+        labels = sorted(node.labels)
+        if node.alias in self._ids:
+            id = self._ids[node.alias][1]
+        elif len(labels) == 0:
+            table = 'n{}'.format(len(self.tables))
+            self.tables.append('nodes AS {}'.format(table))
+            id = '{}.id'.format(table)
+            self._ids[node.alias] = ('node', id)
+            return id
+        else:
+            id = None
+
+        for label in labels:
+            table = 'l{}'.format(len(self.tables))
+            self.tables.append('node_labels AS {}'.format(table))
+            self.conditions.append(
+                '{}.label = {}'.format(table, _quote(label))
+            )
+            if id is None:
+                id = '{}.node_id'.format(table)
+                self._ids[node.alias] = ('node', id)
+            else:
+                self.conditions.append('{}.node_id = {}'.format(table, id))
+
+        return id
+
+    def _match_relationship(self, rel):
+        if rel.alias in self._ids:
+            raise ValueError(
+                'relationship {} is matched twice'.format(rel.alias)
+            )
+
+        start = self._match_node(rel.node_from)
+        end = self._match_node(rel.node_to)
+
+        table = 'r{}'.format(len(self.tables))
+        self.tables.append('relationships AS {}'.format(table))
+        if rel.type is not None:
+            self.conditions.append(
+                '{}.type = {}'.format(table, _quote(rel.type))
+            )
+
+        if rel.with_direction:
+            self.conditions.append(
+                '{0}.start_id = {1} AND {0}.end_id = {2}'.format(
+                    table, start, end
+                )
+            )
+        else:
+            self.conditions.append(
+                '({0}.start_id = {1} AND {0}.end_id = {2} OR '
+                '{0}.start_id = {2} AND {0}.end_id = {1})'.format(
+                    table, start, end
+                )
+            )
+
+        # a relationship is matched once in a pattern
+        for other in self._relationships:
+            self.conditions.append('{}.id <> {}.id'.format(table, other))
+
+        self._relationships.append(table)
+        self._ids[rel.alias] = ('relationship', '{}.id'.format(table))
+
+    def resolve(self, exp) -> Field:
+        field = self._context.lookup_field(exp)
+        if field.entity is None or field.entity.alias not in self._ids:
+            raise KeyError(
+                '{} refer to none of the query entities'.format(exp)
+            )
+        return field
+
+    def id(self, alias):
+        return self._ids[alias][1]
+
+    def kind(self, alias):
+        return self._ids[alias][0]
+
+    def value(self, field):
+        """SQL expression of the field value"""
+        alias, key = field.entity.alias, field.name
+        if key == Field.PK:
+            return self.id(alias)
+
+        try:
+            return self._properties[(alias, key)]
+        except KeyError:
+            pass
+
+        kind = self.kind(alias)
+        table = 'p{}'.format(len(self._properties))
+        self.joins.append(
+            'LEFT JOIN {0}_properties AS {1} ON {1}.{0}_id = {2} '
+            'AND {1}.key = {3}'.format(kind, table, self.id(alias),
+                                       _quote(key))
+        )
+        expr = '{}.value'.format(table)
+        self._properties[(alias, key)] = expr
+        return expr
+
+
+def _compile_q(q, scope, params, list_params, top=False):
+    if isinstance(q, Func):
+        return _compile_func(q, scope, params, list_params, top)
+
+    if len(q) == 0:
+        return ''
+
+    # null and false drop the row alike only out of NOT, OR
+    top = top and not q.negated and (q.connector == Q.AND or len(q) == 1)
+    parts = [
+        part for part in (
+            _compile_q(child, scope, params, list_params, top)
+            for child in q.children
+        ) if part
+    ]
+    if len(parts) == 0:
+        return ''
+
+    sql = '({})'.format(' {} '.format(q.connector).join(parts))
+    if q.negated:
+        return 'NOT {}'.format(sql)
+    return sql
+
+
+def _compile_func(func, scope, params, list_params, top):
+    name = type(func).__name__
+    x = scope.value(scope.resolve(func.field))
+    v = params.add(func.value)
+
+    if name == 'eq':
+        return '{} = {}'.format(x, v)
+
+    if name == 'neq':
+        return '{} <> {}'.format(x, v)
+
+    if name == 'in':
+        list_params.add(v[1:])
+        return '{} IN (SELECT value FROM json_each({}))'.format(x, v)
+
+    if name in _COMPARISONS:
+        compare = '{} {} {}'.format(x, _COMPARISONS[name], v)
+        same_kind = _SAME_KIND.format(x=x, v=v)
+        if top:
+            # the bare comparison is the one the indexes can answer
+            return '({} AND {})'.format(compare, same_kind)
+        return 'CASE WHEN {} THEN {} END'.format(same_kind, compare)
+
+    if name in _STRING_OPERATORS:
+        return 'CASE WHEN {} THEN {} END'.format(
+            _TEXTS.format(x=x, v=v),
+            _STRING_OPERATORS[name].format(x=x, v=v)
+        )
+
+    raise NotImplementedError('not support {} in sqlite'.format(name))
+
+
+def _columns(gquery, scope, params, list_params):
+    """
+    Returns:
+      list of (key, kind, expression), ordered by the key
+    """
+    returns = gquery.returns
+    if len(returns) == 0:
+        return [
+            (entity.alias, scope.kind(entity.alias), scope.id(entity.alias))
+            for entity in gquery.queryfor
+        ]
+
+    lookup_field = gquery.context.lookup_field
+    columns = []
+    for select in returns:
+        if isinstance(select, Aggregation):
+            x = scope.value(scope.resolve(select.field))
+            columns.append((
+                select(lookup_field=lookup_field),
+                'aggregation',
+                _AGGREGATIONS[type(select).__name__].format(x)
+            ))
+        elif isinstance(select, Func):
+            columns.append((
+                select(lookup_field=lookup_field),
+                'predicate',
+                _compile_func(select, scope, params, list_params, False)
+            ))
+        else:
+            columns.append((
+                str(select),
+                'value',
+                scope.value(select)
+            ))
+
+    return sorted(columns, key=lambda column: column[0])
+
+
+def _order_by(gquery, scope, columns, grouped):
+    terms = []
+    for exp, descending in gquery.order_keys():
+        field = scope.resolve(exp)
+        if grouped and str(field) not in [key for key, _, _ in columns]:
+            raise ValueError(
+                'can not order by {} which is not returned'.format(field)
+            )
+
+        # null is the last in ascending as cypher
+        x = scope.value(field)
+        if descending:
+            terms.append('{0} IS NULL DESC, {0} DESC'.format(x))
+        else:
+            terms.append('{0} IS NULL, {0}'.format(x))
+
+    if len(terms) == 0:
+        return ''
+    return 'ORDER BY {}'.format(', '.join(terms))
+
+
+def _quote(text):
+    return "'{}'".format(str(text).replace("'", "''"))
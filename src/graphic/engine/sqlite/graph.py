@@ -0,0 +1,606 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import copy
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from graphic.engine import Result, PushResult, RecordStream
+from graphic.engine import RowsProxy, NodeIds
+from graphic.engine.push import MergeKeys, LocalWriter, split_entities
+from graphic.engine.push import reporter
+from graphic.graph import RemoteGraph, Node, Relationship
+from graphic.gquery import BoundQuery
+
+from .compiler import compile_sql
+from .schema import SCHEMA, encode, decode, encode_params
+
+
+__all__ = ['SqliteGraph', 'SqliteTransaction']
+
+
+_DEFAULT_CONFIG = {
+    "PATH": ':memory:',
+    "MERGE_KEYS": {},
+}
+
+
+class SqliteGraph(RemoteGraph):
+    """
+    Graph persisted in a SQLite database, embedded in the process.
+
+    The nodes, labels, properties and relationships are kept in their own
+    tables, see graphic.engine.sqlite.schema, the queries are compiled to
+    SQL, see graphic.engine.sqlite.compiler.compile_sql.
+
+    Config:
+      PATH: the database file, default is ':memory:', which is lost when
+            the graph is closed
+      MERGE_KEYS: see also Neo4jGraph.merge_on
+
+    Thread safe, the fetches and pushes are serialized by a lock. Only
+    numbers, strings, booleans, lists and maps can be stored as property.
+    """
+
+    __slots__ = ('_config', '_connection', '_lock', '_merge_keys')
+
+    engine = 'graphic.engine.sqlite'
+
+    def __init__(self, *args, **config):
+        self._config = copy.copy(_DEFAULT_CONFIG)
+        self._config.update(config)
+
+        # the transactions are begun explicitly, see _transaction
+        self._connection = sqlite3.connect(
+            self._config['PATH'],
+            isolation_level=None,
+            check_same_thread=False
+        )
+        if self._config['PATH'] != ':memory:':
+            self._connection.execute('PRAGMA journal_mode = WAL')
+            self._connection.execute('PRAGMA synchronous = NORMAL')
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._merge_keys = MergeKeys(self._config['MERGE_KEYS'])
+
+    @property
+    def config(self):
+        return self._config
+
+    def compile(self, gquery):
+        """
+        Args:
+          gquery: GQuery or BoundQuery instance
+
+        Returns:
+          (Statement, params), see compile_sql
+        """
+        if isinstance(gquery, BoundQuery):
+            return gquery.compile(compile_sql)
+
+        return compile_sql(gquery)
+
+    def fetch(self, gquery, stream=False):
+        """
+        Args:
+          gquery: GQuery or BoundQuery instance
+          stream: return RecordStream of the records, for the interface of
+                  Neo4jGraph.fetch only, it is not honored: the rows are all
+                  read at once, a cursor left pending would see the pushes
+                  on the same connection in between
+
+        Returns:
+          Result or RecordStream if stream
+        """
+        if gquery is None or gquery.limit() == 0:
+            if stream:
+                return RecordStream(())
+            return Result(RowsProxy([]))
+
+        statement, params = self.compile(gquery)
+        params = encode_params(params, statement.list_params)
+        with self._lock:
+            rows = self._connection.execute(statement.sql, params).fetchall()
+            records = self._records(statement.columns, rows)
+
+        if stream:
+            return RecordStream(records)
+        return Result(RowsProxy(records))
+
+    def push(self, *graph_entities, batch_size=None, on_batch=None):
+        """
+        Add nodes, relationships to the graph, see also Neo4jGraph.push
+
+        All the entities are written in one transaction, by executemany of
+        the rows of each batch.
+
+        Raises:
+          KeyError: node with id which is not in the graph
+          ValueError: node without its merge keys, nothing is written
+
+        Returns:
+          PushResult, with the BatchReport of each batch
+        """
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        _nodes, _relationships = split_entities(graph_entities)
+        if len(_nodes) == 0:
+            return PushResult(RowsProxy([]))
+
+        batches = []
+        with self._lock, self._transaction() as cursor:
+            self._writer(cursor, NodeIds()).write(
+                _nodes,
+                _relationships,
+                batch_size,
+                reporter(batches, on_batch)
+            )
+
+        return PushResult(RowsProxy([]), batches)
+
+    def push_stream(self, graph_entities, batch_size=1000, on_batch=None):
+        """
+        See also Neo4jGraph.push_stream, each batch is written in its own
+        transaction
+        """
+        if batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        batches = []
+        report = reporter(batches, on_batch)
+        node_ids = NodeIds()
+
+        def flush(buffered):
+            nodes, relationships = split_entities(buffered)
+            with self._lock, self._transaction() as cursor:
+                self._writer(cursor, node_ids).write(
+                    nodes, relationships, batch_size, report
+                )
+
+        buffered = []
+        for ent in graph_entities:
+            buffered.append(ent)
+            if len(buffered) >= batch_size:
+                flush(buffered)
+                buffered = []
+
+        if len(buffered) > 0:
+            flush(buffered)
+
+        return PushResult(RowsProxy([]), batches)
+
+    def transaction(self):
+        """
+        Fetches and pushes in one sqlite transaction, committed once when
+        leaving the with block, rolled back if an exception raised, see
+        also Neo4jGraph.transaction
+
+        The graph is locked until the transaction is closed, by the thread
+        begun it, the fetches of the graph in that thread see the pushes
+        of the transaction.
+
+        Returns:
+          SqliteTransaction instance
+        """
+        return SqliteTransaction(self)
+
+    def close(self):
+        with self._lock:
+            self._connection.execute('PRAGMA optimize')
+            self._connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        cursor = self._connection.cursor()
+        # take the write lock at first, the ids are allocated in it
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
+
+    def _records(self, columns, rows):
+        node_ids = set()
+        relationship_ids = set()
+        for row in rows:
+            for (_, kind), value in zip(columns, row):
+                if kind == 'node':
+                    node_ids.add(value)
+                elif kind == 'relationship':
+                    relationship_ids.add(value)
+
+        cursor = self._connection.cursor()
+        relationships = _load_relationships(cursor, relationship_ids)
+        for _, _, start_id, end_id, _ in relationships.values():
+            node_ids.add(start_id)
+            node_ids.add(end_id)
+        nodes = _load_nodes(cursor, node_ids)
+
+        for id, (_, type, start_id, end_id, properties) in list(
+            relationships.items()
+        ):
+            relationships[id] = Relationship.stored(
+                nodes[start_id], nodes[end_id], type, id, properties
+            )
+
+        def value_of(kind, value):
+            if kind == 'node':
+                return nodes[value]
+            if kind == 'relationship':
+                return relationships[value]
+            if kind == 'predicate' and value is not None:
+                return bool(value)
+            return decode(value)
+
+        return [
+            dict(
+                (key, value_of(kind, value))
+                for (key, kind), value in zip(columns, row)
+            ) for row in rows
+        ]
+
+    def _writer(self, cursor, node_ids):
+        """
+        Args:
+          node_ids: NodeIds of the nodes written before, updated with the
+                    nodes written
+        """
+        return _CursorWriter(cursor, self._merge_keys, node_ids)
+
+
+class SqliteTransaction:
+    """Explicit transaction on the connection, see SqliteGraph.transaction"""
+
+    __slots__ = ('_graph', '_cursor', '_closed')
+
+    def __init__(self, graph):
+        self._graph = graph
+        graph._lock.acquire()
+        try:
+            self._cursor = graph._connection.cursor()
+            self._cursor.execute('BEGIN IMMEDIATE')
+        except BaseException:
+            graph._lock.release()
+            raise
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if self._closed:
+            return
+
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def fetch(self, gquery):
+        """Returns Result, the pushes of the transaction are seen"""
+        self._check_open()
+        return self._graph.fetch(gquery)
+
+    def push(self, *graph_entities, batch_size=None, on_batch=None):
+        """
+        See also SqliteGraph.push, all the batches are in this transaction
+        """
+        self._check_open()
+
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError('batch_size must be > 0')
+
+        _nodes, _relationships = split_entities(graph_entities)
+        if len(_nodes) == 0:
+            return PushResult(RowsProxy([]))
+
+        batches = []
+        self._graph._writer(self._cursor, NodeIds()).write(
+            _nodes,
+            _relationships,
+            batch_size,
+            reporter(batches, on_batch)
+        )
+        return PushResult(RowsProxy([]), batches)
+
+    def commit(self):
+        self._check_open()
+        try:
+            self._cursor.execute('COMMIT')
+        except BaseException:
+            self._close(rollback=True, quiet=True)
+            raise
+        self._close()
+
+    def rollback(self):
+        self._check_open()
+        self._close(rollback=True)
+
+    def _close(self, rollback=False, quiet=False):
+        self._closed = True
+        try:
+            if rollback:
+                self._cursor.execute('ROLLBACK')
+        except Exception:
+            if not quiet:
+                raise
+        finally:
+            self._graph._lock.release()
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError('transaction is closed')
+
+
+class _CursorWriter(LocalWriter):
+    """
+    Write the entities by the cursor, see LocalWriter, the rows of each
+    chunk are executemany-ed table by table
+    """
+
+    __slots__ = ('_cursor', '_next_ids', '_merged')
+
+    def __init__(self, cursor, merge_keys, node_ids):
+        super().__init__(merge_keys, node_ids)
+        self._cursor = cursor
+        self._next_ids = {}
+        # (kind, group) -> (key -> id merged into) of the group written
+        self._merged = {}
+
+    def check(self, ids):
+        missing = ids - _existing(self._cursor, 'nodes', ids)
+        if missing:
+            raise KeyError('node {} not in the graph'.format(
+                ', '.join(str(id) for id in sorted(missing))
+            ))
+
+    def write_nodes(self, labels, keys, chunk):
+        cursor = self._cursor
+        key_label, keys = keys
+        find = _node_finder(key_label, keys)
+        merged = self._merged.setdefault(('node', labels), {})
+
+        writes = _Writes('node')
+        for node, row in chunk:
+            existing = None
+            if key_label is not None:
+                key = tuple(encode(row[k]) for k in keys)
+                existing = merged.get(key)
+                if existing is None:
+                    existing = find(cursor, key)
+
+            if existing is None:
+                existing = self._next_id('nodes')
+                writes.create(existing, row)
+            else:
+                writes.update(existing, row)
+
+            if key_label is not None:
+                merged[key] = existing
+            writes.labels(existing, labels)
+            self.node_ids[node] = existing
+
+        writes.execute(cursor)
+
+    def write_relationships(self, type, chunk):
+        cursor = self._cursor
+        merged = self._merged.setdefault(('relationship', type), {})
+
+        writes = _Writes('relationship')
+        for rel in chunk:
+            key = (self.stored(rel.node_from), self.stored(rel.node_to))
+            props = dict((k, v) for k, v in rel)
+
+            existing = None
+            if self.merge_keys.merges(rel):
+                existing = merged.get(key)
+                if existing is None:
+                    existing = _find_relationship(cursor, type, key)
+
+            if existing is None:
+                existing = self._next_id('relationships')
+                writes.create(existing, props, (type, ) + key)
+            else:
+                writes.update(existing, props)
+            merged[key] = existing
+
+        writes.execute(cursor)
+
+    def _next_id(self, table):
+        if table not in self._next_ids:
+            self._next_ids[table] = _next_id(self._cursor, table)
+        id = self._next_ids[table]
+        self._next_ids[table] = id + 1
+        return id
+
+
+class _Writes:
+    """Rows written by a batch, to be executemany-ed table by table"""
+
+    __slots__ = ('_kind', '_created', '_labels', '_properties', '_removed')
+
+    def __init__(self, kind):
+        self._kind = kind
+        self._created = []
+        self._labels = []
+        self._properties = []
+        self._removed = []
+
+    def create(self, id, properties, row=()):
+        self._created.append((id, ) + tuple(row))
+        for key, value in properties.items():
+            if value is not None:
+                self._properties.append((id, key, encode(value)))
+
+    def update(self, id, properties):
+        """Set the properties, like SET n += p, null remove the property"""
+        for key, value in properties.items():
+            if value is None:
+                self._removed.append((id, key))
+            else:
+                self._properties.append((id, key, encode(value)))
+
+    def labels(self, id, labels):
+        self._labels.extend((label, id) for label in labels)
+
+    def execute(self, cursor):
+        kind = self._kind
+        if kind == 'node':
+            cursor.executemany('INSERT INTO nodes (id) VALUES (?)',
+                               self._created)
+            cursor.executemany(
+                'INSERT OR IGNORE INTO node_labels (label, node_id) '
+                'VALUES (?, ?)',
+                self._labels
+            )
+        else:
+            cursor.executemany(
+                'INSERT INTO relationships (id, type, start_id, end_id) '
+                'VALUES (?, ?, ?, ?)',
+                self._created
+            )
+
+        cursor.executemany(
+            'INSERT OR REPLACE INTO {0}_properties ({0}_id, key, value) '
+            'VALUES (?, ?, ?)'.format(kind),
+            self._properties
+        )
+        cursor.executemany(
+            'DELETE FROM {0}_properties WHERE {0}_id = ? AND key = ?'.format(
+                kind
+            ),
+            self._removed
+        )
+
+
+def _ids_param(ids):
+    return json.dumps(sorted(ids))
+
+
+def _existing(cursor, table, ids):
+    if len(ids) == 0:
+        return set()
+
+    cursor.execute(
+        'SELECT id FROM {} WHERE id IN '
+        '(SELECT value FROM json_each(?))'.format(table),
+        (_ids_param(ids), )
+    )
+    return set(id for id, in cursor.fetchall())
+
+
+def _next_id(cursor, table):
+    cursor.execute('SELECT coalesce(max(id), -1) + 1 FROM {}'.format(table))
+    return cursor.fetchone()[0]
+
+
+def _node_finder(label, keys):
+    """
+    Returns:
+      callable(cursor, encoded values of the keys) -> id of the first node
+      with the label and the key properties, or None
+    """
+    if label is None:
+        return None
+
+    tables = ['node_labels AS l']
+    conditions = ['l.label = ?']
+    for index, _ in enumerate(keys):
+        table = 'k{}'.format(index)
+        tables.append('node_properties AS {}'.format(table))
+        conditions.append(
+            '{0}.node_id = l.node_id AND {0}.key = ? AND {0}.value = ?'.format(
+                table
+            )
+        )
+
+    sql = 'SELECT l.node_id FROM {} WHERE {} LIMIT 1'.format(
+        ', '.join(tables), ' AND '.join(conditions)
+    )
+
+    def find(cursor, values):
+        params = [label]
+        for key, value in zip(keys, values):
+            params.extend((key, value))
+
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        return None if row is None else row[0]
+
+    return find
+
+
+def _find_relationship(cursor, type, key):
+    cursor.execute(
+        'SELECT id FROM relationships '
+        'WHERE start_id = ? AND type = ? AND end_id = ? LIMIT 1',
+        (key[0], type, key[1])
+    )
+    row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+def _load_properties(cursor, kind, ids):
+    properties = dict((id, {}) for id in ids)
+    if len(ids) == 0:
+        return properties
+
+    cursor.execute(
+        'SELECT {0}_id, key, value FROM {0}_properties WHERE {0}_id IN '
+        '(SELECT value FROM json_each(?))'.format(kind),
+        (_ids_param(ids), )
+    )
+    for id, key, value in cursor.fetchall():
+        properties[id][key] = decode(value)
+    return properties
+
+
+def _load_nodes(cursor, ids):
+    """
+    Returns:
+      id -> graphic Node
+    """
+    if len(ids) == 0:
+        return {}
+
+    labels = dict((id, []) for id in ids)
+    cursor.execute(
+        'SELECT node_id, label FROM node_labels WHERE node_id IN '
+        '(SELECT value FROM json_each(?))',
+        (_ids_param(ids), )
+    )
+    for id, label in cursor.fetchall():
+        labels[id].append(label)
+
+    nodes = {}
+    for id, properties in _load_properties(cursor, 'node', ids).items():
+        nodes[id] = Node.stored(labels[id], id, properties)
+    return nodes
+
+
+def _load_relationships(cursor, ids):
+    """
+    Returns:
+      id -> (id, type, start_id, end_id, properties)
+    """
+    if len(ids) == 0:
+        return {}
+
+    properties = _load_properties(cursor, 'relationship', ids)
+    cursor.execute(
+        'SELECT id, type, start_id, end_id FROM relationships WHERE id IN '
+        '(SELECT value FROM json_each(?))',
+        (_ids_param(ids), )
+    )
+    return dict(
+        (row[0], row + (properties[row[0]], )) for row in cursor.fetchall()
+    )
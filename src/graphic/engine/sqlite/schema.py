@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import json
+
+
+__all__ = ['SCHEMA', 'encode', 'decode', 'encode_params']
+
+
+# The property values are kept in the columns without type affinity, so
+# SQLite never converts them: 1 = '1' is false as in cypher. Numbers and
+# strings are stored as they are, to be compared and indexed natively,
+# the other values(booleans, lists, maps) are stored as JSON blobs, which
+# are never equal to a number or a string.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+  id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS node_labels (
+  label TEXT NOT NULL,
+  node_id INTEGER NOT NULL,
+  PRIMARY KEY (label, node_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS node_labels_node_id ON node_labels (node_id);
+
+CREATE TABLE IF NOT EXISTS node_properties (
+  node_id INTEGER NOT NULL,
+  key TEXT NOT NULL,
+  value,
+  PRIMARY KEY (node_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS node_properties_key_value
+  ON node_properties (key, value);
+
+CREATE TABLE IF NOT EXISTS relationships (
+  id INTEGER PRIMARY KEY,
+  type TEXT NOT NULL,
+  start_id INTEGER NOT NULL,
+  end_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS relationships_start_id
+  ON relationships (start_id, type);
+CREATE INDEX IF NOT EXISTS relationships_end_id
+  ON relationships (end_id, type);
+CREATE INDEX IF NOT EXISTS relationships_type ON relationships (type);
+
+CREATE TABLE IF NOT EXISTS relationship_properties (
+  relationship_id INTEGER NOT NULL,
+  key TEXT NOT NULL,
+  value,
+  PRIMARY KEY (relationship_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS relationship_properties_key_value
+  ON relationship_properties (key, value);
+"""
+
+
+def encode(value):
+    """
+    Property value to the value stored
+
+    Raises:
+      TypeError: value can not be stored, ie: bytes
+    """
+    if value is None:
+        return None
+    if _is_native(value):
+        return value
+    return _json(value)
+
+
+def decode(value):
+    if isinstance(value, bytes):
+        return json.loads(value.decode('utf-8'))
+    return value
+
+
+def encode_params(params, list_params=()):
+    """
+    Encode the values bound to a compiled query
+
+    Args:
+      params: name -> value
+      list_params: names of the ones for IN, the lists are passed as JSON
+                   text to json_each, which only matches the numbers and
+                   strings in them
+    """
+    encoded = {}
+    for name, value in params.items():
+        if name in list_params:
+            if not isinstance(value, (list, tuple)):
+                # IN a non list is null as in cypher
+                encoded[name] = None
+            else:
+                encoded[name] = json.dumps([
+                    v for v in value if _is_native(v)
+                ])
+        else:
+            encoded[name] = encode(value)
+
+    return encoded
+
+
+def _json(value):
+    try:
+        text = json.dumps(value, separators=(',', ':'), sort_keys=True)
+    except TypeError:
+        raise TypeError('can not store {!r}'.format(value))
+    return text.encode('utf-8')
+
+
+def _is_native(value):
+    # bool is int in python, not in cypher
+    return isinstance(value, (int, float, str)) and \
+        not isinstance(value, bool)
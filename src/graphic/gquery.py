@@ -1,13 +1,19 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
+import base64
+import binascii
 import copy
+import json
+from collections import namedtuple
 
 from .graph import GraphEntity
-from .query.query_utils import Q, Field, Expression
+from .query.func import Func, lookup_func
+from .query.optimizer import optimize
+from .query.query_utils import Q, Field, Expression, Param
 
 
-__all__ = ['GQuery']
+__all__ = ['GQuery', 'PreparedQuery', 'BoundQuery', 'Pagination', 'Page']
 
 
 class Context:
@@ -89,7 +95,7 @@ class GQuery:
     _LIMIT = 20
 
     __slots__ = ('_where', '_entities', '_context',
-                 '_select', '_limit', '_order_by')
+                 '_select', '_limit', '_order_by', '_optimized')
 
     def __init__(self, *entities):
         self._where = Q()
@@ -98,6 +104,8 @@ class GQuery:
         self._select = set()
         self._limit = self._LIMIT
         self._order_by = None
+        # (where, optimized where) of the last optimized
+        self._optimized = None
 
         for entity in entities:
             self._add_filter_by_entity_properties(entity)
@@ -128,7 +136,7 @@ class GQuery:
 
     @property
     def where(self):
-        return self._where._clone()
+        return self._where
 
     @property
     def returns(self):
@@ -159,16 +167,412 @@ class GQuery:
 
         return self
 
-    def order_by(self, by=None):
-        if by is None:
+    def order_by(self, *by):
+        """
+        Sort the results by the fields, the '-' prefixed descending, the
+        later fields break the ties of the former ones
+
+        examples:
+
+        query.order_by('-g__age', 'g__uid')
+
+        Returns:
+          the query, or the fields sorted by if none given: None, the field
+          or the tuple of the fields
+        """
+        if len(by) == 0 or by == (None, ):
             return self._order_by
 
-        self._order_by = by
+        self._order_by = by[0] if len(by) == 1 else tuple(by)
         return self
 
+    def order_keys(self):
+        """
+        Returns:
+          list of (field expression, descending) sorted by
+        """
+        order_by = self._order_by
+        if order_by is None:
+            return []
+        if isinstance(order_by, str):
+            order_by = (order_by, )
+
+        keys = []
+        for exp in order_by:
+            exp = exp.strip()
+            descending = exp.startswith('-')
+            if descending:
+                exp = exp[1:]
+            if len(exp) > 0:
+                keys.append((exp, descending))
+        return keys
+
     def limit(self, to=None):
         if to is None:
             return self._limit
 
         self._limit = to
         return self
+
+    def optimized(self):
+        """
+        The query with the filters rewritten by graphic.query.optimizer,
+        the optimized filters are kept until the filters change.
+
+        Returns:
+          GQuery instance, or None if the filters never match
+        """
+        where = self._where
+        if self._optimized is None or self._optimized[0] is not where:
+            self._optimized = (
+                where,
+                optimize(where, lookup_field=self._context.lookup_field)
+            )
+
+        optimized_where = self._optimized[1]
+        if optimized_where is None:
+            return None
+
+        optimized = self._clone()
+        optimized._where = optimized_where
+        optimized._optimized = (optimized_where, optimized_where)
+        return optimized
+
+    def paginate(self, by, page_size=None, cursor=None):
+        """
+        Page through the results by keyset: each page is the query sorted
+        by the keys, filtered to the rows after the last one of the former
+        page, ie: uid > last uid, so a page costs the same however deep it
+        is.
+
+        The combination of the keys should be unique and never null, the
+        rows with the same keys of a page boundary would be skipped, end
+        with the id to make it unique, ie: by=('-g__age', 'g__id').
+
+        examples:
+
+        for page in query.paginate(by='g__uid', page_size=1000).pages(graph):
+            save(page.records, page.cursor)
+
+        Args:
+          by: field or tuple of fields sorted by, the '-' prefixed
+              descending
+          page_size: records of each page, default is the limit
+          cursor: Page.cursor of a page fetched before, resume after it
+
+        Returns:
+          Pagination instance
+        """
+        if isinstance(by, str):
+            by = (by, )
+        return Pagination(self._clone().order_by(*by),
+                          page_size or self._limit, cursor)
+
+    def prepare(self):
+        """
+        Freeze the query as a reusable template, the Param placeholders
+        in the filters are bound for each run.
+
+        examples:
+
+        prepared = graphic.node('Geek')._as('g').query.filter(
+            g__uid=Param('uid')
+        ).prepare()
+        graph.fetch(prepared.bind(uid=1234))
+
+        Returns:
+          PreparedQuery instance
+        """
+        return PreparedQuery(self._clone())
+
+    def _clone(self):
+        cloned = object.__new__(type(self))
+        cloned._where = self._where
+        cloned._entities = self._entities
+        cloned._context = self._context
+        cloned._select = set(self._select)
+        cloned._limit = self._limit
+        cloned._order_by = self._order_by
+        cloned._optimized = self._optimized
+        return cloned
+
+
+class PreparedQuery:
+    """
+    Query template created by GQuery.prepare
+
+    The query is compiled once per compiler and the result kept, binding
+    values to it never rebuilds or recompiles the query.
+
+    """
+
+    __slots__ = ('_gquery', '_placeholders', '_compiled')
+
+    def __init__(self, gquery):
+        self._gquery = gquery
+        self._placeholders = frozenset(_collect_placeholders(gquery.where))
+        self._compiled = {}
+
+    @property
+    def query(self):
+        return self._gquery
+
+    @property
+    def placeholders(self):
+        return self._placeholders
+
+    def limit(self):
+        return self._gquery.limit()
+
+    def compiled(self, compiler):
+        """
+        Args:
+          compiler: function compile the GQuery to (query, params)
+
+        Returns:
+          (query, params) of the template, params without the placeholders
+        """
+        try:
+            return self._compiled[compiler]
+        except KeyError:
+            pass
+
+        query, params = compiler(self._gquery)
+        conflicts = self._placeholders.intersection(params)
+        if conflicts:
+            raise ValueError(
+                'placeholders {} conflict with the compiled params'.format(
+                    ', '.join(sorted(conflicts))
+                )
+            )
+
+        self._compiled[compiler] = (query, params)
+        return query, params
+
+    def bind(self, **values):
+        """
+        Bind values to all the placeholders
+
+        Raises:
+          KeyError: missing or unknown placeholder values
+
+        Returns:
+          BoundQuery instance, can be fetched as the GQuery
+        """
+        given = frozenset(values)
+        if given != self._placeholders:
+            missing = self._placeholders - given
+            if missing:
+                raise KeyError(
+                    'missing values for {}'.format(', '.join(sorted(missing)))
+                )
+            raise KeyError(
+                'unknown placeholders {}'.format(
+                    ', '.join(sorted(given - self._placeholders))
+                )
+            )
+
+        return BoundQuery(self, values)
+
+
+class BoundQuery:
+    """PreparedQuery with values bound to its placeholders"""
+
+    __slots__ = ('_prepared', '_values')
+
+    def __init__(self, prepared, values):
+        self._prepared = prepared
+        self._values = values
+
+    @property
+    def prepared(self):
+        return self._prepared
+
+    @property
+    def values(self):
+        return dict(self._values)
+
+    def limit(self):
+        return self._prepared.limit()
+
+    def compile(self, compiler):
+        """
+        Returns:
+          (query, params), the template query with the bound values merged
+          into the params
+        """
+        query, params = self._prepared.compiled(compiler)
+        params = dict(params)
+        params.update(self._values)
+        return query, params
+
+
+def _collect_placeholders(q):
+    if isinstance(q, Func):
+        if isinstance(q.value, Param):
+            yield q.value.name
+        return
+
+    for child in q.children:
+        yield from _collect_placeholders(child)
+
+
+Page = namedtuple('Page', ['records', 'cursor'])
+Page.__doc__ = """
+One page of Pagination.pages
+
+  records: list of graphic.engine.hydrator.Record
+  cursor: opaque str, resume after the page by GQuery.paginate(cursor=)
+"""
+
+
+class Pagination:
+    """
+    Keyset pagination of a GQuery, see GQuery.paginate
+
+    The cursor is the urlsafe base64 of the keys and their values of the
+    last record, so it can be handed to the clients and passed back later.
+    """
+
+    __slots__ = ('_gquery', '_keys', '_page_size', '_cursor')
+
+    def __init__(self, gquery, page_size, cursor=None):
+        if page_size <= 0:
+            raise ValueError('page_size must be > 0')
+
+        self._gquery = gquery
+        self._keys = gquery.order_keys()
+        if len(self._keys) == 0:
+            raise ValueError('paginate by no keys')
+
+        self._page_size = page_size
+        self._cursor = None
+        if cursor is not None:
+            # fail early on a cursor of other keys
+            self._values(cursor)
+            self._cursor = cursor
+
+    @property
+    def cursor(self):
+        """Cursor of the last page fetched, None before the first one"""
+        return self._cursor
+
+    @property
+    def page_size(self):
+        return self._page_size
+
+    def query(self):
+        """
+        Returns:
+          GQuery of the page after the cursor
+        """
+        gquery = self._gquery._clone().limit(self._page_size)
+        if self._cursor is None:
+            return gquery
+
+        return gquery.filter(self._after(self._values(self._cursor)))
+
+    def cursor_of(self, record):
+        """
+        The cursor after the record, the sort keys are taken from its
+        columns, or the properties of its entities if not selected
+
+        Raises:
+          KeyError: the record has no value for a key
+        """
+        lookup_field = self._gquery.context.lookup_field
+
+        values = []
+        for exp, _ in self._keys:
+            field = lookup_field(exp)
+            if field.entity is None:
+                raise KeyError(exp)
+
+            column = str(field)
+            if column in record:
+                values.append(record[column])
+                continue
+
+            entity = record[field.entity.alias]
+            if field.name == Field.PK:
+                values.append(entity.id)
+            else:
+                values.append(entity[field.name])
+
+        return _encode_cursor(self._orders(), values)
+
+    def page(self, graph):
+        """
+        Fetch the page after the cursor and advance the cursor to its end
+
+        Returns:
+          Page, the records are empty when there are no more
+        """
+        records = list(graph.fetch(self.query()).records)
+        if records:
+            self._cursor = self.cursor_of(records[-1])
+        return Page(records, self._cursor)
+
+    def pages(self, graph):
+        """
+        Yields:
+          Page until the last one, each fetched when iterated to
+        """
+        while True:
+            page = self.page(graph)
+            if page.records:
+                yield page
+            if len(page.records) < self._page_size:
+                return
+
+    def _orders(self):
+        return ['-' + exp if desc else exp for exp, desc in self._keys]
+
+    def _values(self, cursor):
+        """
+        Raises:
+          ValueError: not a cursor of the keys
+        """
+        try:
+            data = json.loads(
+                base64.urlsafe_b64decode(cursor.encode('ascii'))
+                .decode('utf-8')
+            )
+            keys, values = data['keys'], data['values']
+        except (ValueError, TypeError, KeyError, AttributeError,
+                binascii.Error):
+            raise ValueError('invalid cursor {!r}'.format(cursor))
+
+        if keys != self._orders() or len(values) != len(keys):
+            raise ValueError(
+                'cursor of the keys {} not {}'.format(keys, self._orders())
+            )
+        return values
+
+    def _after(self, values):
+        """
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ..., < for the descending
+        """
+        eq = lookup_func('eq')
+        after = Q()
+        for index, (exp, descending) in enumerate(self._keys):
+            q = Q(*[
+                eq(prior, value)
+                for (prior, _), value in zip(self._keys[:index], values)
+            ])
+            q &= Q(lookup_func('lt' if descending else 'gt')(
+                exp, values[index]
+            ))
+            after |= q
+        return after
+
+
+def _encode_cursor(keys, values):
+    try:
+        text = json.dumps({'keys': keys, 'values': values},
+                          separators=(',', ':'))
+    except TypeError:
+        raise ValueError(
+            'can not build cursor of the key values {!r}'.format(values)
+        )
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
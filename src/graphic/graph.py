@@ -46,7 +46,7 @@ class RemoteGraph(with_metaclass(RemoteGraphMeta)):
         ins.__init__(*args, **config)
         return ins
 
-    def compile(self, gquery, context):
+    def compile(self, gquery):
         """
         compile query for the target query string which used to send
         to the db server to do request
@@ -55,24 +55,50 @@ class RemoteGraph(with_metaclass(RemoteGraphMeta)):
           gquery: GQuery instance
 
         Returns:
-          query string to send to db server
+          (query, params), the query string with placeholders and the
+          values bound to them, to send to db server
 
         """
         raise NotImplementedError
 
-    def fetch(self, gquery):
+    def fetch(self, gquery, stream=False):
         """
         fetch graph data from graph db server
 
         Args:
-          gquery: GQuery instance
+          gquery: GQuery or BoundQuery(see GQuery.prepare) instance
+          stream: iterate the records lazily as they arrive
 
         Returns:
-          graphic.engine.Result instance
+          graphic.engine.Result instance, or graphic.engine.RecordStream
+          instance if stream
 
         """
         raise NotImplementedError
 
+    def fetch_many(self, gqueries):
+        """
+        fetch the queries, concurrently if the engine can, by default they
+        are fetched one by one
+
+        Args:
+          gqueries: iterable of GQuery instance
+
+        Returns:
+          list of graphic.engine.Result in the order of the queries, the
+          Result.error of a failed one is the exception
+        """
+        from .engine import Result, FailedProxy
+
+        results = []
+        for gquery in gqueries:
+            try:
+                results.append(self.fetch(gquery))
+            except Exception as error:
+                results.append(Result(FailedProxy(error)))
+
+        return results
+
     def push(self, *graph_entities):
         """
         Add new nodes, relationships to the graph
@@ -87,6 +113,72 @@ class RemoteGraph(with_metaclass(RemoteGraphMeta)):
         #   3. support create from query(unwind)
         raise NotImplementedError
 
+    def merge_on(self, label, *keys):
+        """
+        Declare the unique properties of the nodes with the label, the
+        pushed nodes with a declared label are merged on those properties
+        instead of created, so re-push the same data is idempotent.
+        Relationships between the merged or saved nodes are merged as well.
+
+        examples:
+
+        graph.merge_on('Geek', 'uid').merge_on('Company', 'cid')
+
+        Also can be declared by config: use(MERGE_KEYS={'Geek': 'uid'}), the
+        engines keep them as graphic.engine.push.MergeKeys
+        """
+        self._merge_keys.declare(label, *keys)
+        return self
+
+    @property
+    def merge_keys(self):
+        """label -> tuple of the merge keys declared"""
+        return self._merge_keys.as_dict()
+
+    def close(self):
+        """Release the connections to the server"""
+        raise NotImplementedError
+
+    @property
+    def schema(self):
+        """
+        graphic.schema.SchemaCatalog of the graph, the indexes known, the
+        ones declared and the node properties the compiled queries filter
+        """
+        raise NotImplementedError
+
+    def ensure_indexes(self, min_count=1, dry_run=False):
+        """
+        Create the missing indexes the schema catalog recommends
+
+        Args:
+          min_count: only the observed properties filtered by at least so
+                     many compiled queries
+          dry_run: only return the statements, nothing is created
+
+        Returns:
+          list of the statements
+        """
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def push_stream(self, graph_entities, batch_size=1000):
+        """
+        Add new nodes, relationships consumed lazily from the iterable, only
+        one batch is kept in memory
+
+        Args:
+          graph_entities: iterable of nodes, relationships
+          batch_size: max entities buffered
+
+        """
+        raise NotImplementedError
+
 
 # TODO(chuter): auto generate default alias?
 class GraphEntity(Mapping, Hashable):
@@ -150,13 +242,25 @@ class GraphEntity(Mapping, Hashable):
 
 class Node(GraphEntity):
 
-    __slots__ = GraphEntity.__slots__ + ('_id', '_labels')
+    # weak referred by the ids of the written nodes, see engine.NodeIds
+    __slots__ = GraphEntity.__slots__ + ('_id', '_labels', '__weakref__')
 
     def __init__(self, *labels, id=None, **properties):
         super().__init__(**properties)
         self._id = id
         self._labels = frozenset(labels)
 
+    @classmethod
+    def stored(cls, labels, id, properties):
+        """
+        The node read from a graph, the properties are set aside the
+        constructor, they may have the same name as its keyword arguments,
+        ie: id
+        """
+        node = cls(*labels, id=id)
+        node._kv_paires = properties
+        return node
+
     def __eq__(self, that):
         if self is that:
             return True
@@ -193,17 +297,38 @@ class Node(GraphEntity):
 class Relationship(GraphEntity):
 
     __slots__ = GraphEntity.__slots__ + (
-        '_node_from', '_node_to', '_type', '_with_direction'
+        '_id', '_node_from', '_node_to', '_type', '_with_direction'
     )
 
     def __init__(self, node_from, node_to, type=None,
-                 with_direction=True, **properties):
+                 with_direction=True, id=None, **properties):
         super().__init__(**properties)
+        self._id = id
         self._node_from = node_from
         self._node_to = node_to
         self._with_direction = with_direction
         self._type = type
 
+    @classmethod
+    def stored(cls, node_from, node_to, type, id, properties):
+        """The relationship read from a graph, see Node.stored"""
+        rel = cls(node_from, node_to, type=type, id=id)
+        rel._kv_paires = properties
+        return rel
+
+    def __eq__(self, that):
+        if self is that:
+            return True
+
+        if self.id is not None and that.id is not None:
+            return self.id == that.id
+
+        return hash(self) == hash(that)
+
+    @property
+    def id(self):
+        return self._id
+
     @property
     def node_from(self):
         return self._node_from
@@ -243,6 +368,9 @@ class Relationship(GraphEntity):
         return ''.join(str_parts)
 
     def __hash__(self):
+        if self.id is not None:
+            return hash(('relationship', self.id))
+
         if self.type is None:
             return hash(self.node_from) ^ hash(self.node_to)
 
@@ -315,9 +443,19 @@ class Path(GraphEntity):
 
 class SubGraph:
     # TODO(chuter) add any nodes, relationships and pathes!!!
-    """Arbitrary, unordered collection of nodes and relationships."""
+    """
+    Arbitrary, unordered collection of nodes and relationships.
+
+    The neighbors, degree etc. are looked up on the adjacency maps of the
+    relationships, which are built on the first lookup and kept, as the
+    subgraph never changes.
+    """
+
+    __slots__ = ('_nodes', '_relationships', '_adjacency', )
 
-    __slots__ = ('_nodes', '_relationships', )
+    OUT = 'out'
+    IN = 'in'
+    BOTH = 'both'
 
     def __init__(self, nodes=None, relationships=None):
         self._nodes = frozenset(nodes or [])
@@ -325,6 +463,7 @@ class SubGraph:
         self._nodes |= frozenset(
             chain(*(r.nodes for r in self._relationships))
         )
+        self._adjacency = None
 
     def __eq__(self, other):
         # TODO(chuter) if only summary, check summary??
@@ -351,26 +490,46 @@ class SubGraph:
         return chain(iter(self._nodes), iter(self._relationships))
 
     def __or__(self, other):
-        return type(self)(
-            nodes=self.nodes | other.nodes,
-            relationships=self.relationships | other.relationships
+        return self._closed(
+            self.nodes | other.nodes,
+            self.relationships | other.relationships
         )
 
     def __and__(self, other):
-        return type(self)(
-            nodes=self.nodes & other.nodes,
-            relationships=self.relationships & other.relationships
+        return self._closed(
+            self.nodes & other.nodes,
+            self.relationships & other.relationships
         )
 
     def __sub__(self, other):
         r = self.relationships - other.relationships
         n = self.nodes - other.nodes | set().union(*(_.nodes for _ in r))
-        return type(self)(nodes=n, relationships=r)
+        return self._closed(n, r)
 
     def __xor__(self, other):
         r = self.relationships ^ other.relationships
         n = (self.nodes ^ other.nodes) | set().union(*(_.nodes for _ in r))
-        return type(self)(nodes=n, relationships=r)
+        return self._closed(n, r)
+
+    @classmethod
+    def _closed(cls, nodes, relationships):
+        """
+        Build from the nodes which have the endpoints of the relationships
+        already, without chaining them again
+        """
+        return cls._taken(frozenset(nodes), frozenset(relationships))
+
+    @classmethod
+    def _taken(cls, nodes, relationships):
+        """
+        Build on the sets as they are, not copied, the caller never changes
+        them after, see GraphBuilder.freeze
+        """
+        graph = cls.__new__(cls)
+        graph._nodes = nodes
+        graph._relationships = relationships
+        graph._adjacency = None
+        return graph
 
     @property
     def nodes(self):
@@ -383,5 +542,250 @@ class SubGraph:
     def is_empty(self):
         return len(self.nodes) == 0
 
+    def _adjacency_maps(self):
+        if self._adjacency is None:
+            self._adjacency = _Adjacency(self._relationships)
+        return self._adjacency
+
+    def neighbors(self, node, direction=BOTH) -> frozenset:
+        """
+        Nodes linked with the node, a relationship without direction links
+        both ways
+
+        Args:
+          node: node of the subgraph
+          direction: SubGraph.OUT, IN or BOTH, the way of the relationships
+
+        Returns:
+          frozenset of the nodes, empty if the node is not in the subgraph
+        """
+        edges = self._adjacency_maps().edges(node, direction)
+        return frozenset(other for _, other in edges)
+
+    def degree(self, node, direction=BOTH) -> int:
+        """
+        Number of the relationships of the node, a self loop is counted
+        twice in BOTH
+
+        Args:
+          direction: SubGraph.OUT, IN or BOTH
+        """
+        return self._adjacency_maps().degree(node, direction)
+
+    def edges_between(self, node_a, node_b, direction=BOTH) -> frozenset:
+        """
+        Relationships between the nodes
+
+        Args:
+          direction: SubGraph.OUT for the ones from node_a to node_b, IN
+                     for the ones from node_b to node_a, BOTH for either
+        """
+        adjacency = self._adjacency_maps()
+        if direction == self.BOTH and \
+                adjacency.degree(node_b) < adjacency.degree(node_a):
+            # scan the edges of the one with less relationships
+            node_a, node_b = node_b, node_a
+
+        return frozenset(
+            rel for rel, other in adjacency.edges(node_a, direction)
+            if other == node_b
+        )
+
+    def relationships_of_type(self, type) -> frozenset:
+        return self._adjacency_maps().types.get(type, frozenset())
+
+
+class _Adjacency:
+    """
+    node -> its outgoing, incoming relationships, and type -> relationships
+    """
+
+    __slots__ = ('_outgoing', '_incoming', '_undirected', 'types')
+
+    def __init__(self, relationships):
+        self._outgoing = {}
+        self._incoming = {}
+        self._undirected = {}
+        types = {}
+
+        for rel in relationships:
+            node_from, node_to = rel.node_from, rel.node_to
+            if rel.with_direction:
+                self._outgoing.setdefault(node_from, []).append(
+                    (rel, node_to)
+                )
+                self._incoming.setdefault(node_to, []).append(
+                    (rel, node_from)
+                )
+            else:
+                self._undirected.setdefault(node_from, []).append(
+                    (rel, node_to)
+                )
+                self._undirected.setdefault(node_to, []).append(
+                    (rel, node_from)
+                )
+            types.setdefault(rel.type, []).append(rel)
+
+        self.types = dict(
+            (type, frozenset(rels)) for type, rels in types.items()
+        )
+
+    def _lists(self, node, direction):
+        if direction == SubGraph.OUT:
+            maps = (self._outgoing, self._undirected)
+        elif direction == SubGraph.IN:
+            maps = (self._incoming, self._undirected)
+        elif direction == SubGraph.BOTH:
+            maps = (self._outgoing, self._incoming, self._undirected)
+        else:
+            raise ValueError('unknown direction {!r}'.format(direction))
+
+        return [m.get(node, ()) for m in maps]
+
+    def edges(self, node, direction=SubGraph.BOTH):
+        """Iterate (relationship, the other node) of the node"""
+        return chain(*self._lists(node, direction))
+
+    def degree(self, node, direction=SubGraph.BOTH):
+        return sum(len(edges) for edges in self._lists(node, direction))
+
+
+class GraphBuilder:
+    """
+    Mutable collection of nodes and relationships, to accumulate a graph
+    piece by piece, ie: merge the results of the paginated fetches, then
+    freeze it to SubGraph.
+
+    The endpoints of the relationships are always in the nodes. Discard a
+    node discards its relationships as well, they are tracked per node
+    since the first node discarded.
+
+    The frozen SubGraph takes the sets of the builder, they are copied
+    only when the builder is changed after(copy on write).
+    """
+
+    __slots__ = ('_nodes', '_relationships', '_incident', '_frozen')
+
+    def __init__(self, *graphs):
+        self._nodes = set()
+        self._relationships = set()
+        # node -> its relationships, None until a node is discarded
+        self._incident = None
+        # the SubGraph shares the sets, None if not frozen since changed
+        self._frozen = None
+        self.update(*graphs)
+
+    def __len__(self):
+        return len(self._nodes) + len(self._relationships)
+
+    def __contains__(self, entity):
+        return entity in self._nodes or entity in self._relationships
+
+    def __iter__(self):
+        return chain(iter(self._nodes), iter(self._relationships))
+
+    @property
+    def nodes(self):
+        return frozenset(self._nodes)
+
+    @property
+    def relationships(self):
+        return frozenset(self._relationships)
+
+    def add(self, *entities):
+        """
+        Add nodes, relationships, with the endpoints of the relationships
+
+        Raises:
+          ValueError: neither node nor relationship, ie: path
+        """
+        self._unshare()
+        for entity in entities:
+            if entity.is_edge():
+                self._add_relationship(entity)
+            elif entity.is_node():
+                self._nodes.add(entity)
+            else:
+                raise ValueError('can not add {} to graph'.format(entity))
+        return self
+
+    def update(self, *graphs):
+        """
+        Add all the entities of the graphs, SubGraph, GraphBuilder or
+        iterable of nodes, relationships. The nodes of the graphs have the
+        endpoints already, they are merged as sets.
+        """
+        self._unshare()
+        for graph in graphs:
+            if isinstance(graph, (SubGraph, GraphBuilder)):
+                self._nodes |= graph.nodes
+                if self._incident is not None:
+                    for rel in graph.relationships - self._relationships:
+                        self._track(rel)
+                self._relationships |= graph.relationships
+            else:
+                self.add(*graph)
+        return self
+
+    def discard(self, *entities):
+        """Remove the entities if added, the relationships of the nodes too"""
+        self._unshare()
+        for entity in entities:
+            if entity.is_edge():
+                self._discard_relationship(entity)
+            elif entity.is_node():
+                for rel in list(self._incident_of(entity)):
+                    self._discard_relationship(rel)
+                self._nodes.discard(entity)
+        return self
+
+    def freeze(self) -> SubGraph:
+        """
+        Immutable SubGraph of the current entities, the builder is kept.
+        Nothing is copied, the same SubGraph is returned until the builder
+        is changed.
+        """
+        if self._frozen is None:
+            self._frozen = SubGraph._taken(self._nodes, self._relationships)
+        return self._frozen
+
+    def _unshare(self):
+        if self._frozen is not None:
+            self._nodes = set(self._nodes)
+            self._relationships = set(self._relationships)
+            self._frozen = None
+
+    def _incident_of(self, node):
+        if self._incident is None:
+            self._incident = {}
+            for rel in self._relationships:
+                self._track(rel)
+        return self._incident.get(node, ())
+
+    def _track(self, rel):
+        for node in rel.nodes:
+            self._incident.setdefault(node, set()).add(rel)
+
+    def _add_relationship(self, rel):
+        self._relationships.add(rel)
+        self._nodes.update(rel.nodes)
+        if self._incident is not None:
+            self._track(rel)
+
+    def _discard_relationship(self, rel):
+        if rel not in self._relationships:
+            return
+
+        self._relationships.discard(rel)
+        if self._incident is None:
+            return
+
+        for node in rel.nodes:
+            rels = self._incident.get(node)
+            if rels is not None:
+                rels.discard(rel)
+                if len(rels) == 0:
+                    del self._incident[node]
+
 
 Graph = SubGraph
@@ -3,4 +3,4 @@
 
 
 # flake8: noqa
-from .query_utils import Q
+from .query_utils import Q, Param
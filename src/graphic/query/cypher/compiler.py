@@ -4,35 +4,80 @@
 
 from typing import Iterable
 
+from graphic.engine.push import merge_rows
 from graphic.query.func import Func, Aggregation
+from graphic.query.query_utils import Param
 
 
-__all__ = ['compile', 'build']
+__all__ = ['compile', 'compile_with_params', 'fingerprint', 'build',
+           'build_node_batch', 'build_node_merge_batch',
+           'build_relationship_batch', 'build_index', 'Parameters']
 
 
 # TODO(chuter):
-#   1. compile to string and parameters
-#   2. cypher escape
-#   3. auto convert create to merge
+#   1. cypher escape
 
-def compile_where_clause(gquery):
+class Parameters:
+    """
+    Collect the values bound to a query while compiling it.
+
+    Each value gets a positional name(p0, p1, ...) in the order it is
+    met, so queries with the same shape compile to the same text and the
+    server can reuse the plan. Param placeholders keep their own name
+    and are left to be bound later.
+
+    """
+
+    PREFIX = 'p'
+
+    __slots__ = ('_values', '_placeholders')
+
+    def __init__(self):
+        self._values = {}
+        self._placeholders = set()
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, value) -> str:
+        if isinstance(value, Param):
+            self._placeholders.add(value.name)
+            return '${}'.format(value.name)
+
+        name = '{}{}'.format(self.PREFIX, len(self._values))
+        self._values[name] = value
+        return '${}'.format(name)
+
+    @property
+    def values(self):
+        return dict(self._values)
+
+    @property
+    def placeholders(self):
+        return frozenset(self._placeholders)
+
+
+def compile_where_clause(gquery, params=None):
+    lookup_field = gquery.context.lookup_field
 
     def compile_q(q):
         if isinstance(q, Func):
-            return q(lookup_field=gquery.context.lookup_field)
+            return q(lookup_field=lookup_field, params=params)
 
         if len(q) == 0:
             return ''
 
         if len(q) > 1:
             join_by = ' {} '.format(q.connector)
-            return (
-                '({})'.format(
-                    join_by.join([compile_q(child) for child in q.children])
-                )
+            cypher = '({})'.format(
+                join_by.join([compile_q(child) for child in q.children])
             )
+        else:
+            cypher = compile_q(q.children[0])
 
-        return compile_q(q.children[0])
+        if q.negated and cypher:
+            return 'NOT ({})'.format(cypher)
+        return cypher
 
     return compile_q(gquery.where)
 
@@ -71,10 +116,11 @@ def compile_match_clause(*entities):
 
 
 def compile_select_clause(gquery):
+    lookup_field = gquery.context.lookup_field
 
     def compile(select):
         if isinstance(select, (Aggregation, Func)):
-            return select(lookup_field=gquery.context.lookup_field)
+            return select(lookup_field=lookup_field)
 
         return select.__str__()
 
@@ -87,31 +133,45 @@ def compile_select_clause(gquery):
 
 
 def compile_order_by(gquery):
-    if gquery.order_by() is None:
+    keys = gquery.order_keys()
+    if len(keys) == 0:
         return ''
 
-    order_by_field = gquery.order_by().strip()
+    lookup_field = gquery.context.lookup_field
+    return 'ORDER BY {}'.format(', '.join(
+        '{} {}'.format(lookup_field(exp), 'DESC' if descending else 'ASC')
+        for exp, descending in keys
+    ))
 
-    order_type = 'ASC'
-    if order_by_field.startswith('-'):
-        order_by_field = order_by_field[1:]
-        order_type = 'DESC'
 
-    if len(order_by_field) == 0:
-        return ''
+def compile_hints(hints):
+    return [
+        'USING INDEX {}:{}({})'.format(alias, label, property)
+        for alias, label, property in hints
+    ]
+
 
-    target_field = gquery.context.lookup_field(order_by_field)
-    return 'ORDER BY {} {}'.format(target_field, order_type)
+def compile(gquery, pretty=False, params=None, hints=()) -> str:
+    """
+    Compile the query to cypher
 
+    Args:
+      gquery: GQuery instance
+      pretty: one clause per line
+      params: Parameters instance, if given, the filter values are bound
+              to it and replaced by placeholders in the query
+      hints: (alias, label, property) of the indexes the matched nodes
+             should be found by, see graphic.schema.filtered_properties
 
-def compile(gquery, pretty=False) -> str:
+    """
     match_clause = compile_match_clause(*gquery.queryfor)
-    where_clause = compile_where_clause(gquery)
+    where_clause = compile_where_clause(gquery, params=params)
     select_clause = compile_select_clause(gquery)
 
     join_by = '\n' if pretty else ' '
 
     clause_list = ['MATCH {}'.format(match_clause)]
+    clause_list.extend(compile_hints(hints))
     if len(where_clause) > 0:
         clause_list.append('WHERE {}'.format(where_clause))
 
@@ -122,6 +182,85 @@ def compile(gquery, pretty=False) -> str:
     return join_by.join(filter(lambda clause: len(clause) > 0, clause_list))
 
 
+def compile_with_params(gquery, pretty=False, hints=()) -> tuple:
+    """
+    Compile the query to cypher template and the parameters
+
+    Returns:
+      (query, params) ie: ('MATCH (_) WHERE _.uid=$p0 ...', {'p0': 1234})
+
+    """
+    params = Parameters()
+    query = compile(gquery, pretty=pretty, params=params, hints=hints)
+    return query, params.values
+
+
+def _entity_shape(entity):
+    if entity.is_node():
+        return ('node', entity.alias, tuple(sorted(entity.labels)))
+
+    if entity.is_edge():
+        return (
+            'edge',
+            entity.alias,
+            entity.type,
+            entity.with_direction,
+            _entity_shape(entity.node_from),
+            _entity_shape(entity.node_to),
+        )
+
+    raise NotImplementedError('Not support path yet!')
+
+
+def fingerprint(gquery) -> tuple:
+    """
+    Structural fingerprint of the query, two queries share one only
+    if they compile to the same cypher apart from the filter values.
+
+    The predicate tree is walked in the same order compile_where_clause
+    binds the values, so the returned params fit the cached query of
+    the shape.
+
+    Returns:
+      (shape, params), shape is hashable
+    """
+    values = []
+
+    def where_shape(q):
+        if isinstance(q, Func):
+            if isinstance(q.value, Param):
+                return (type(q).__name__, q.field, q.value)
+
+            values.append(q.value)
+            return (type(q).__name__, q.field)
+
+        if len(q) == 0:
+            return ()
+
+        if len(q) > 1:
+            return (
+                q.connector,
+                q.negated,
+                tuple(where_shape(child) for child in q.children)
+            )
+
+        return (q.negated, where_shape(q.children[0]))
+
+    shape = (
+        tuple(_entity_shape(entity) for entity in gquery.queryfor),
+        where_shape(gquery.where),
+        tuple(sorted(str(select) for select in gquery.returns)),
+        gquery.order_by(),
+        gquery.limit(),
+    )
+
+    params = dict(
+        ('{}{}'.format(Parameters.PREFIX, index), value)
+        for index, value in enumerate(values)
+    )
+    return shape, params
+
+
 # TODO(chuter) cypher escape full support
 def _encode_cypher_value(value):
     if isinstance(value, str):
@@ -185,3 +324,110 @@ def build(iterable_nodes, iterable_relationships=[]) -> Iterable:
         [_build_relationship(rel) for rel in relationships_set]
     )
     return '\n'.join(create_parts)
+
+
+def build_index(label, properties) -> str:
+    """
+    Build the statement create the index of the node properties if it does
+    not exist, composite if more than one property
+    """
+    return 'CREATE INDEX IF NOT EXISTS FOR (n:{}) ON ({})'.format(
+        label,
+        ', '.join('n.{}'.format(property) for property in properties)
+    )
+
+
+def build_node_batch(labels, nodes) -> tuple:
+    """
+    Build one UNWIND statement creating all the nodes with the same labels,
+    the properties are sent as parameters.
+
+    The created ids are returned in the order of the nodes.
+
+    Returns:
+      (query, params)
+    """
+    if len(labels) == 0:
+        pattern = '(n)'
+    else:
+        pattern = '(n:{})'.format(':'.join(labels))
+
+    query = (
+        'UNWIND $rows AS row CREATE {} SET n = row RETURN id(n) AS id'.format(
+            pattern
+        )
+    )
+    rows = [dict((key, val) for key, val in node) for node in nodes]
+    return query, {'rows': rows}
+
+
+def build_node_merge_batch(key_label, keys, labels, nodes) -> tuple:
+    """
+    Build one UNWIND statement merging all the nodes with the same labels
+    on the key properties of the key label, the other labels and the
+    properties are set to the merged node.
+
+    The merged ids are returned in the order of the nodes.
+
+    Raises:
+      ValueError: node without the key properties
+
+    Returns:
+      (query, params)
+    """
+    rows = merge_rows(keys, nodes)
+    clause_list = [
+        'UNWIND $rows AS row',
+        'MERGE (n:{} {{{}}})'.format(
+            key_label,
+            ', '.join('{0}: row.{0}'.format(key) for key in keys)
+        ),
+    ]
+
+    other_labels = [label for label in labels if label != key_label]
+    if len(other_labels) > 0:
+        clause_list.append('SET n:{}'.format(':'.join(other_labels)))
+
+    clause_list.append('SET n += row RETURN id(n) AS id')
+    return ' '.join(clause_list), {'rows': rows}
+
+
+def build_relationship_batch(type, relationships, node_ids,
+                             merge=False) -> tuple:
+    """
+    Build one UNWIND statement creating all the relationships of the type,
+    the endpoints are matched by node id.
+
+    Args:
+      type: relationship type
+      relationships: relationships with the type
+      node_ids: mapping node -> id for the nodes have no id, see
+                graphic.engine.NodeIds
+      merge: merge the relationships instead of create
+
+    Returns:
+      (query, params)
+    """
+    def id_of(node):
+        if node.id is not None:
+            return node.id
+        return node_ids[node]
+
+    query = (
+        'UNWIND $rows AS row '
+        'MATCH (a) WHERE id(a) = row.from '
+        'MATCH (b) WHERE id(b) = row.to '
+        '{} (a)-[r:{}]->(b) SET r {} row.props'.format(
+            'MERGE' if merge else 'CREATE',
+            type,
+            '+=' if merge else '='
+        )
+    )
+    rows = [
+        {
+            'from': id_of(rel.node_from),
+            'to': id_of(rel.node_to),
+            'props': dict((key, val) for key, val in rel),
+        } for rel in relationships
+    ]
+    return query, {'rows': rows}
@@ -44,20 +44,40 @@ class Func:
         func._val = val
         return func
 
-    def __call__(self, lookup_field=None) -> str:
+    def __call__(self, lookup_field=None, params=None) -> str:
+        """
+        Args:
+          lookup_field: resolve the field expression to the query field
+          params: when given, the value is bound as a query parameter and
+                  only its placeholder is inlined into the output
+
+        """
         _field = self._field
         if lookup_field is not None:
             _field = lookup_field(_field)
 
-        return '{}{}{!r}'.format(
+        if params is None:
+            _val = repr(self._val)
+        else:
+            _val = params.add(self._val)
+
+        return '{}{}{}'.format(
             _field,
             self.exp,
-            self._val
+            _val
         )
 
     def __deepcopy__(self, memodict):
         return type(self)(self._field, self._val)
 
+    @property
+    def field(self):
+        return self._field
+
+    @property
+    def value(self):
+        return self._val
+
     def __hash__(self):
         return hash(self.__str__())
 
@@ -108,6 +128,10 @@ class Aggregation:
     def __deepcopy__(self, memodict):
         return type(self)(self._field, self._val)
 
+    @property
+    def field(self):
+        return self._field
+
     def __str__(self):
         return self.__repr__()
 
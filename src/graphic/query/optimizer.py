@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import math
+
+from .func import Func, lookup_func
+from .query_utils import Q, Param
+
+
+__all__ = ['optimize']
+
+
+# results of the subtrees which always or never match
+_TRUE = object()
+_FALSE = object()
+
+_RANGES = ('gt', 'gte', 'lt', 'lte')
+_LOWERS = ('gt', 'gte')
+
+# the predicates merged per field
+_MERGED = ('eq', 'neq', 'in') + _RANGES
+
+# compare with null is null, which drops the row as false
+_NULL_FALSE = _MERGED + ('startswith', 'endswith', 'contains')
+
+
+def optimize(where, lookup_field=None):
+    """
+    Rewrite the filter predicates to an equal but simpler Q, as the
+    cypher null semantics:
+
+      * the nested AND, OR and single child Qs are flattened
+      * the same predicates are kept once
+      * OR of equalities on one field is rewritten to IN
+      * the range bounds on one field in AND are merged to the tightest
+      * contradictions, ie: x=1 AND x=2, x>5 AND x<3, are detected
+
+    The Param values are opaque, only the same predicates of them are
+    deduplicated. Inside NOT, null is not false, ie: NOT (x = null) is
+    null, so the predicates never match there, ie: x = null, x>5 AND x<3,
+    are kept as they are and only the rewrites exact in the three valued
+    logic are made.
+
+    Args:
+      where: Q instance
+      lookup_field: resolve the field expression to the query field, the
+                    expressions of one field, ie: g__uid and g.uid, are
+                    merged if given
+
+    Returns:
+      Q instance, or None if the predicates never match
+    """
+    result = _Optimizer(lookup_field).visit(where)
+    if result is _FALSE:
+        return None
+    if result is _TRUE:
+        return Q()
+    if isinstance(result, Func):
+        return Q(result)
+    return result
+
+
+class _Optimizer:
+
+    __slots__ = ('_lookup_field', '_fields', '_exact')
+
+    def __init__(self, lookup_field):
+        self._lookup_field = lookup_field
+        # field expression -> key of the field
+        self._fields = {}
+        # under NOT, _FALSE must be false, not null
+        self._exact = False
+
+    def field(self, exp):
+        try:
+            return self._fields[exp]
+        except KeyError:
+            pass
+
+        key = exp
+        if self._lookup_field is not None:
+            try:
+                field = self._lookup_field(exp)
+            except ValueError:
+                field = None
+            if field is not None and field.entity is not None:
+                key = str(field)
+
+        self._fields[exp] = key
+        return key
+
+    def key(self, item):
+        """Hashable key, the same for the equal predicates"""
+        if isinstance(item, Func):
+            return (type(item).__name__, self.field(item.field),
+                    _value_key(item.value))
+
+        return (item.connector, item.negated,
+                tuple(self.key(child) for child in item.children))
+
+    def visit(self, q):
+        if isinstance(q, Func):
+            return self.visit_func(q)
+
+        if q.negated:
+            exact = self._exact
+            self._exact = True
+            try:
+                inner = self.visit(
+                    Q._make(q.connector, False, children=q.children)
+                )
+            finally:
+                self._exact = exact
+
+            # the sentinels are exact inside, they can be negated
+            if inner is _TRUE:
+                return _FALSE
+            if inner is _FALSE:
+                return _TRUE
+            if isinstance(inner, Func):
+                return Q._make(Q.AND, True, children=(inner, ))
+            return inner.negate()
+
+        children = []
+        for child in q.children:
+            child = self.visit(child)
+            if isinstance(child, Q) and child._mergeable(q.connector):
+                children.extend(child.children)
+            else:
+                children.append(child)
+
+        if q.connector == Q.AND:
+            return self.visit_and(children)
+        return self.visit_or(children)
+
+    def visit_func(self, func):
+        name = type(func).__name__
+        value = func.value
+        if isinstance(value, Param):
+            return func
+
+        if name in _NULL_FALSE and value is None and not self._exact:
+            return _FALSE
+        # x IN [] is false even if x is null
+        if name == 'in' and isinstance(value, (list, tuple)) and \
+                len(value) == 0:
+            return _FALSE
+        return func
+
+    def visit_and(self, children):
+        if any(child is _FALSE for child in children):
+            return _FALSE
+
+        children = self.dedupe(c for c in children if c is not _TRUE)
+
+        # field -> merged funcs, placed where the first one of the field is
+        groups = self.group(children, _MERGED)
+        merged = {}
+        for field, funcs in groups.items():
+            merged[field] = _merge_and(funcs) if len(funcs) > 1 else funcs
+            if merged[field] is None:
+                if not self._exact:
+                    return _FALSE
+                # null, not false, if the field is null
+                merged[field] = funcs
+
+        return _build(Q.AND, self.regroup(children, groups, merged), _TRUE)
+
+    def visit_or(self, children):
+        if any(child is _TRUE for child in children):
+            return _TRUE
+
+        children = self.dedupe(c for c in children if c is not _FALSE)
+
+        groups = self.group(children, ('eq', 'in'))
+        merged = {}
+        for field, funcs in groups.items():
+            merged[field] = _merge_or(funcs) if len(funcs) > 1 else funcs
+
+        return _build(Q.OR, self.regroup(children, groups, merged), _FALSE)
+
+    def dedupe(self, children):
+        kept = []
+        seen = set()
+        for child in children:
+            key = self.key(child)
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append(child)
+        return kept
+
+    def group(self, children, names):
+        """
+        Returns:
+          field key -> funcs of the names on it, with comparable values
+        """
+        groups = {}
+        for child in children:
+            if not isinstance(child, Func) or \
+                    type(child).__name__ not in names or \
+                    not _mergeable(child):
+                continue
+            groups.setdefault(self.field(child.field), []).append(child)
+        return groups
+
+    def regroup(self, children, groups, merged):
+        grouped = set(id(func) for funcs in groups.values() for func in funcs)
+        result = []
+        for child in children:
+            if id(child) not in grouped:
+                result.append(child)
+                continue
+
+            field = self.field(child.field)
+            if child is groups[field][0]:
+                result.extend(merged[field])
+        return result
+
+
+def _build(connector, children, empty):
+    if len(children) == 0:
+        return empty
+    if len(children) == 1:
+        return children[0]
+    return Q._make(connector, False, children=children)
+
+
+def _merge_and(funcs):
+    """
+    Returns:
+      list of the merged funcs, or None if they never match together
+    """
+    field = funcs[0].field
+    candidates = None
+    neqs = []
+    lower = upper = None
+
+    for func in funcs:
+        name = type(func).__name__
+        if name == 'eq':
+            values = [func.value]
+        elif name == 'in':
+            values = list(func.value)
+        elif name == 'neq':
+            neqs.append(func.value)
+            continue
+        elif name in _LOWERS:
+            lower = _tighter(lower, func, 1)
+            continue
+        else:
+            upper = _tighter(upper, func, -1)
+            continue
+
+        if candidates is None:
+            candidates = _unique(values)
+        else:
+            keys = set(_value_key(v) for v in values)
+            candidates = [v for v in candidates if _value_key(v) in keys]
+
+    if lower is _FALSE or upper is _FALSE:
+        return None
+
+    bounds = [bound for bound in (lower, upper) if bound is not None]
+    excluded = set(_value_key(v) for v in neqs)
+
+    if candidates is not None:
+        candidates = [
+            v for v in candidates
+            if _value_key(v) not in excluded
+            if all(_satisfy(v, bound) for bound in bounds)
+        ]
+        if len(candidates) == 0:
+            return None
+        if len(candidates) == 1:
+            return [lookup_func('eq')(field, candidates[0])]
+        return [lookup_func('in')(field, candidates)]
+
+    if lower is not None and upper is not None:
+        if _kind(lower.value) != _kind(upper.value):
+            return None
+        if lower.value > upper.value:
+            return None
+        if lower.value == upper.value:
+            if type(lower).__name__ == 'gte' and type(upper).__name__ == 'lte':
+                return [lookup_func('eq')(field, lower.value)]
+            return None
+
+    # x<>v is implied by the bounds which exclude v
+    result = list(bounds)
+    for value in _unique(neqs):
+        if any(not _satisfy(value, bound) for bound in bounds
+               if _kind(value) == _kind(bound.value)):
+            continue
+        result.append(lookup_func('neq')(field, value))
+    return result
+
+
+def _merge_or(funcs):
+    values = []
+    for func in funcs:
+        if type(func).__name__ == 'eq':
+            values.append(func.value)
+        else:
+            values.extend(func.value)
+
+    values = _unique(values)
+    if len(values) == 1:
+        return [lookup_func('eq')(funcs[0].field, values[0])]
+    return [lookup_func('in')(funcs[0].field, values)]
+
+
+def _tighter(bound, func, sign):
+    """
+    Args:
+      sign: 1 for the lower bounds, -1 for the upper ones
+    """
+    if bound is None or bound is _FALSE:
+        return func if bound is None else bound
+    if _kind(bound.value) != _kind(func.value):
+        # x > 1 AND x > 'a' never match
+        return _FALSE
+    if bound.value == func.value:
+        # the exclusive one is tighter
+        return func if type(func).__name__ in ('gt', 'lt') else bound
+    if (func.value > bound.value) == (sign > 0):
+        return func
+    return bound
+
+
+def _satisfy(value, bound):
+    if _kind(value) != _kind(bound.value):
+        return False
+    name = type(bound).__name__
+    if name == 'gt':
+        return value > bound.value
+    if name == 'gte':
+        return value >= bound.value
+    if name == 'lt':
+        return value < bound.value
+    return value <= bound.value
+
+
+def _mergeable(func):
+    """Only the numbers and strings are compared, the others are kept"""
+    value = func.value
+    if isinstance(value, Param):
+        return False
+    if type(func).__name__ == 'in':
+        return isinstance(value, (list, tuple)) and \
+            all(_kind(v) is not None for v in value)
+    return _kind(value) is not None
+
+
+def _kind(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    return None
+
+
+def _value_key(value):
+    kind = _kind(value)
+    if kind is not None:
+        return (kind, value)
+    if isinstance(value, Param):
+        return ('param', value.name)
+    try:
+        hash(value)
+    except TypeError:
+        return ('repr', type(value).__name__, repr(value))
+    return (type(value).__name__, value)
+
+
+def _unique(values):
+    seen = set()
+    result = []
+    for value in values:
+        key = _value_key(value)
+        if key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
-import copy
+import weakref
 
 from .func import Func
 from .func import lookup_func
@@ -58,6 +58,14 @@ class Field:
     def __call__(self):
         return self.__str__()
 
+    @property
+    def entity(self):
+        return self._ent
+
+    @property
+    def name(self):
+        return self._field_name
+
     def __hash__(self):
         return hash(self.__str__())
 
@@ -71,20 +79,88 @@ class Field:
         )
 
 
+class Param:
+    """
+    Named placeholder for a filter value which is bound later, used to
+    build prepared queries, see GQuery.prepare
+
+    ie: graphic.node('Geek').query.filter(uid=Param('uid')).prepare()
+
+    """
+
+    __slots__ = ('_name', )
+
+    def __init__(self, name):
+        if not name.isidentifier():
+            raise ValueError('invalid param name {!r}'.format(name))
+
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    def __eq__(self, other):
+        return isinstance(other, Param) and self.name == other.name
+
+    def __hash__(self):
+        return hash((Param, self.name))
+
+    def __repr__(self):
+        return '${}'.format(self.name)
+
+
 class Q:
+    """
+    Immutable tree of the filter predicates, combined by & | ~
+
+    Combine two Q costs O(1), the new Q refers to the two operands as
+    they are, which are shared but never changed. The children of the
+    combined Q are flattened only when accessed, ie: by the compilers, and
+    kept, the nested operands with the same connector are merged into one
+    level as:
+
+        Q(a=1) & Q(b=2) & Q(c=3) -> (AND: a=1, b=2, c=3)
+
+    The combined Q of the same operands is hash-consed, combine them again
+    returns the same instance while it is alive.
+    """
+
     AND = 'AND'
     OR = 'OR'
 
-    __slots__ = ('_children', '_connector', '_negated')
+    __slots__ = ('_connector', '_negated', '_operands', '_children',
+                 '_hash', '__weakref__')
 
-    def __init__(self, *args, **kwargs):
-        self._children = list(args)
+    # (connector, negated, id(left), id(right)) -> combined Q, the
+    # operands are alive as long as the combined one
+    _interned = weakref.WeakValueDictionary()
 
+    def __init__(self, *args, **kwargs):
+        children = list(args)
         for exp_str, val in kwargs.items():
-            self._children.append(Expression.parse(exp_str, val))
+            children.append(Expression.parse(exp_str, val))
 
         self._connector = self.AND
         self._negated = False
+        self._operands = None
+        self._children = tuple(children)
+        self._hash = None
+
+    @classmethod
+    def _make(cls, connector, negated, children=None, operands=None):
+        """
+        Args:
+          children: the flattened children
+          operands: (left, right) combined, flattened when accessed
+        """
+        q = cls.__new__(cls)
+        q._connector = connector
+        q._negated = negated
+        q._operands = operands
+        q._children = None if children is None else tuple(children)
+        q._hash = None
+        return q
 
     def __or__(self, other):
         return self._combine(other, self.OR)
@@ -93,10 +169,13 @@ class Q:
         return self._combine(other, self.AND)
 
     def __invert__(self):
-        obj = type(self)()
-        obj._add(self, self.AND)
-        obj.negate()
-        return obj
+        if not self.negated:
+            if self.connector == self.AND:
+                return self.negate()
+            if len(self) == 1:
+                return self._make(self.AND, True, children=self.children)
+
+        return self._make(self.AND, True, children=(self, ))
 
     def __str__(self):
         tmpl = '(NOT (%s: %s))' if self.negated else '(%s: %s)'
@@ -117,6 +196,9 @@ class Q:
         return other in self.children
 
     def __eq__(self, other):
+        if self is other:
+            return True
+
         if self.__class__ != other.__class__:
             return False
 
@@ -128,36 +210,42 @@ class Q:
             other.negated
         ) and self.children == other.children
 
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((self.connector, self.negated, self.children))
+        return self._hash
+
+    def __copy__(self):
+        return self
+
     def __deepcopy__(self, memodict):
-        cpy_q = type(self)()
-        cpy_q._connector = self._connector
-        cpy_q._negated = self.negated
-        cpy_q._children = copy.deepcopy(self.children, memodict)
-        return cpy_q
+        # immutable, the copy is itself
+        return self
 
     def _combine(self, other, conn):
         if not isinstance(other, type(self)):
             raise TypeError(other)
 
         # If the other Q() is empty, ignore it and just use `self`.
-        if len(other) == 0:
-            return copy.deepcopy(self)
+        if other._is_empty():
+            return self
         # Or if this Q is empty, ignore it and just use `other`.
-        elif len(self) == 0:
-            return copy.deepcopy(other)
-
-        obj = type(self)()
-        obj._connector = conn
-        obj._add(self, conn)
-        obj._add(other, conn)
-        return obj
-
-    def _clone(self):
-        cloned = type(self)()
-        cloned._connector = self._connector
-        cloned._negated = self.negated
-        cloned._children = self.children
-        return cloned
+        elif self._is_empty():
+            return other
+
+        key = (conn, False, id(self), id(other))
+        try:
+            return self._interned[key]
+        except KeyError:
+            pass
+
+        combined = self._make(conn, False, operands=(self, other))
+        self._interned[key] = combined
+        return combined
+
+    def _is_empty(self):
+        # a combined one has two non empty operands
+        return self._operands is None and len(self._children) == 0
 
     @property
     def connector(self):
@@ -165,6 +253,9 @@ class Q:
 
     @property
     def children(self):
+        """Flattened children, tuple of Func and Q"""
+        if self._children is None:
+            self._children = self._flatten()
         return self._children
 
     @property
@@ -172,24 +263,49 @@ class Q:
         return self._negated
 
     def negate(self):
-        """Negate the sense of the root connector."""
-        self._negated = not self.negated
-
-    def _add(self, other, conn_type):
-        if other in self.children:
-            return self
-
-        if self.connector == conn_type:
-            if all((
-                not other.negated,
-                (other.connector == conn_type or len(other) == 1)
-            )):
-                self.children.extend(other.children)
+        """Return the Q of which the sense of the root connector negated"""
+        if self._operands is not None:
+            return self._make(self.connector, not self.negated,
+                              operands=self._operands)
+
+        return self._make(self.connector, not self.negated,
+                          children=self._children)
+
+    def _mergeable(self, conn):
+        return not self.negated and (self.connector == conn or len(self) == 1)
+
+    def _flatten(self):
+        """
+        Children of the combined Q, the operands with the same connector
+        are merged, the same child is kept once
+        """
+        conn = self.connector
+        children = []
+        seen = set()
+
+        # walk down the operands by a stack, the left first, a chain of
+        # filters is as deep as its length on either side
+        stack = list(reversed(self._operands))
+        while stack:
+            operand = stack.pop()
+            if operand._children is None:
+                if not operand.negated and operand.connector == conn:
+                    stack.extend(reversed(operand._operands))
+                    continue
+                # a combined one has two children at least, never merged
+                candidates = (operand, )
+            elif operand._mergeable(conn):
+                candidates = operand._children
             else:
-                self.children.append(other)
-        else:
-            sub_q = self._clone()
-            self._connector = conn_type
-            self._children = [sub_q, other]
-
-        return self
+                candidates = (operand, )
+
+            for child in candidates:
+                if isinstance(child, Q):
+                    # by identity, the equal combined ones are the same
+                    # instance mostly, and it need not flatten the child
+                    if id(child) in seen:
+                        continue
+                    seen.add(id(child))
+                children.append(child)
+
+        return tuple(children)
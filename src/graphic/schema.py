@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import threading
+from collections import Counter, namedtuple
+
+from .query.func import Func
+from .query.query_utils import Field
+
+
+__all__ = ['Index', 'SchemaCatalog', 'filtered_properties']
+
+
+Index = namedtuple('Index', ['label', 'properties', 'unique'])
+Index.__doc__ = """
+Index of the node properties with the label
+
+  label: node label
+  properties: tuple of the property names, more than one if composite
+  unique: whether it is owned by a uniqueness or node key constraint
+"""
+
+
+# the predicates a property index can answer
+_INDEXED_FUNCS = frozenset(
+    ('eq', 'in', 'gt', 'gte', 'lt', 'lte', 'startswith')
+)
+
+
+class SchemaCatalog:
+    """
+    What graphic knows about the schema of one graph: the indexes exist in
+    the server, the ones declared wanted and the (label, property) pairs
+    the compiled filters compare.
+
+    Thread safe, shared by all the queries of the graph. The version is
+    increased when the known indexes change, so what compiled from them can
+    be dropped.
+    """
+
+    __slots__ = ('_indexes', '_declared', '_observed', '_version', '_lock')
+
+    def __init__(self):
+        # (label, properties) -> Index
+        self._indexes = {}
+        self._declared = set()
+        self._observed = Counter()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def indexes(self):
+        """Known indexes, sorted by label and properties"""
+        return sorted(self._indexes.values())
+
+    @property
+    def declared(self):
+        """frozenset of the declared (label, properties)"""
+        return frozenset(self._declared)
+
+    @property
+    def observed(self):
+        """(label, property) -> number of the compiled queries filter on"""
+        with self._lock:
+            return dict(self._observed)
+
+    def load(self, indexes, replace=True):
+        """
+        Args:
+          indexes: iterable of Index
+          replace: forget the indexes known before
+        """
+        with self._lock:
+            if replace:
+                self._indexes = {}
+            for index in indexes:
+                self._indexes[(index.label, tuple(index.properties))] = index
+            self._version += 1
+
+    def declare(self, label, *properties):
+        """Declare an index is wanted, see missing"""
+        if len(properties) == 0:
+            raise ValueError('index on {} without properties'.format(label))
+
+        with self._lock:
+            self._declared.add((label, tuple(properties)))
+        return self
+
+    def observe(self, pairs):
+        """
+        Args:
+          pairs: iterable of (label, property) compared by a query
+        """
+        with self._lock:
+            self._observed.update(pairs)
+
+    def index_for(self, label, property):
+        """
+        Returns:
+          the single property Index of the label, None if not known
+        """
+        return self._indexes.get((label, (property, )))
+
+    def covered(self, label, properties):
+        """Whether a known index starts with the properties"""
+        properties = tuple(properties)
+        return any(
+            index.properties[:len(properties)] == properties
+            for index in self._indexes.values() if index.label == label
+        )
+
+    def missing(self, min_count=1):
+        """
+        Recommend the indexes to create: the declared ones not known, and
+        the observed pairs compared by at least min_count compiled queries
+        which no known index covers
+
+        Returns:
+          list of (label, properties), the declared first
+        """
+        with self._lock:
+            declared = sorted(self._declared)
+            observed = sorted(
+                (label, (property, ))
+                for (label, property), count in self._observed.items()
+                if count >= min_count
+            )
+
+        missing = []
+        for label, properties in declared + observed:
+            if (label, properties) in missing or \
+                    self.covered(label, properties):
+                continue
+            missing.append((label, properties))
+        return missing
+
+
+def filtered_properties(gquery):
+    """
+    The node properties compared by the filters of the query, the id and
+    the relationship properties are skipped
+
+    Yields:
+      (alias, label, property, hintable), hintable if it is a top level
+      AND conjunct an index can answer, so an index hint never changes
+      what the query matches
+    """
+    lookup_field = gquery.context.lookup_field
+
+    def walk(q, top):
+        if isinstance(q, Func):
+            field = lookup_field(q.field)
+            node = field.entity
+            if node is None or not node.is_node() or field.name == Field.PK:
+                return
+
+            hintable = top and type(q).__name__ in _INDEXED_FUNCS
+            for label in sorted(node.labels):
+                yield node.alias, label, field.name, hintable
+            return
+
+        top = top and not q.negated and (q.connector == q.AND or len(q) == 1)
+        for child in q.children:
+            yield from walk(child, top)
+
+    return walk(gquery.where, True)
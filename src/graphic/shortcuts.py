@@ -78,12 +78,22 @@ def use(engine='graphic.engine.neo4j', **config) -> RemoteGraph:
     TODO(chuter): to add more config parameters support for tuning the
     connection with server, like read/write timeout, retry times etc.
 
+    The graphs with the same engine, URI, auth and pool config share one
+    driver, close the graph(or use it as context manager) to release it.
+
     Args:
       engine: default is 'graphic.engine.eno4j'
       config: ie: {
                 'URI': 'bolt://localhost',
                 'USER': 'neo4j',
-                'PASSWORD': 'test'
+                'PASSWORD': 'test',
+                'COMPILE_CACHE_SIZE': 256,
+                'RESULT_CACHE_SIZE': 1024,
+                'RESULT_CACHE_TTL': 60,
+                'MERGE_KEYS': {'Geek': 'uid', 'Company': ('cid', )},
+                'INDEX_HINTS': False,
+                'MAX_CONNECTION_POOL_SIZE': 100,
+                'CONNECTION_ACQUISITION_TIMEOUT': 60
               }
 
     """
@@ -103,3 +113,30 @@ def use_neo4j(**config):
     """See also use"""
 
     return use(**config)
+
+
+def use_neo4j_async(**config):
+    """
+    See also use, the asyncio engine, fetch and push are awaitable.
+    Need the neo4j driver with asyncio support
+    """
+
+    return use(engine='graphic.engine.neo4j_async', **config)
+
+
+def use_memory(**config):
+    """
+    See also use, the in memory engine, the graph is kept in the process
+    and queried locally
+    """
+
+    return use(engine='graphic.engine.memory', **config)
+
+
+def use_sqlite(**config):
+    """
+    See also use, the SQLite engine, the graph is persisted in the file of
+    PATH config and queried by SQL, ie: use_sqlite(PATH='graph.db')
+    """
+
+    return use(engine='graphic.engine.sqlite', **config)
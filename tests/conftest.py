@@ -17,4 +17,6 @@ GraphDatabase.driver = new_fake_driver
 
 @pytest.fixture
 def neo4j_graph():
-    return graphic.use_neo4j()
+    graph = graphic.use_neo4j()
+    yield graph
+    graph.close()
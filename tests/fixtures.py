@@ -6,12 +6,114 @@ class FakeNeo4jDriver:
 
     def __init__(self, uri, **config):
         super().__init__()
+        self.session_closed = False
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
+        self.session_closed = True
+
+    def session(self, *args, **config):
+        self.session_closed = False
+        return self
+
+    def begin_transaction(self, *args, **config):
+        return self
+
+    def commit(self):
         pass
 
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeSessionResult:
+    """Fake driver result, can't be read once its session closed"""
+
+    def __init__(self, session, records):
+        self._session = session
+        self._records = records
+
+    def __iter__(self):
+        if self._session.session_closed:
+            raise RuntimeError('result consumed, the session is closed')
+        return iter(self._records)
+
+
+def fake_run_returns_ids(query, params=None):
+    """Fake `run` answers the UNWIND ... RETURN id(n) with row indexes"""
+    if params is None or 'RETURN id(n)' not in query:
+        return []
+
+    return [{'id': index} for index, _ in enumerate(params['rows'])]
+
+
+class FakeAsyncNeo4jDriver:
+    """Fake asyncio driver, also play as the session and transaction"""
+
+    def __init__(self, uri, **config):
+        super().__init__()
+        self.runs = []
+        self.sessions = 0
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
     def session(self, *args, **config):
+        self.sessions += 1
+        return self
+
+    async def begin_transaction(self, *args, **config):
+        return self
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    async def run(self, query, params=None):
+        self.runs.append((query, params))
+        return FakeAsyncResult(fake_run_returns_ids(query, params))
+
+    async def close(self):
+        self.closed += 1
+
+
+class FakeAsyncResult:
+
+    def __init__(self, records):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def consume(self):
+        return FakeSummary()
+
+
+class FakeSummary:
+    """Result summary with the plan of EXPLAIN and PROFILE"""
+
+    def __init__(self, plan=None, profile=None):
+        self.plan = plan
+        self.profile = profile
+
+    def consume(self):
         return self
@@ -1,9 +1,15 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
+import pytest
+
 import graphic
 
 from graphic.query.cypher.compiler import build as build_create_cypher
+from graphic.engine.push import group_nodes, group_relationships
+from graphic.query.cypher.compiler import build_node_batch
+from graphic.query.cypher.compiler import build_node_merge_batch
+from graphic.query.cypher.compiler import build_relationship_batch
 
 
 class TestCreateQueryBuild:
@@ -82,3 +88,112 @@ class TestCreateQueryBuild:
             'CREATE (chuter)-[cs:TALKTO]->(saras)',
             rel_pos + 1
         ) == -1
+
+
+class TestUnwindBatchBuild:
+
+    def test_group_nodes_by_labels(self):
+        chuter = graphic.node('Boss')._as('chuter')
+        robert = graphic.node('Geek', 'Boss')._as('robert')
+        geek = graphic.node('Boss', uid=1)
+        groups = group_nodes([chuter, robert, chuter, geek])
+
+        assert list(groups.items()) == [
+            (('Boss', ), [chuter, geek]),
+            (('Boss', 'Geek'), [robert]),
+        ]
+
+    def test_group_relationships_by_type(self):
+        chuter = graphic.node('Boss')._as('chuter')
+        saras = graphic.node('Boss')._as('saras')
+        talk = graphic.relationship(chuter, saras, type='TALKTO')
+        groups = group_relationships([
+            talk,
+            talk,
+            graphic.relationship(saras, chuter, type='KNOWS'),
+        ])
+
+        assert list(groups) == ['TALKTO', 'KNOWS']
+        assert groups['TALKTO'] == [talk]
+
+    def test_group_relationships_without_type(self):
+        with pytest.raises(KeyError):
+            group_relationships([
+                graphic.relationship(graphic.node(), graphic.node())
+            ])
+
+    def test_node_batch(self):
+        query, params = build_node_batch(
+            ('Boss', 'Geek'),
+            [graphic.node('Boss', 'Geek', uid=1), graphic.node(uid=2)]
+        )
+        assert query == (
+            'UNWIND $rows AS row CREATE (n:Boss:Geek) SET n = row '
+            'RETURN id(n) AS id'
+        )
+        assert params == {'rows': [{'uid': 1}, {'uid': 2}]}
+
+    def test_node_batch_without_labels(self):
+        query, _ = build_node_batch((), [graphic.node()])
+        assert query.startswith('UNWIND $rows AS row CREATE (n) SET')
+
+    def test_relationship_batch(self):
+        chuter = graphic.node('Boss')._as('chuter')
+        saras = graphic.node('Boss', id=7)
+        query, params = build_relationship_batch(
+            'TALKTO',
+            [graphic.relationship(chuter, saras, type='TALKTO', at=1)],
+            {chuter: 3}
+        )
+        assert query == (
+            'UNWIND $rows AS row '
+            'MATCH (a) WHERE id(a) = row.from '
+            'MATCH (b) WHERE id(b) = row.to '
+            'CREATE (a)-[r:TALKTO]->(b) SET r = row.props'
+        )
+        assert params == {'rows': [{'from': 3, 'to': 7, 'props': {'at': 1}}]}
+
+
+class TestUnwindMergeBatchBuild:
+
+    def test_node_merge_batch(self):
+        query, params = build_node_merge_batch(
+            'Geek',
+            ('uid', ),
+            ('Boss', 'Geek'),
+            [graphic.node('Boss', 'Geek', uid=1, name='chuter')]
+        )
+        assert query == (
+            'UNWIND $rows AS row MERGE (n:Geek {uid: row.uid}) '
+            'SET n:Boss SET n += row RETURN id(n) AS id'
+        )
+        assert params == {'rows': [{'uid': 1, 'name': 'chuter'}]}
+
+    def test_node_merge_batch_compound_keys(self):
+        query, _ = build_node_merge_batch(
+            'Geek',
+            ('uid', 'org'),
+            ('Geek', ),
+            [graphic.node('Geek', uid=1, org=2)]
+        )
+        assert query == (
+            'UNWIND $rows AS row MERGE (n:Geek {uid: row.uid, org: row.org}) '
+            'SET n += row RETURN id(n) AS id'
+        )
+
+    def test_node_merge_batch_miss_keys(self):
+        with pytest.raises(ValueError):
+            build_node_merge_batch(
+                'Geek', ('uid', ), ('Geek', ), [graphic.node('Geek', name=1)]
+            )
+
+    def test_relationship_merge_batch(self):
+        chuter = graphic.node('Geek', id=1)
+        saras = graphic.node('Geek', id=2)
+        query, _ = build_relationship_batch(
+            'KNOWS',
+            [graphic.relationship(chuter, saras, type='KNOWS')],
+            {},
+            merge=True
+        )
+        assert query.endswith('MERGE (a)-[r:KNOWS]->(b) SET r += row.props')
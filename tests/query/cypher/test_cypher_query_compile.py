@@ -4,8 +4,11 @@
 import pytest
 
 import graphic
+from graphic.query import Q
 from graphic.query.func import avg
 from graphic.query.cypher.compiler import compile as compile_cypher
+from graphic.query.cypher.compiler import compile_with_params
+from graphic.query.cypher.compiler import fingerprint
 
 
 class TestSingleNodeSingleMatchQueryCompile:
@@ -167,3 +170,101 @@ class TestSingleRelationSingleMatchQueryCompile:
     def test_build_only_dueto_relationship(self, relationshiop,
                                            expected_cyphe):
         assert expected_cyphe == compile_cypher(relationshiop.query)
+
+
+class TestParameterizedQueryCompile:
+
+    def test_without_filter(self):
+        query, params = compile_with_params(graphic.node()._as('geek').query)
+        assert query == r'MATCH (geek) RETURN geek LIMIT 20'
+        assert params == {}
+
+    def test_filter_values_as_params(self):
+        query, params = compile_with_params(
+            graphic.node("User", uid=12345)._as('geek').query.filter(
+                geek__age__gte=30
+            )
+        )
+        assert query == (
+            r'MATCH (geek:User) WHERE (geek.uid=$p0 AND geek.age>=$p1) '
+            r'RETURN geek LIMIT 20'
+        )
+        assert params == {'p0': 12345, 'p1': 30}
+
+    def test_same_shape_same_query(self):
+        query_a, params_a = compile_with_params(
+            graphic.node("User", uid=1)._as('geek').query
+        )
+        query_b, params_b = compile_with_params(
+            graphic.node("User", uid=2)._as('geek').query
+        )
+        assert query_a == query_b
+        assert params_a == {'p0': 1}
+        assert params_b == {'p0': 2}
+
+    def test_in_list_as_single_param(self):
+        query, params = compile_with_params(
+            graphic.node().query.filter(uid__in=[1, 2, 3])
+        )
+        assert query == r'MATCH (_) WHERE _.uid IN $p0 RETURN _ LIMIT 20'
+        assert params == {'p0': [1, 2, 3]}
+
+    def test_negated_filter(self):
+        query, params = compile_with_params(
+            graphic.node()._as('g').query.filter(
+                Q(g__uid=1) & ~(Q(g__age=2) | Q(g__name='x')) & ~Q(g__age=3)
+            )
+        )
+        assert query == (
+            r'MATCH (g) WHERE (g.uid=$p0 AND NOT ((g.age=$p1 OR g.name=$p2))'
+            r' AND NOT (g.age=$p3)) RETURN g LIMIT 20'
+        )
+        assert params == {'p0': 1, 'p1': 2, 'p2': 'x', 'p3': 3}
+
+
+class TestQueryFingerprint:
+
+    def test_params_match_compiled(self):
+        query = graphic.node("User", uid=12345)._as('geek').query.filter(
+            graphic.query.Q(geek__age__gte=30) | graphic.query.Q(geek__vip=1)
+        )
+        _, params = fingerprint(query)
+        assert params == compile_with_params(query)[1]
+
+    @pytest.mark.parametrize("query_a, query_b", [
+        (
+            graphic.node("User", uid=1).query,
+            graphic.node("User", uid=2).query,
+        ),
+        (
+            graphic.node().query.filter(name__startswith='a'),
+            graphic.node().query.filter(name__startswith='b'),
+        ),
+    ])
+    def test_same_shape(self, query_a, query_b):
+        assert fingerprint(query_a)[0] == fingerprint(query_b)[0]
+
+    @pytest.mark.parametrize("query_a, query_b", [
+        (
+            graphic.node("User", uid=1).query,
+            graphic.node("Geek", uid=1).query,
+        ),
+        (
+            graphic.node(uid=1).query,
+            graphic.node(uid__gt=1).query,
+        ),
+        (
+            graphic.node().query.order_by('uid'),
+            graphic.node().query.order_by('-uid'),
+        ),
+        (
+            graphic.node().query.select('id'),
+            graphic.node().query,
+        ),
+        (
+            graphic.node()._as('a').query,
+            graphic.node()._as('b').query,
+        ),
+    ])
+    def test_different_shape(self, query_a, query_b):
+        assert fingerprint(query_a)[0] != fingerprint(query_b)[0]
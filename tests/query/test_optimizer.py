@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import graphic
+from graphic.query import Q, Param
+from graphic.query.optimizer import optimize
+from graphic.query.cypher.compiler import compile_with_params
+
+
+class TestOptimize:
+
+    def test_flatten_nested(self):
+        q = Q(Q(Q(a=1))) & (Q(b=2) & Q(Q(c=3)))
+
+        assert str(optimize(q)) == '(AND: eq(a, 1), eq(b, 2), eq(c, 3))'
+        assert optimize(Q()) == Q()
+
+    def test_dedupe(self):
+        lookup_field = graphic.node()._as('g').query.context.lookup_field
+        q = Q(g__uid=1) & Q(g__name='x') & Q(**{'g.uid': 1})
+
+        assert str(optimize(q, lookup_field=lookup_field)) == \
+            "(AND: eq(g__uid, 1), eq(g__name, 'x'))"
+
+    def test_or_of_equalities_to_in(self):
+        q = Q(a=1) | Q(a=2) | Q(b=1) | Q(a=3) | Q(a=1)
+
+        assert str(optimize(q)) == '(OR: in(a, [1, 2, 3]), eq(b, 1))'
+        assert str(optimize(Q(a__in=[1, 2]) | Q(a=3))) == \
+            '(AND: in(a, [1, 2, 3]))'
+
+    def test_merge_range_bounds(self):
+        q = Q(a__gt=1) & Q(a__gte=3) & Q(a__lt=10) & Q(a__lte=10)
+        assert str(optimize(q)) == '(AND: gte(a, 3), lt(a, 10))'
+
+        q = Q(a__gte=3) & Q(a__lte=3)
+        assert str(optimize(q)) == '(AND: eq(a, 3))'
+
+        q = Q(a=5) & Q(a__gt=1) & Q(a__neq=4)
+        assert str(optimize(q)) == '(AND: eq(a, 5))'
+
+        q = Q(a__in=[1, 5, 9]) & Q(a__in=[5, 9, 12]) & Q(a__lt=7)
+        assert str(optimize(q)) == '(AND: eq(a, 5))'
+
+        # x<>20 is implied by x<10
+        q = Q(a__lt=10) & Q(a__neq=20) & Q(a__neq=3)
+        assert str(optimize(q)) == '(AND: lt(a, 10), neq(a, 3))'
+
+    def test_contradictions(self):
+        assert optimize(Q(a=1) & Q(a=2)) is None
+        assert optimize(Q(a__gt=5) & Q(a__lt=3)) is None
+        assert optimize(Q(a__gt=3) & Q(a__lt=3)) is None
+        assert optimize(Q(a=1) & Q(a__neq=1)) is None
+        assert optimize(Q(a=1) & Q(a__in=[2, 3])) is None
+        assert optimize(Q(a=1) & Q(a__gt='x')) is None
+        assert optimize(Q(a__gt=1) & Q(a__lt='x')) is None
+        assert optimize(Q(a=None)) is None
+        assert optimize(Q(a__in=[])) is None
+
+        # the contradicted branch of OR is dropped
+        q = (Q(a=1) & Q(a=2)) | Q(b=1)
+        assert str(optimize(q)) == '(AND: eq(b, 1))'
+
+        # not negated, it is null, not false, if a is null
+        assert str(optimize(Q(b=1) & ~(Q(a=1) & Q(a=2)))) == \
+            '(AND: eq(b, 1), (NOT (AND: eq(a, 1), eq(a, 2))))'
+        assert str(optimize(~(Q(age__gt=5) & Q(age__lt=3)))) == \
+            '(NOT (AND: gt(age, 5), lt(age, 3)))'
+        assert str(optimize(~Q(age=None))) == '(NOT (AND: eq(age, None)))'
+
+        # x IN [] is false even if x is null
+        assert optimize(~Q(a__in=[])) == Q()
+        assert optimize(~Q()) is None
+
+    def test_negated_null_semantics(self):
+        graph = graphic.use_memory()
+        graph.push(
+            graphic.node('Geek', uid=1, age=4)._as('g1'),
+            graphic.node('Geek', uid=2)._as('g2'),
+        )
+
+        for where in (
+            ~Q(g__age=None),
+            ~(Q(g__age__gt=5) & Q(g__age__lt=3)),
+            ~(Q(g__age=None) | Q(g__uid=3)),
+            ~~(Q(g__age__gt=5) & Q(g__age__lt=3)),
+        ):
+            query = graphic.node('Geek')._as('g').query.filter(where)
+            optimized = query.optimized()
+            expected = sorted(
+                r['g']['uid'] for r in graph.fetch(query).records
+            )
+            assert expected == ([] if optimized is None else sorted(
+                r['g']['uid'] for r in graph.fetch(optimized).records
+            ))
+
+    def test_kept_as_they_are(self):
+        q = Q(a=Param('a')) & Q(a=Param('a')) & Q(a=1)
+        assert str(optimize(q)) == '(AND: eq(a, $a), eq(a, 1))'
+
+        # bool is not a number in cypher
+        q = Q(a=True) | Q(a=1)
+        assert str(optimize(q)) == '(OR: eq(a, True), eq(a, 1))'
+
+        q = Q(a__startswith='x') & Q(a__startswith='x')
+        assert str(optimize(q)) == "(AND: startswith(a, 'x'))"
+
+        q = ~(Q(a=1) | Q(a=2))
+        assert str(optimize(q)) == '(NOT (AND: in(a, [1, 2])))'
+
+
+class TestGQueryOptimized:
+
+    def test_compile_optimized(self, neo4j_graph):
+        query = graphic.node('Geek', uid=1)._as('g').query.filter(
+            Q(g__uid=1) & (Q(g__name='a') | Q(g__name='b'))
+        )
+
+        cypher, params = neo4j_graph.compile(query)
+        assert cypher == compile_with_params(query.optimized())[0]
+        assert 'g.name IN $p1' in cypher
+        assert params == {'p0': 1, 'p1': ['a', 'b']}
+
+    def test_optimized_kept(self):
+        query = graphic.node()._as('g').query.filter(g__uid=1)
+        assert query.optimized().where is query.optimized().where
+
+        query.limit(5)
+        assert query.optimized().limit() == 5
+        assert query.filter(g__uid=2).optimized() is None
+
+    def test_contradiction_short_circuit(self, neo4j_graph):
+        query = graphic.node('Geek', uid=1)._as('g').query.filter(g__uid=2)
+
+        assert neo4j_graph.fetch(query).graph.is_empty()
+        assert list(neo4j_graph.fetch(query, stream=True)) == []
+        assert neo4j_graph.fetch_many([query])[0].graph.is_empty()
+        assert neo4j_graph._driver is None
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import copy
+
+import graphic
+from graphic.query import Q
+from graphic.query.cypher.compiler import compile_with_params
+
+
+class TestQ:
+
+    def test_flatten_same_connector(self):
+        q = Q(a=1) & Q(b=2) & (Q(c=3) & Q(d=4))
+
+        assert q.connector == Q.AND
+        assert [child.field for child in q.children] == ['a', 'b', 'c', 'd']
+
+    def test_nested_connectors(self):
+        q = (Q(a=1) | Q(b=2)) & Q(c=3)
+
+        assert len(q) == 2
+        assert q.children[0].connector == Q.OR
+        assert str(q) == \
+            "(AND: (OR: eq(a, 1), eq(b, 2)), eq(c, 3))"
+
+    def test_combine_shares_operands(self):
+        left, right = Q(a=1), Q(b=2)
+        q = left & right
+
+        assert q._operands[0] is left and q._operands[1] is right
+        # hash-consed
+        assert (left & right) is q
+        assert (Q() & left) is left and (left | Q()) is left
+
+    def test_immutable(self):
+        q = Q(a=1) & Q(b=2)
+        negated = q.negate()
+
+        assert not q.negated and negated.negated
+        assert negated.children == q.children
+        assert copy.deepcopy(q) is q
+
+        inverted = ~(Q(a=1) | Q(b=2))
+        assert inverted.negated and inverted.connector == Q.AND
+        assert inverted.children[0].connector == Q.OR
+
+    def test_same_child_kept_once(self):
+        either = Q(a=1) | Q(b=2)
+        q = either & either
+
+        assert q.children == (either, )
+        assert q == Q._make(Q.AND, False, children=(either, ))
+        assert hash(q) == hash(Q._make(Q.AND, False, children=(either, )))
+
+    def test_long_chain(self):
+        query = graphic.node('Geek')._as('g').query
+        for index in range(5000):
+            query.filter(g__age__gte=index)
+
+        cypher, params = compile_with_params(query)
+        assert len(query.where) == 5000
+        assert len(params) == 5000
+        assert cypher.startswith('MATCH (g:Geek) WHERE (g.age>=$p0 AND')
+
+    def test_long_right_nested_chain(self):
+        q = Q(a=-1)
+        for index in range(5000):
+            q = Q(a=index) & q
+        either = Q(b=1) | Q(b=2)
+        q = either & (q & either)
+
+        assert len(q) == 5002
+        assert q.children[0] is either
+        assert [child.value for child in q.children[1:4]] == [4999, 4998, 4997]
+        assert q.children[-1].value == -1
+        assert hash(q) == hash(Q._make(Q.AND, False, children=q.children))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+from graphic.cache import LRUCache, ResultCache
+
+
+class TestLRUCache:
+
+    def test_get_and_put(self):
+        cache = LRUCache(2)
+        assert cache.get('a') is None
+        cache.put('a', 1)
+        assert cache.get('a') == 1
+
+        info = cache.info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    def test_evict_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+        assert cache.info().evictions == 1
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.put('a', 1)
+        assert len(cache) == 0
+        assert cache.get('a', 'default') == 'default'
+
+    def test_invalid_maxsize(self):
+        with pytest.raises(ValueError):
+            LRUCache(-1)
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.clear()
+        assert cache.info() == (0, 0, 0, 2, 0)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResultCache:
+
+    def test_expire(self):
+        clock = FakeClock()
+        cache = ResultCache(2, ttl=10, clock=clock)
+        cache.put('a', 1)
+
+        clock.now = 9
+        assert cache.get('a') == 1
+
+        clock.now = 10
+        assert cache.get('a') is None
+        assert cache.info().expirations == 1
+        assert len(cache) == 0
+
+    def test_invalidate_by_tags(self):
+        cache = ResultCache(8)
+        cache.put('geeks', 1, tags={'Geek'})
+        cache.put('works', 2, tags={'Geek', 'WORK_FOR', 'Company'})
+        cache.put('companies', 3, tags={'Company'})
+        cache.put('any', 4, tags={ResultCache.ANY})
+
+        assert cache.invalidate({'Geek'}) == 3
+        assert 'companies' in cache
+        assert cache.info().invalidations == 3
+
+        assert cache.invalidate({'Company'}) == 1
+        assert len(cache) == 0
+
+    def test_evict_untag(self):
+        cache = ResultCache(1)
+        cache.put('a', 1, tags={'Geek'})
+        cache.put('b', 2, tags={'Geek'})
+
+        assert cache.info().evictions == 1
+        assert cache.invalidate({'Geek'}) == 1
+
+    def test_stale_put_dropped(self):
+        cache = ResultCache(2)
+        generation = cache.generation
+        cache.invalidate({'Geek'})
+        cache.put('a', 1, tags={'Geek'}, generation=generation)
+
+        assert 'a' not in cache
+
+    def test_invalid_ttl(self):
+        with pytest.raises(ValueError):
+            ResultCache(2, ttl=0)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from array import array
+
+import pytest
+
+import graphic
+from graphic.compact import CompactGraph, CompactGraphBuilder
+from graphic.engine import Result
+from graphic.graph import SubGraph
+
+from .test_hydrator import BoltGraph, BoltNode, BoltRelationship, FakeProxy
+
+
+def build_subgraph(rel_ids=(0, 1, 2), node_ids=()):
+    nodes = dict(
+        (id, graphic.node('Geek', id=id, uid=id, name='geek{}'.format(id)))
+        for id in range(5)
+    )
+    rels = {
+        0: graphic.relationship(nodes[0], nodes[1], 'KNOWS', id=0, since=1),
+        1: graphic.relationship(nodes[1], nodes[2], 'KNOWS', id=1),
+        2: graphic.relationship(nodes[2], nodes[0], 'LIKES', id=2, w=0.5),
+        3: graphic.relationship(nodes[3], nodes[4], 'LIKES', id=3, w=1.5),
+    }
+    return SubGraph(
+        nodes=[nodes[id] for id in node_ids],
+        relationships=[rels[id] for id in rel_ids]
+    )
+
+
+class TestCompactGraph:
+
+    def test_views(self):
+        subgraph = build_subgraph(node_ids=[4])
+        graph = CompactGraph.from_subgraph(subgraph)
+
+        assert len(graph.nodes) == 4
+        assert len(graph.relationships) == 3
+        assert graph == subgraph
+        assert subgraph == graph
+        assert hash(graph) == hash(subgraph)
+
+        node = graph.node(1)
+        assert node.labels == frozenset(['Geek'])
+        assert node['name'] == 'geek1'
+        assert graphic.node(id=3) not in graph.nodes
+
+        rel = graph.relationship(2)
+        assert rel.type == 'LIKES'
+        assert rel['w'] == 0.5
+        assert rel.node_from.id == 2 and rel.node_to['uid'] == 0
+        assert 'since' not in dict((k, v) for k, v in graph.relationship(1))
+
+        with pytest.raises(KeyError):
+            graph.node(3)
+
+    def test_to_subgraph(self):
+        subgraph = build_subgraph()
+        rebuilt = CompactGraph.from_subgraph(subgraph).to_subgraph()
+
+        assert rebuilt == subgraph
+        rel = next(iter(rebuilt.relationships))
+        assert any(node is rel.node_from for node in rebuilt.nodes)
+
+    def test_adjacency(self):
+        graph = CompactGraph.from_subgraph(build_subgraph())
+        node0 = graphic.node(id=0)
+
+        assert graph.neighbors(node0, SubGraph.OUT) == {graph.node(1)}
+        assert graph.neighbors(node0) == {graph.node(1), graph.node(2)}
+        assert graph.degree(node0) == 2
+        assert graph.degree(1, SubGraph.IN) == 1
+        assert graph.edges_between(0, 2) == {graph.relationship(2)}
+        assert graph.edges_between(0, 2, SubGraph.OUT) == frozenset()
+        assert graph.relationships_of_type('KNOWS') == \
+            {graph.relationship(0), graph.relationship(1)}
+
+        offsets, edges = graph.csr()
+        assert list(offsets) == [0, 1, 2, 3]
+        assert list(edges) == [0, 1, 2]
+
+    def test_relationships_of_type_indexed(self, mocker):
+        graph = CompactGraph.from_subgraph(build_subgraph(rel_ids=range(4)))
+        spy = mocker.spy(CompactGraph, '_relationship')
+
+        assert graph.relationships_of_type('LIKES') == \
+            {graph.relationship(2), graph.relationship(3)}
+        # only the ones of the type are built, besides the two above
+        assert spy.call_count == 4
+        assert graph.relationships_of_type('HATES') == frozenset()
+
+    @pytest.mark.parametrize('op', ['__or__', '__and__', '__sub__',
+                                    '__xor__'])
+    def test_set_operations(self, op):
+        left = build_subgraph(rel_ids=[0, 1], node_ids=[4])
+        right = build_subgraph(rel_ids=[1, 2, 3])
+
+        expected = getattr(left, op)(right)
+        compact = getattr(CompactGraph.from_subgraph(left), op)(
+            CompactGraph.from_subgraph(right)
+        )
+        assert compact == expected
+        assert getattr(CompactGraph.from_subgraph(left), op)(right) == \
+            expected
+
+    def test_columns(self):
+        graph = CompactGraph.from_subgraph(build_subgraph(rel_ids=[2, 3]))
+
+        columns = graph.node_columns('Geek')
+        assert list(columns) == ['id', 'uid', 'name']
+        assert isinstance(columns['uid'], array)
+        assert list(columns['uid']) == list(columns['id'])
+
+        likes = graph.relationship_columns('LIKES')
+        assert sorted(zip(likes['id'], likes['w'])) == [(2, 0.5), (3, 1.5)]
+        assert graph.relationship_columns('HATES') == {}
+
+    def test_without_id(self):
+        with pytest.raises(ValueError):
+            CompactGraph(nodes=[graphic.node('Geek')])
+
+    def test_builder(self):
+        graph = CompactGraphBuilder() \
+            .add_node(2, ['Geek'], {'uid': 2}) \
+            .add_node(1, ['Geek'], {'uid': 1}) \
+            .add_node(1, ['Geek'], {'uid': 100}) \
+            .add_relationship(7, 'KNOWS', 2, 1, {}) \
+            .build()
+
+        assert [node['uid'] for node in graph.nodes] == [1, 2]
+        assert graph.relationship(7).node_from.id == 2
+
+        with pytest.raises(KeyError):
+            CompactGraphBuilder().add_relationship(7, 'KNOWS', 2, 1, {}) \
+                .build()
+
+    def test_result_compact_graph(self):
+        geek = BoltNode(1, 'Geek', uid=1)
+        company = BoltNode(2, 'Company', cid=1)
+        result = Result(FakeProxy([], BoltGraph(
+            [geek],
+            [BoltRelationship(3, geek, company, 'WORK_AT', since=2000)]
+        )))
+
+        graph = result.compact_graph()
+        assert len(graph.nodes) == 2
+        assert graph.relationship(3)['since'] == 2000
+        assert graph.node(2)['cid'] == 1
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+import graphic
+from graphic.engine.neo4j_async import graph as neo4j_async
+
+from .fixtures import FakeAsyncNeo4jDriver
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class FakeAsyncGraphDatabase:
+
+    @staticmethod
+    def driver(uri, **config):
+        return FakeAsyncNeo4jDriver(uri, **config)
+
+
+@pytest.fixture
+def async_graph(monkeypatch):
+    monkeypatch.setattr(
+        neo4j_async,
+        'AsyncGraphDatabase',
+        FakeAsyncGraphDatabase
+    )
+    graph = graphic.use_neo4j_async()
+    yield graph
+    run(graph.close())
+
+
+class TestAsyncNeo4jFetch:
+
+    def test_engine(self, async_graph):
+        assert isinstance(async_graph, neo4j_async.AsyncNeo4jGraph)
+
+    def test_empty_fetch(self, async_graph):
+        result = run(async_graph.fetch(graphic.node().query.limit(0)))
+        assert result.graph.is_empty()
+        assert async_graph._driver is None
+
+    def test_fetch(self, async_graph):
+        query = graphic.node('Geek', uid=1).query
+        result = run(async_graph.fetch(query))
+
+        assert list(result.records) == []
+        assert async_graph._driver.runs == [async_graph.compile(query)]
+        assert async_graph._driver.closed == 1
+
+    def test_concurrent_fetch_share_driver(self, async_graph):
+        queries = [graphic.node('Geek', uid=uid).query for uid in range(10)]
+
+        async def fetch_all():
+            return await asyncio.gather(
+                *(async_graph.fetch(query) for query in queries)
+            )
+
+        results = run(fetch_all())
+        assert len(results) == 10
+        assert async_graph._driver.sessions == 10
+        assert [params for _, params in async_graph._driver.runs] == [
+            {'p0': uid} for uid in range(10)
+        ]
+
+    def test_stream_fetch(self, async_graph):
+        async def consume():
+            records = await async_graph.fetch(
+                graphic.node('Geek').query,
+                stream=True
+            )
+            async with records:
+                return [record async for record in records]
+
+        assert run(consume()) == []
+        assert async_graph._driver.closed == 1
+
+    def test_fetch_many(self, async_graph):
+        queries = [graphic.node('Geek', uid=uid).query for uid in range(3)]
+        queries.insert(1, graphic.node('Geek').query.filter(g__uid=1))
+
+        results = run(async_graph.fetch_many(queries, max_workers=2))
+
+        assert len(results) == 4
+        assert isinstance(results[1].error, AttributeError)
+        assert [list(results[index].records) for index in (0, 2, 3)] == \
+            [[], [], []]
+        assert async_graph._driver.sessions == 3
+        assert run(async_graph.fetch_many([])) == []
+
+
+class TestAsyncNeo4jPush:
+
+    def test_push(self, async_graph):
+        chuter = graphic.node('Boss')._as('chuter')
+        saras = graphic.node('Geek')._as('saras')
+
+        result = run(async_graph.push(
+            graphic.relationship(chuter, saras, type='HIRE')
+        ))
+
+        assert [(b.kind, b.count) for b in result.batches] == [
+            ('node', 1), ('node', 1), ('relationship', 1),
+        ]
+        assert async_graph._driver.runs[-1][1] == {
+            'rows': [{'from': 0, 'to': 0, 'props': {}}]
+        }
+
+    def test_push_stream_async_iterable(self, async_graph):
+        async def entities():
+            for uid in range(5):
+                yield graphic.node('Geek', uid=uid)._as('g{}'.format(uid))
+
+        result = run(async_graph.push_stream(entities(), batch_size=2))
+        assert [b.count for b in result.batches] == [2, 2, 1]
+
+    def test_close(self, async_graph):
+        run(async_graph.fetch(graphic.node('Geek').query))
+        driver = async_graph._driver
+
+        run(async_graph.close())
+        assert async_graph._driver is None
+        assert driver.closed == 2
+
+    def test_context_manager(self, async_graph):
+        async def use():
+            async with async_graph as graph:
+                await graph.fetch(graphic.node('Geek').query)
+                return graph._driver
+
+        driver = run(use())
+        assert async_graph._driver is None
+        assert driver.closed == 2
+
+        with pytest.raises(TypeError):
+            with async_graph:
+                pass
+
+
+class TestAsyncNeo4jTransaction:
+
+    def test_commit(self, async_graph):
+        async def write():
+            async with async_graph.transaction() as tx:
+                pushed = await tx.push(graphic.node('Geek', uid=1)._as('g'))
+                fetched = await tx.fetch(graphic.node('Geek', uid=1).query)
+            return tx, pushed, fetched
+
+        tx, pushed, fetched = run(write())
+        driver = async_graph._driver
+
+        assert tx.closed
+        assert pushed.count == 1
+        assert list(fetched.records) == []
+        assert (driver.sessions, driver.commits, driver.rollbacks) == \
+            (1, 1, 0)
+        assert driver.closed == 1
+
+    def test_rollback_on_error(self, async_graph):
+        async def write():
+            async with async_graph.transaction() as tx:
+                await tx.push(graphic.node('Geek', uid=1)._as('g'))
+                raise ValueError
+
+        with pytest.raises(ValueError):
+            run(write())
+
+        driver = async_graph._driver
+        assert (driver.commits, driver.rollbacks) == (0, 1)
+
+    def test_not_begun(self, async_graph):
+        with pytest.raises(RuntimeError):
+            run(async_graph.transaction().fetch(graphic.node('Geek').query))
+
+
+class TestAsyncNeo4jSchema:
+
+    def test_ensure_indexes(self, async_graph):
+        async_graph.merge_on('Geek', 'uid')
+
+        statements = run(async_graph.ensure_indexes())
+        assert statements == [
+            'CREATE INDEX IF NOT EXISTS FOR (n:Geek) ON (n.uid)'
+        ]
+        assert async_graph._driver.runs == [(statements[0], None)]
+        assert async_graph.schema.index_for('Geek', 'uid') is not None
+
+
+class TestAsyncNeo4jExplain:
+
+    def test_explain(self, async_graph):
+        query = graphic.node('Geek', uid=1).query
+        cypher, params = async_graph.compile(query)
+
+        assert run(async_graph.explain(query)) is None
+        assert async_graph._driver.runs == [('EXPLAIN ' + cypher, params)]
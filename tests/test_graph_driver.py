@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import threading
+import time
+
+from neo4j import GraphDatabase
+
+import graphic
+
+from .fixtures import FakeNeo4jDriver
+
+
+class TestNeo4jSharedDriver:
+
+    def test_share_driver_with_same_config(self):
+        with graphic.use_neo4j() as graph_a, graphic.use_neo4j() as graph_b:
+            assert graph_a._session() is graph_b._session()
+
+    def test_not_share_driver_with_different_config(self):
+        graph_a = graphic.use_neo4j(URI='bolt://a')
+        graph_b = graphic.use_neo4j(URI='bolt://b')
+        graph_c = graphic.use_neo4j(URI='bolt://a', USER='other')
+        graph_d = graphic.use_neo4j(URI='bolt://a', MAX_CONNECTION_POOL_SIZE=5)
+
+        drivers = [g._session() for g in (graph_a, graph_b, graph_c, graph_d)]
+        assert len(set(map(id, drivers))) == 4
+
+        for graph in (graph_a, graph_b, graph_c, graph_d):
+            graph.close()
+
+    def test_close_driver_with_last_graph(self, mocker):
+        spy = mocker.spy(FakeNeo4jDriver, 'close')
+        graph_a = graphic.use_neo4j(URI='bolt://closing')
+        graph_b = graphic.use_neo4j(URI='bolt://closing')
+        graph_a._session()
+        graph_b._session()
+
+        graph_a.close()
+        assert spy.call_count == 0
+        assert graph_a._driver is None
+
+        graph_b.close()
+        assert spy.call_count == 1
+
+        graph_b.close()
+        assert spy.call_count == 1
+
+    def test_reopen_after_close(self):
+        graph = graphic.use_neo4j(URI='bolt://reopen')
+        driver = graph._session()
+        graph.close()
+
+        assert graph._session() is not driver
+        graph.close()
+
+    def test_pool_config(self, mocker):
+        spy = mocker.spy(GraphDatabase, 'driver')
+        graph = graphic.use_neo4j(
+            URI='bolt://pool',
+            MAX_CONNECTION_POOL_SIZE=64,
+            CONNECTION_ACQUISITION_TIMEOUT=5
+        )
+        graph._session()
+        graph.close()
+
+        kwargs = spy.call_args[1]
+        assert kwargs['max_connection_pool_size'] == 64
+        assert kwargs['connection_acquisition_timeout'] == 5
+
+    def test_concurrent_create_one_driver(self, monkeypatch):
+        created = []
+
+        def slow_driver(uri, **config):
+            time.sleep(0.01)
+            driver = FakeNeo4jDriver(uri)
+            created.append(driver)
+            return driver
+
+        monkeypatch.setattr(GraphDatabase, 'driver', slow_driver)
+        graph = graphic.use_neo4j(URI='bolt://concurrent')
+
+        barrier = threading.Barrier(16)
+        sessions = []
+
+        def worker():
+            barrier.wait()
+            sessions.append(graph._session())
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        graph.close()
+        assert len(created) == 1
+        assert all(session is created[0] for session in sessions)
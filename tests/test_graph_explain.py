@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from collections import namedtuple
+
+import graphic
+from graphic.engine.explain import PlanNode, PlanIssue, plan_issues
+
+from .fixtures import FakeNeo4jDriver, FakeSummary
+
+
+def _plan(operator, details=None, children=(), **stats):
+    plan = {
+        'operatorType': '{}@neo4j'.format(operator),
+        'identifiers': ['g'],
+        'args': {'EstimatedRows': 10.0},
+        'children': list(children),
+    }
+    if details is not None:
+        plan['args']['Details'] = details
+    plan.update(stats)
+    return plan
+
+
+PLAN = _plan('ProduceResults', 'g', [
+    _plan('Limit', '20', [
+        _plan('CartesianProduct', children=[
+            _plan('NodeIndexSeek', 'RANGE INDEX g:Geek(uid)'),
+            _plan('NodeByLabelScan', 'c:Company'),
+        ])
+    ])
+])
+
+
+# the Plan of the neo4j 1.x driver
+OldPlan = namedtuple(
+    'OldPlan',
+    ['operator_type', 'identifiers', 'arguments', 'children', 'db_hits',
+     'rows']
+)
+
+
+class TestPlanNode:
+
+    def test_from_plan(self):
+        plan = PlanNode.from_plan(PLAN)
+
+        assert [node.operator for node in plan.walk()] == [
+            'ProduceResults', 'Limit', 'CartesianProduct', 'NodeIndexSeek',
+            'NodeByLabelScan'
+        ]
+        assert plan.estimated_rows == 10.0
+        assert plan.rows is None and plan.total_db_hits is None
+        assert plan.find('NodeIndexSeek')[0].details == \
+            'RANGE INDEX g:Geek(uid)'
+        assert plan.pretty().splitlines()[1] == \
+            '  Limit(20) estimated_rows=10.0'
+
+    def test_from_profile(self):
+        plan = PlanNode.from_plan(_plan('ProduceResults', children=[
+            _plan('AllNodesScan', dbHits=11, rows=10, pageCacheHits=3,
+                  pageCacheMisses=1)
+        ], dbHits=0, rows=10))
+
+        scan = plan.children[0]
+        assert (scan.rows, scan.db_hits) == (10, 11)
+        assert (scan.page_cache_hits, scan.page_cache_misses) == (3, 1)
+        assert plan.total_db_hits == 11
+
+        old = PlanNode.from_plan(OldPlan(
+            'NodeByLabelScan', ['g'], {'EstimatedRows': 5.0}, [], 6, 5
+        ))
+        assert (old.operator, old.estimated_rows, old.db_hits) == \
+            ('NodeByLabelScan', 5.0, 6)
+
+    def test_plan_issues(self):
+        plan = PlanNode.from_plan(PLAN)
+
+        assert plan_issues(plan) == [
+            PlanIssue('CartesianProduct', ('g', ), None),
+            PlanIssue('NodeByLabelScan', ('g', ), 'c:Company'),
+        ]
+        assert plan_issues(plan.find('NodeIndexSeek')[0]) == []
+
+
+class TestNeo4jExplain:
+
+    def test_explain(self, mocker, neo4j_graph):
+        query = graphic.node('Geek', uid=1)._as('g').query
+        cypher, params = neo4j_graph.compile(query)
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=FakeSummary(plan=PLAN)):
+            plan = neo4j_graph.explain(query)
+            FakeNeo4jDriver.run.assert_called_once_with(
+                'EXPLAIN ' + cypher, params
+            )
+
+        assert plan.operator == 'ProduceResults'
+
+    def test_profile(self, mocker, neo4j_graph):
+        query = graphic.node('Geek', uid=1)._as('g').query
+        profile = _plan('ProduceResults', dbHits=2, rows=1)
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=FakeSummary(profile=profile)):
+            plan = neo4j_graph.profile(query)
+            assert FakeNeo4jDriver.run.call_args[0][0].startswith('PROFILE ')
+
+        assert (plan.rows, plan.db_hits) == (1, 2)
@@ -2,9 +2,16 @@
 # -*- encoding: utf-8 -*-
 
 
+import time
+
+import pytest
+
 import graphic
+from graphic.query import Param, Q
+from graphic.schema import Index
 
-from .fixtures import FakeNeo4jDriver
+from .fixtures import FakeNeo4jDriver, FakeSessionResult
+from .fixtures import fake_run_returns_ids
 
 
 class TestNeo4jFetch:
@@ -21,5 +28,286 @@ class TestNeo4jFetch:
         with mocker.patch.object(FakeNeo4jDriver, 'run', create=True):
             neo4j_graph.fetch(query)
             neo4j_graph._driver.run.assert_called_once_with(
-                neo4j_graph.compile(query)
+                *neo4j_graph.compile(query)
+            )
+
+    def test_records_read_before_session_closed(self, mocker, neo4j_graph):
+        query = graphic.node('Geek', uid=1)._as('g').query
+
+        def run(query, params):
+            return FakeSessionResult(neo4j_graph._driver, [dict(params)])
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=run):
+            result = neo4j_graph.fetch(query)
+            many = neo4j_graph.fetch_many([query])
+
+        assert neo4j_graph._driver.session_closed
+        assert list(result.records) == [{'p0': 1}]
+        assert list(many[0].records) == [{'p0': 1}]
+
+
+class TestNeo4jCompileCache:
+
+    def test_same_shape_hit_cache(self, neo4j_graph):
+        query_a = graphic.node('Geek', uid=1)._as('g').query
+        query_b = graphic.node('Geek', uid=2)._as('g').query
+
+        cypher_a, params_a = neo4j_graph.compile(query_a)
+        cypher_b, params_b = neo4j_graph.compile(query_b)
+
+        assert cypher_a == cypher_b
+        assert params_a == {'p0': 1}
+        assert params_b == {'p0': 2}
+
+        info = neo4j_graph.compile_cache.info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    def test_different_shape_miss_cache(self, neo4j_graph):
+        neo4j_graph.compile(graphic.node('Geek', uid=1)._as('g').query)
+        neo4j_graph.compile(graphic.node('Geek', cid=1)._as('g').query)
+        neo4j_graph.compile(
+            graphic.node('Geek', uid=1)._as('g').query.limit(5)
+        )
+
+        info = neo4j_graph.compile_cache.info()
+        assert (info.hits, info.misses, info.currsize) == (0, 3, 3)
+
+    def test_cache_size_config(self):
+        neo4j_graph = graphic.use_neo4j(COMPILE_CACHE_SIZE=1)
+        neo4j_graph.compile(graphic.node(uid=1).query)
+        neo4j_graph.compile(graphic.node(cid=1).query)
+
+        info = neo4j_graph.compile_cache.info()
+        assert (info.evictions, info.maxsize, info.currsize) == (1, 1, 1)
+
+
+class TestNeo4jPreparedFetch:
+
+    def test_bound_query_fetch(self, mocker, neo4j_graph):
+        prepared = graphic.node('Geek')._as('g').query.filter(
+            g__uid=Param('uid'),
+            g__age__gt=30
+        ).prepare()
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True):
+            neo4j_graph.fetch(prepared.bind(uid=1234))
+            query, params = neo4j_graph._driver.run.call_args[0]
+
+        assert '$uid' in query
+        assert params == {'p0': 30, 'uid': 1234}
+
+    def test_bind_compiles_once(self, mocker, neo4j_graph):
+        prepared = graphic.node('Geek', uid=Param('uid')).query.prepare()
+
+        cypher_a, params_a = neo4j_graph.compile(prepared.bind(uid=1))
+        cypher_b, params_b = neo4j_graph.compile(prepared.bind(uid=2))
+
+        assert cypher_a is cypher_b
+        assert params_a == {'uid': 1}
+        assert params_b == {'uid': 2}
+
+    def test_prepare_freezes_query(self, neo4j_graph):
+        query = graphic.node('Geek', uid=Param('uid')).query
+        prepared = query.prepare()
+        query.filter(age=30).limit(1)
+
+        cypher, params = neo4j_graph.compile(prepared.bind(uid=1))
+        assert cypher == 'MATCH (_:Geek) WHERE _.uid=$uid RETURN _ LIMIT 20'
+        assert params == {'uid': 1}
+
+    def test_bound_query_optimized_and_hinted(self, mocker):
+        graph = graphic.use_neo4j(INDEX_HINTS=True)
+        graph.schema.load([Index('Geek', ('age', ), False)])
+        prepared = graphic.node('Geek')._as('g').query.filter(
+            Q(g__age=1) | Q(g__age=2),
+            g__uid=Param('uid')
+        ).prepare()
+
+        cypher, params = graph.compile(prepared.bind(uid=1))
+        assert 'USING INDEX g:Geek(age)' in cypher
+        assert 'g.age IN $p0' in cypher
+        assert params == {'p0': [1, 2], 'uid': 1}
+
+        graph.compile(prepared.bind(uid=2))
+        assert graph.schema.observed == {('Geek', 'age'): 2,
+                                         ('Geek', 'uid'): 2}
+
+        never = graphic.node('Geek')._as('g').query.filter(
+            g__uid=Param('uid'), g__age=1
+        ).filter(g__age=2).prepare()
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True):
+            assert graph.fetch(never.bind(uid=1)).graph.is_empty()
+            assert graph._driver is None
+
+    def test_bind_invalid_values(self):
+        prepared = graphic.node('Geek', uid=Param('uid')).query.prepare()
+
+        with pytest.raises(KeyError):
+            prepared.bind()
+
+        with pytest.raises(KeyError):
+            prepared.bind(uid=1, cid=2)
+
+    def test_zero_limit_bound_query(self, neo4j_graph):
+        prepared = graphic.node(uid=Param('uid')).query.limit(0).prepare()
+        result = neo4j_graph.fetch(prepared.bind(uid=1))
+        assert result.graph.is_empty()
+        assert neo4j_graph._driver is None
+
+
+class TestNeo4jStreamFetch:
+
+    def test_empty_stream(self, neo4j_graph):
+        records = neo4j_graph.fetch(graphic.node().query.limit(0), stream=True)
+        assert list(records) == []
+        assert neo4j_graph._driver is None
+
+    def test_stream_close_after_drained(self, mocker, neo4j_graph):
+        query = graphic.node('Geek').query
+        spy = mocker.spy(FakeNeo4jDriver, 'close')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=iter([1, 2, 3])):
+            records = neo4j_graph.fetch(query, stream=True)
+            assert next(records) == 1
+            assert spy.call_count == 0
+
+            assert list(records) == [2, 3]
+            assert spy.call_count == 1
+            assert records.closed
+
+    def test_stream_close_early(self, mocker, neo4j_graph):
+        query = graphic.node('Geek').query
+        spy = mocker.spy(FakeNeo4jDriver, 'close')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=iter([1, 2, 3])):
+            with neo4j_graph.fetch(query, stream=True) as records:
+                assert next(records) == 1
+
+        assert spy.call_count == 1
+        assert list(records) == []
+
+    def test_stream_fetch_size(self, mocker, neo4j_graph):
+        query = graphic.node('Geek').query
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=iter([])):
+            spy = mocker.spy(FakeNeo4jDriver, 'session')
+            list(neo4j_graph.fetch(query, stream=True, fetch_size=100))
+
+        assert spy.call_args[1] == {'fetch_size': 100}
+
+
+class TestNeo4jFetchMany:
+
+    def test_empty(self, neo4j_graph):
+        assert neo4j_graph.fetch_many([]) == []
+
+    def test_results_in_order(self, mocker, neo4j_graph):
+        queries = [graphic.node('Geek', uid=uid).query for uid in range(8)]
+
+        def run(query, params):
+            # finish in reverse order
+            time.sleep(0.002 * (8 - params['p0']))
+            return [dict(params)]
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=run):
+            results = neo4j_graph.fetch_many(queries, max_workers=4)
+
+        assert [list(result.records) for result in results] == [
+            [{'p0': uid}] for uid in range(8)
+        ]
+        assert all(result.error is None for result in results)
+
+    def test_errors_captured(self, mocker, neo4j_graph):
+        queries = [
+            graphic.node('Geek', uid=1).query,
+            graphic.node('Geek', uid=2).query,
+            graphic.node('Geek').query.limit(0),
+            graphic.node('Geek').query.filter(a__uid=1),
+        ]
+
+        def run(query, params):
+            if params['p0'] == 2:
+                raise RuntimeError('server down')
+            return [dict(params)]
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=run):
+            results = neo4j_graph.fetch_many(queries)
+
+        assert list(results[0].records) == [{'p0': 1}]
+        assert isinstance(results[1].error, RuntimeError)
+        assert results[2].graph.is_empty()
+        assert isinstance(results[3].error, AttributeError)
+
+        with pytest.raises(RuntimeError):
+            results[1].records
+
+
+class TestNeo4jResultCache:
+
+    @pytest.fixture
+    def cached_graph(self, mocker):
+        graph = graphic.use_neo4j(RESULT_CACHE_SIZE=8)
+        run = mocker.patch.object(
+            FakeNeo4jDriver, 'run', create=True,
+            side_effect=lambda query, params: (
+                fake_run_returns_ids(query, params)
+                if 'RETURN id(n)' in query else [dict(params)]
             )
+        )
+        yield graph, run
+        graph.close()
+
+    def test_disabled_by_default(self, neo4j_graph):
+        assert neo4j_graph.result_cache.maxsize == 0
+
+    def test_hit(self, cached_graph):
+        graph, run = cached_graph
+        query = graphic.node('Geek', uid=1)._as('g').query
+
+        first = graph.fetch(query)
+        second = graph.fetch(query)
+        other = graph.fetch(graphic.node('Geek', uid=2)._as('g').query)
+
+        assert run.call_count == 2
+        assert list(first.records) == list(second.records)
+        assert list(other.records) == [{'p0': 2}]
+
+        info = graph.result_cache.info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    def test_push_invalidate(self, cached_graph):
+        graph, run = cached_graph
+        geeks = graphic.node('Geek', uid=1)._as('g').query
+        companies = graphic.node('Company', cid=1)._as('c').query
+        graph.fetch(geeks)
+        graph.fetch(companies)
+
+        graph.push(graphic.node('Geek', uid=2)._as('g'))
+        assert graph.result_cache.info().invalidations == 1
+
+        graph.fetch(geeks)
+        graph.fetch(companies)
+        assert run.call_count == 4
+
+    def test_unlabeled_query_invalidated_by_any_push(self, cached_graph):
+        graph, run = cached_graph
+        graph.fetch(graphic.node(uid=1)._as('n').query)
+
+        graph.push(graphic.node('Company', cid=1)._as('c'))
+        assert len(graph.result_cache) == 0
+
+    def test_fetch_many_cached(self, cached_graph):
+        graph, run = cached_graph
+        query = graphic.node('Geek', uid=1)._as('g').query
+
+        graph.fetch_many([query, query])
+        graph.fetch_many([query])
+
+        assert graph.result_cache.info().hits >= 1
+        assert run.call_count <= 2
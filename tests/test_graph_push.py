@@ -1,10 +1,16 @@
 #!/usr/bin/env python
 # -*- encoding: utf-8 -*-
 
+import gc
+
+import pytest
+
 import graphic
 
-from graphic.query.cypher.compiler import build as build_create_cypher
-from .fixtures import FakeNeo4jDriver
+from graphic.engine import NodeIds
+from graphic.query.cypher.compiler import build_node_batch
+from graphic.query.cypher.compiler import build_relationship_batch
+from .fixtures import FakeNeo4jDriver, fake_run_returns_ids
 
 
 class TestNeo4jPush:
@@ -18,13 +24,32 @@ class TestNeo4jPush:
         nodes = [
             graphic.node('Boss')._as('chuter'),
             graphic.node('Boss', uid=1234)._as('saras'),
-            graphic.node('Boss', uid=1234, name="robert")._as('robert')
+            graphic.node('Boss', 'Geek', uid=1234, name="robert")._as('robert')
         ]
-        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True):
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
             neo4j_graph.push(*nodes)
-            neo4j_graph._driver.run.assert_called_once_with(
-                build_create_cypher(nodes)
-            )
+            calls = neo4j_graph._driver.run.call_args_list
+
+        assert len(calls) == 2
+        assert calls[0][0] == build_node_batch(('Boss', ), nodes[:2])
+        assert calls[1][0] == build_node_batch(('Boss', 'Geek'), nodes[2:])
+        assert calls[1][0][1] == {
+            'rows': [{'uid': 1234, 'name': 'robert'}]
+        }
+
+    def test_unaliased_nodes_push(self, mocker, neo4j_graph):
+        nodes = [graphic.node('Geek', uid=uid) for uid in range(10)]
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            neo4j_graph.push(*nodes)
+            calls = neo4j_graph._driver.run.call_args_list
+
+        assert len(calls) == 1
+        assert calls[0][0][1] == {
+            'rows': [{'uid': uid} for uid in range(10)]
+        }
 
     def test_nodes_and_relationships_push(self, mocker, neo4j_graph):
         chuter = graphic.node('Boss')._as('chuter')
@@ -41,8 +66,262 @@ class TestNeo4jPush:
             )._as('cr')
         ]
 
-        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True):
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
             neo4j_graph.push(chuter, *relation_ships)
-            neo4j_graph._driver.run.assert_called_once_with(
-                build_create_cypher([chuter, saras, robert], relation_ships)
+            calls = neo4j_graph._driver.run.call_args_list
+
+        assert len(calls) == 3
+        assert calls[0][0] == build_node_batch(('Boss', ), [chuter, saras])
+        assert calls[1][0] == build_node_batch(('Geak', ), [robert])
+
+        query, params = calls[2][0]
+        assert query == build_relationship_batch('TALKTO', [], {})[0]
+        assert params == {'rows': [
+            {'from': 0, 'to': 1, 'props': {}},
+            {'from': 0, 'to': 0, 'props': {'timestamp': 1234660}},
+        ]}
+
+    def test_relationships_between_existing_nodes_push(self, mocker,
+                                                       neo4j_graph):
+        chuter = graphic.node('Boss', id=10)
+        saras = graphic.node('Boss', id=20)
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            neo4j_graph.push(
+                graphic.relationship(chuter, saras, type='TALKTO')
+            )
+            calls = neo4j_graph._driver.run.call_args_list
+
+        assert len(calls) == 1
+        assert calls[0][0][1] == {'rows': [
+            {'from': 10, 'to': 20, 'props': {}}
+        ]}
+
+
+class TestNeo4jBatchPush:
+
+    def _entities(self):
+        geeks = [
+            graphic.node('Geek', uid=uid)._as('g{}'.format(uid))
+            for uid in range(5)
+        ]
+        boss = graphic.node('Boss', uid=100)._as('boss')
+        relationships = [
+            graphic.relationship(boss, geek, type='HIRE') for geek in geeks
+        ]
+        return geeks, boss, relationships
+
+    def test_batch_size_chunks(self, mocker, neo4j_graph):
+        geeks, boss, relationships = self._entities()
+        spy = mocker.spy(FakeNeo4jDriver, 'begin_transaction')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            result = neo4j_graph.push(*relationships, batch_size=2)
+            calls = neo4j_graph._driver.run.call_args_list
+
+        assert [(b.kind, b.key, b.count) for b in result.batches] == [
+            ('node', ('Boss', ), 1),
+            ('node', ('Geek', ), 2),
+            ('node', ('Geek', ), 2),
+            ('node', ('Geek', ), 1),
+            ('relationship', 'HIRE', 2),
+            ('relationship', 'HIRE', 2),
+            ('relationship', 'HIRE', 1),
+        ]
+        assert result.count == 11
+        assert all(batch.seconds >= 0 for batch in result.batches)
+        assert spy.call_count == 7
+
+        # the relationships refer to the ids of the committed node batches
+        rows = [row for call in calls[4:] for row in call[0][1]['rows']]
+        assert [(row['from'], row['to']) for row in rows] == [
+            (0, 0), (0, 1), (0, 0), (0, 1), (0, 0)
+        ]
+
+    def test_default_one_transaction(self, mocker, neo4j_graph):
+        _, _, relationships = self._entities()
+        spy = mocker.spy(FakeNeo4jDriver, 'begin_transaction')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            result = neo4j_graph.push(*relationships)
+
+        assert spy.call_count == 1
+        assert [(b.kind, b.count) for b in result.batches] == [
+            ('node', 1), ('node', 5), ('relationship', 5),
+        ]
+
+    def test_on_batch_callback(self, mocker, neo4j_graph):
+        geeks, _, _ = self._entities()
+        reported = []
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            result = neo4j_graph.push(
+                *geeks,
+                batch_size=3,
+                on_batch=reported.append
+            )
+
+        assert tuple(reported) == result.batches
+
+    def test_invalid_batch_size(self, neo4j_graph):
+        with pytest.raises(ValueError):
+            neo4j_graph.push(graphic.node('Geek'), batch_size=0)
+
+
+class TestNeo4jStreamPush:
+
+    def test_push_generator(self, mocker, neo4j_graph):
+        consumed = []
+
+        def entities():
+            boss = graphic.node('Boss', uid=0)._as('boss')
+            for uid in range(1, 4):
+                geek = graphic.node('Geek', uid=uid)._as('g{}'.format(uid))
+                consumed.append(uid)
+                yield geek
+                yield graphic.relationship(boss, geek, type='HIRE')
+
+        flushed_at = []
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            result = neo4j_graph.push_stream(
+                entities(),
+                batch_size=2,
+                on_batch=lambda batch: flushed_at.append(len(consumed))
             )
+            calls = neo4j_graph._driver.run.call_args_list
+
+        # a batch is written as soon as it is full, before reading on
+        assert flushed_at == [1, 1, 1, 2, 2, 3, 3]
+        assert [(b.kind, b.key, b.count) for b in result.batches] == [
+            ('node', ('Geek', ), 1),
+            ('node', ('Boss', ), 1),
+            ('relationship', 'HIRE', 1),
+            ('node', ('Geek', ), 1),
+            ('relationship', 'HIRE', 1),
+            ('node', ('Geek', ), 1),
+            ('relationship', 'HIRE', 1),
+        ]
+
+        # boss is only created once, and referred by its id after
+        rel_rows = [
+            call[0][1]['rows'][0] for call in calls
+            if 'CREATE (a)-[r:HIRE]->(b)' in call[0][0]
+        ]
+        assert [row['from'] for row in rel_rows] == [0, 0, 0]
+
+    def test_push_unaliased_nodes(self, mocker, neo4j_graph):
+        boss = graphic.node('Boss')
+
+        def entities():
+            yield boss
+            for uid in range(10):
+                geek = graphic.node('Geek', uid=uid)
+                yield geek
+                yield graphic.relationship(boss, geek, type='HIRE')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            result = neo4j_graph.push_stream(entities(), batch_size=3)
+            calls = neo4j_graph._driver.run.call_args_list
+
+        rows = [
+            row for call in calls if 'CREATE (n:Geek)' in call[0][0]
+            for row in call[0][1]['rows']
+        ]
+        assert rows == [{'uid': uid} for uid in range(10)]
+        assert result.count == 21
+
+    def test_node_ids_dropped(self):
+        node_ids = NodeIds()
+        geeks = [graphic.node('Geek', uid=uid) for uid in range(3)]
+        node_ids.update(zip(geeks, range(3)))
+
+        assert len(node_ids) == 3
+        assert [node_ids[geek] for geek in geeks] == [0, 1, 2]
+        assert graphic.node('Geek', uid=0) not in node_ids
+
+        del geeks[1:]
+        gc.collect()
+        assert len(node_ids) == 1
+
+    def test_push_empty_iterable(self, neo4j_graph):
+        result = neo4j_graph.push_stream(iter([]))
+        assert result.batches == ()
+
+    def test_invalid_batch_size(self, neo4j_graph):
+        with pytest.raises(ValueError):
+            neo4j_graph.push_stream([graphic.node('Geek')], batch_size=0)
+
+
+class TestNeo4jMergePush:
+
+    def test_merge_keys_config(self):
+        neo4j_graph = graphic.use_neo4j(
+            MERGE_KEYS={'Geek': 'uid', 'Company': ('cid', 'region')}
+        )
+        assert neo4j_graph.merge_keys == {
+            'Geek': ('uid', ),
+            'Company': ('cid', 'region'),
+        }
+
+    def test_merge_on_without_keys(self, neo4j_graph):
+        with pytest.raises(ValueError):
+            neo4j_graph.merge_on('Geek')
+
+    def test_merge_declared_labels(self, mocker, neo4j_graph):
+        neo4j_graph.merge_on('Geek', 'uid').merge_on('Company', 'cid')
+
+        chuter = graphic.node('Geek', uid=1)._as('chuter')
+        boss = graphic.node('Company', cid=1)._as('boss')
+        tmp = graphic.node('Temp')._as('tmp')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            neo4j_graph.push(
+                graphic.relationship(chuter, boss, type='WORKAT'),
+                graphic.relationship(chuter, tmp, type='WORKAT'),
+            )
+            queries = [
+                call[0][0] for call in neo4j_graph._driver.run.call_args_list
+            ]
+
+        assert queries[0].startswith(
+            'UNWIND $rows AS row MERGE (n:Geek {uid: row.uid})'
+        )
+        assert queries[1].startswith(
+            'UNWIND $rows AS row MERGE (n:Company {cid: row.cid})'
+        )
+        assert queries[2].startswith('UNWIND $rows AS row CREATE (n:Temp)')
+        assert queries[3].endswith(
+            'CREATE (a)-[r:WORKAT]->(b) SET r = row.props'
+        )
+        assert queries[4].endswith(
+            'MERGE (a)-[r:WORKAT]->(b) SET r += row.props'
+        )
+
+    def test_merge_with_saved_endpoints(self, mocker, neo4j_graph):
+        neo4j_graph.merge_on('Geek', 'uid')
+
+        saved = graphic.node('Company', id=7)
+        geeks = [graphic.node('Geek', uid=uid) for uid in (1, 2)]
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=fake_run_returns_ids):
+            neo4j_graph.push(*[
+                graphic.relationship(geek, saved, type='WORKAT')
+                for geek in geeks
+            ])
+            calls = neo4j_graph._driver.run.call_args_list
+
+        assert calls[0][0][1] == {'rows': [{'uid': 1}, {'uid': 2}]}
+        assert calls[1][0][0].endswith(
+            'MERGE (a)-[r:WORKAT]->(b) SET r += row.props'
+        )
+        assert [(row['from'], row['to']) for row in calls[1][0][1]['rows']] \
+            == [(0, 7), (1, 7)]
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+import graphic
+from graphic.engine.sqlite import SqliteGraph
+from graphic.engine.sqlite.schema import encode_params
+from graphic.query import Q, Param
+from graphic.query.func import avg, count, max, sum
+
+
+@pytest.fixture
+def sqlite_graph():
+    graph = graphic.use_sqlite(MERGE_KEYS={'Company': 'cid'})
+
+    acme = graphic.node('Company', cid=1, name='acme')._as('acme')
+    geeks = [
+        graphic.node('Geek', uid=1, name='chuter', age=32)._as('g1'),
+        graphic.node('Geek', uid=2, name='bob', age=25)._as('g2'),
+        graphic.node('Geek', 'Boss', uid=3, name='alice', age=40)._as('g3'),
+        graphic.node('Geek', uid=4, name='carl')._as('g4'),
+    ]
+    graph.push(
+        *[graphic.relationship(geek, acme, 'WORK_AT', since=2000 + i)
+          for i, geek in enumerate(geeks[:3])],
+        graphic.relationship(geeks[0], geeks[1], 'KNOWS'),
+        geeks[3]
+    )
+    yield graph
+    graph.close()
+
+
+def uids(result, alias='g'):
+    return sorted(record[alias]['uid'] for record in result.records)
+
+
+def geeks():
+    return graphic.node('Geek')._as('g').query
+
+
+class TestSqliteGraph:
+
+    def test_engine(self, sqlite_graph):
+        assert isinstance(sqlite_graph, SqliteGraph)
+
+    def test_fetch_by_label(self, sqlite_graph):
+        assert uids(sqlite_graph.fetch(geeks())) == [1, 2, 3, 4]
+
+        bosses = graphic.node('Geek', 'Boss')._as('g').query
+        assert uids(sqlite_graph.fetch(bosses)) == [3]
+
+    def test_result_graph(self, sqlite_graph):
+        graph = sqlite_graph.fetch(geeks().filter(g__uid=1)).graph
+
+        node = next(iter(graph.nodes))
+        assert node.is_node()
+        assert node.labels == frozenset(['Geek'])
+        assert node['name'] == 'chuter'
+        assert node.id is not None
+
+    @pytest.mark.parametrize('filters, expected', [
+        ({'g__uid': 2}, [2]),
+        ({'g__uid__neq': 2}, [1, 3, 4]),
+        ({'g__age__gt': 32}, [3]),
+        ({'g__age__gte': 32}, [1, 3]),
+        ({'g__age__lt': 32}, [2]),
+        ({'g__age__lte': 32}, [1, 2]),
+        ({'g__uid__in': [1, 3, 5]}, [1, 3]),
+        ({'g__name__startswith': 'ch'}, [1]),
+        ({'g__name__endswith': 'b'}, [2]),
+        ({'g__name__contains': 'li'}, [3]),
+        ({'g__age__gt': '30'}, []),
+        ({'g__age__gte': 25, 'g__name__startswith': 'b'}, [2]),
+    ])
+    def test_filter(self, sqlite_graph, filters, expected):
+        query = geeks().filter(**filters)
+        assert uids(sqlite_graph.fetch(query)) == expected
+
+    def test_filter_by_id(self, sqlite_graph):
+        node = next(iter(
+            sqlite_graph.fetch(geeks().filter(g__uid=3)).graph.nodes
+        ))
+        result = sqlite_graph.fetch(geeks().filter(g__id=node.id))
+        assert uids(result) == [3]
+
+    def test_null_semantics(self, sqlite_graph):
+        # carl has no age, compare with null is never true
+        assert uids(sqlite_graph.fetch(geeks().filter(g__age__neq=1))) == \
+            [1, 2, 3]
+        assert uids(sqlite_graph.fetch(geeks().filter(~Q(g__age=25)))) == \
+            [1, 3]
+
+    def test_or(self, sqlite_graph):
+        query = geeks().filter(Q(g__uid=1) | Q(g__age__gte=40))
+        assert uids(sqlite_graph.fetch(query)) == [1, 3]
+
+    def test_relationship_pattern(self, sqlite_graph):
+        query = graphic.relationship(
+            graphic.node('Geek')._as('g'),
+            graphic.node('Company')._as('c'),
+            'WORK_AT'
+        )._as('w').query.filter(w__since__gte=2001)
+
+        result = sqlite_graph.fetch(query)
+        assert sorted(r['w']['since'] for r in result.records) == \
+            [2001, 2002]
+
+        rel = next(iter(result.graph.relationships))
+        assert rel.type == 'WORK_AT'
+        assert rel.node_to['name'] == 'acme'
+
+    def test_direction(self, sqlite_graph):
+        def knows(with_direction):
+            return graphic.relationship(
+                graphic.node('Geek')._as('a'),
+                graphic.node('Geek')._as('b'),
+                'KNOWS',
+                with_direction=with_direction
+            )._as('k').query.select('a__uid', 'b__uid')
+
+        directed = sqlite_graph.fetch(knows(True))
+        assert [(r['a.uid'], r['b.uid']) for r in directed.records] == \
+            [(1, 2)]
+
+        undirected = sqlite_graph.fetch(knows(False))
+        assert sorted(
+            (r['a.uid'], r['b.uid']) for r in undirected.records
+        ) == [(1, 2), (2, 1)]
+
+    def test_select_and_aggregation(self, sqlite_graph):
+        result = sqlite_graph.fetch(geeks().select('g__uid', 'g__age'))
+        assert sorted(r['g.uid'] for r in result.records) == [1, 2, 3, 4]
+
+        result = sqlite_graph.fetch(
+            geeks().select(avg('g__age'), count('g__age'), max('g__age'),
+                           sum('g__uid'))
+        )
+        assert list(result.records) == [{
+            'avg(g.age)': (32 + 25 + 40) / 3,
+            'count(g.age)': 3,
+            'max(g.age)': 40,
+            'sum(g.uid)': 10,
+        }]
+
+    def test_group_by(self, sqlite_graph):
+        query = graphic.relationship(
+            graphic.node('Geek')._as('g'),
+            graphic.node('Company')._as('c'),
+            'WORK_AT'
+        )._as('w').query.select('c__name', count('g__uid'))
+
+        assert list(sqlite_graph.fetch(query).records) == [
+            {'c.name': 'acme', 'count(g.uid)': 3}
+        ]
+
+    def test_order_and_limit(self, sqlite_graph):
+        query = geeks().select('g__uid').order_by('g__age')
+        assert [r['g.uid'] for r in sqlite_graph.fetch(query).records] == \
+            [2, 1, 3, 4]
+
+        query = geeks().select('g__uid').order_by('-g__age').limit(2)
+        assert [r['g.uid'] for r in sqlite_graph.fetch(query).records] == \
+            [4, 3]
+
+    def test_prepared_query(self, sqlite_graph):
+        prepared = geeks().filter(g__age__gte=Param('age')).prepare()
+
+        assert uids(sqlite_graph.fetch(prepared.bind(age=32))) == [1, 3]
+        assert uids(sqlite_graph.fetch(prepared.bind(age=40))) == [3]
+
+    def test_merge(self, sqlite_graph):
+        sqlite_graph.push(graphic.node('Company', cid=1, size=10)._as('c'))
+
+        result = sqlite_graph.fetch(
+            graphic.node('Company')._as('c').query.select('c__name',
+                                                          'c__size')
+        )
+        assert list(result.records) == [{'c.name': 'acme', 'c.size': 10}]
+
+    def test_merge_keys_missing(self, sqlite_graph):
+        with pytest.raises(ValueError):
+            sqlite_graph.push(
+                graphic.node('Geek', uid=5)._as('g'),
+                graphic.node('Company', name='nokey')._as('c')
+            )
+
+        assert uids(sqlite_graph.fetch(geeks())) == [1, 2, 3, 4]
+
+    def test_push_with_node_id(self, sqlite_graph):
+        carl = next(iter(
+            sqlite_graph.fetch(geeks().filter(g__uid=4)).graph.nodes
+        ))
+        sqlite_graph.push(graphic.relationship(
+            graphic.node('Geek', id=carl.id),
+            graphic.node('Company', cid=2)._as('c'),
+            'WORK_AT'
+        ))
+
+        query = graphic.relationship(
+            graphic.node('Geek')._as('g'),
+            graphic.node('Company')._as('c'),
+            'WORK_AT'
+        )._as('w').query.filter(c__cid=2).select('g__uid')
+        assert list(sqlite_graph.fetch(query).records) == [{'g.uid': 4}]
+
+        with pytest.raises(KeyError):
+            sqlite_graph.push(graphic.node('Geek', id=1000))
+
+    def test_push_stream(self):
+        graph = graphic.use_sqlite()
+        entities = (
+            graphic.node('Geek', uid=uid)._as('g{}'.format(uid))
+            for uid in range(10)
+        )
+        result = graph.push_stream(entities, batch_size=3)
+
+        assert result.count == 10
+        assert len(list(graph.fetch(geeks().limit(100)).records)) == 10
+
+    def test_push_unaliased_nodes(self):
+        graph = graphic.use_sqlite()
+        boss = graphic.node('Boss')
+        graph.push(*[graphic.node('Geek', uid=uid) for uid in range(3)])
+        result = graph.push_stream(
+            (graphic.relationship(boss, graphic.node('Geek', uid=uid), 'HIRE')
+             for uid in range(3, 6)),
+            batch_size=2
+        )
+
+        assert result.count == 7
+        assert uids(graph.fetch(geeks())) == [0, 1, 2, 3, 4, 5]
+        assert len(list(graph.fetch(
+            graphic.node('Boss')._as('b').query
+        ).records)) == 1
+
+    def test_fetch_many_and_stream(self, sqlite_graph):
+        results = sqlite_graph.fetch_many([
+            geeks().filter(g__uid=1),
+            geeks().filter(x__uid=1),
+        ])
+        assert uids(results[0]) == [1]
+        assert isinstance(results[1].error, KeyError)
+
+        with sqlite_graph.fetch(geeks(), stream=True) as records:
+            assert len(list(records)) == 4
+
+    def test_persisted(self, tmpdir):
+        path = str(tmpdir.join('graph.db'))
+        graph = graphic.use_sqlite(PATH=path)
+        graph.push(graphic.node('Geek', uid=1)._as('g'))
+        graph.close()
+
+        graph = graphic.use_sqlite(PATH=path)
+        assert uids(graph.fetch(geeks())) == [1]
+        graph.close()
+
+    def test_value_kinds(self):
+        graph = graphic.use_sqlite()
+        graph.push(
+            graphic.node('Geek', uid=1, flag=True, tags=['a', 'b'])._as('a'),
+            graphic.node('Geek', uid=2, flag=1, tags='a')._as('b'),
+            graphic.node('Geek', uid=3, flag='1')._as('c'),
+        )
+
+        assert uids(graph.fetch(geeks().filter(g__flag=True))) == [1]
+        assert uids(graph.fetch(geeks().filter(g__flag=1))) == [2]
+        assert uids(graph.fetch(geeks().filter(g__tags=['a', 'b']))) == [1]
+        assert uids(graph.fetch(geeks().filter(g__flag__in=[1, '1']))) == \
+            [2, 3]
+        # compare between different kinds is null, so is its negation
+        assert uids(graph.fetch(geeks().filter(~Q(g__flag__gt='0')))) == []
+
+        record = next(iter(graph.fetch(geeks().filter(g__uid=1)).records))
+        assert record['g']['flag'] is True
+        assert record['g']['tags'] == ['a', 'b']
+
+    def test_property_index_used(self, sqlite_graph):
+        statement, params = sqlite_graph.compile(
+            geeks().filter(g__uid=2, g__age__gt=20)
+        )
+        plan = sqlite_graph._connection.execute(
+            'EXPLAIN QUERY PLAN ' + statement.sql,
+            encode_params(params, statement.list_params)
+        ).fetchall()
+
+        assert any('node_properties_key_value' in row[-1] for row in plan)
+
+    def test_set_null_remove_property(self, sqlite_graph):
+        sqlite_graph.push(graphic.node('Company', cid=1, name=None)._as('c'))
+
+        result = sqlite_graph.fetch(
+            graphic.node('Company')._as('c').query.select('c__cid',
+                                                          'c__name')
+        )
+        assert list(result.records) == [{'c.cid': 1, 'c.name': None}]
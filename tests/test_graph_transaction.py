@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+import graphic
+
+from .fixtures import FakeNeo4jDriver, fake_run_returns_ids
+
+
+class FakeRecord(dict):
+
+    def values(self):
+        return list(super().values())
+
+
+def lazy_run(query, params=None):
+    """Fake `run` return lazy records, like the pipelined driver results"""
+    if 'RETURN id(n)' in query:
+        return fake_run_returns_ids(query, params)
+
+    return (FakeRecord(value=value) for value in params.values())
+
+
+class TestNeo4jTransaction:
+
+    def test_one_session_one_commit(self, mocker, neo4j_graph):
+        session = mocker.spy(FakeNeo4jDriver, 'session')
+        begin = mocker.spy(FakeNeo4jDriver, 'begin_transaction')
+        commit = mocker.spy(FakeNeo4jDriver, 'commit')
+        rollback = mocker.spy(FakeNeo4jDriver, 'rollback')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=lazy_run):
+            with neo4j_graph.transaction() as tx:
+                pushed = tx.push(graphic.node('Geek', uid=1)._as('g'))
+                geeks = tx.fetch(graphic.node('Geek', uid=1).query)
+                bosses = tx.fetch(graphic.node('Boss', uid=2).query)
+
+                assert commit.call_count == 0
+
+        assert session.call_count == 1
+        assert begin.call_count == 1
+        assert commit.call_count == 1
+        assert rollback.call_count == 0
+        assert tx.closed
+
+        assert pushed.count == 1
+        assert [r['value'] for r in geeks.records] == [1]
+        assert [r['value'] for r in bosses.records] == [2]
+
+    def test_rollback_on_error(self, mocker, neo4j_graph):
+        commit = mocker.spy(FakeNeo4jDriver, 'commit')
+        rollback = mocker.spy(FakeNeo4jDriver, 'rollback')
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 side_effect=lazy_run):
+            with pytest.raises(ValueError):
+                with neo4j_graph.transaction() as tx:
+                    tx.fetch(graphic.node('Geek', uid=1).query)
+                    raise ValueError
+
+        assert commit.call_count == 0
+        assert rollback.call_count == 1
+
+    def test_closed_transaction(self, mocker, neo4j_graph):
+        tx = neo4j_graph.transaction()
+        tx.rollback()
+
+        with pytest.raises(RuntimeError):
+            tx.fetch(graphic.node('Geek').query)
+
+        with pytest.raises(RuntimeError):
+            tx.commit()
+
+    def test_empty_fetch(self, neo4j_graph):
+        with neo4j_graph.transaction() as tx:
+            result = tx.fetch(graphic.node().query.limit(0))
+
+        assert result.graph.is_empty()
+
+
+class TestSqliteTransaction:
+
+    def test_commit(self):
+        graph = graphic.use_sqlite()
+        query = graphic.node('Geek')._as('g').query
+
+        with graph.transaction() as tx:
+            pushed = tx.push(graphic.node('Geek', uid=1)._as('g'))
+            assert len(list(tx.fetch(query).records)) == 1
+
+        assert tx.closed
+        assert pushed.count == 1
+        assert len(list(graph.fetch(query).records)) == 1
+
+        with pytest.raises(RuntimeError):
+            tx.push(graphic.node('Geek', uid=2)._as('g'))
+
+    def test_rollback_on_error(self):
+        graph = graphic.use_sqlite(MERGE_KEYS={'Geek': 'uid'})
+
+        with pytest.raises(ValueError):
+            with graph.transaction() as tx:
+                tx.push(graphic.node('Geek', uid=1)._as('g'))
+                tx.push(graphic.node('Geek', name='nokey')._as('g'))
+
+        assert tx.closed
+        assert list(graph.fetch(graphic.node('Geek')._as('g').query)
+                    .records) == []
+
+        # the graph is unlocked
+        graph.push(graphic.node('Geek', uid=1)._as('g'))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+from graphic.engine import Result
+from graphic.engine.hydrator import Hydrator, Record
+
+
+class BoltNode(dict):
+
+    def __init__(self, identity, *labels, **properties):
+        super().__init__(**properties)
+        self.id = identity
+        self.labels = frozenset(labels)
+
+
+class BoltRelationship(dict):
+
+    def __init__(self, identity, start_node, end_node, type, **properties):
+        super().__init__(**properties)
+        self.id = identity
+        self.start_node = start_node
+        self.end_node = end_node
+        self.type = type
+
+
+class BoltPath:
+
+    def __init__(self, *relationships):
+        self.relationships = relationships
+        self.start_node = relationships[0].start_node
+        self.nodes = [relationships[0].start_node]
+        self.nodes.extend(rel.end_node for rel in relationships)
+
+
+class BoltGraph:
+
+    def __init__(self, nodes, relationships):
+        self.nodes = nodes
+        self.relationships = relationships
+
+
+class FakeProxy:
+
+    def __init__(self, records, graph=None):
+        self._records = records
+        self._graph = graph
+
+    def records(self):
+        return iter(self._records)
+
+    def graph(self):
+        return self._graph
+
+
+class TestHydrator:
+
+    def test_node(self):
+        node = Hydrator().hydrate(BoltNode(1, 'Geek', name='chuter', id=7))
+
+        assert node.is_node()
+        assert node.id == 1
+        assert node.labels == frozenset(['Geek'])
+        assert node['name'] == 'chuter'
+        assert node['id'] == 7
+
+    def test_dedup_by_id(self):
+        hydrator = Hydrator()
+        a = hydrator.hydrate(BoltNode(1, 'Geek'))
+        b = hydrator.hydrate(BoltNode(1, 'Geek'))
+
+        assert a is b
+        assert a is not hydrator.hydrate(BoltNode(2, 'Geek'))
+
+    def test_relationship_share_nodes(self):
+        hydrator = Hydrator()
+        geek, boss = BoltNode(1, 'Geek'), BoltNode(2, 'Boss')
+        rel = hydrator.hydrate(
+            BoltRelationship(10, geek, boss, 'WORK_FOR', since=2018)
+        )
+
+        assert rel.is_edge()
+        assert rel.id == 10
+        assert rel.type == 'WORK_FOR'
+        assert rel['since'] == 2018
+        assert rel.node_from is hydrator.hydrate(geek)
+        assert rel.node_to is hydrator.hydrate(boss)
+
+    def test_path_and_collections(self):
+        geek, boss, ceo = BoltNode(1), BoltNode(2), BoltNode(3)
+        path = BoltPath(
+            BoltRelationship(10, geek, boss, 'WORK_FOR'),
+            BoltRelationship(11, boss, ceo, 'WORK_FOR')
+        )
+        hydrated = Hydrator().hydrate({'path': path, 'ids': [1, 2]})
+
+        assert hydrated['ids'] == [1, 2]
+        assert len(hydrated['path'].nodes) == 3
+        assert len(hydrated['path'].relationships) == 2
+
+
+class TestRecord:
+
+    def test_lazy(self):
+        hydrator = Hydrator()
+        record = Record({'geek': BoltNode(1), 'age': 30}, hydrator)
+
+        assert record['age'] == 30
+        assert len(hydrator._nodes) == 0
+
+        assert record['geek'] is record['geek']
+        assert len(hydrator._nodes) == 1
+        assert list(record) == ['geek', 'age']
+
+
+class TestResult:
+
+    def test_graph_and_records_share_entities(self):
+        geek, boss = BoltNode(1, 'Geek'), BoltNode(2, 'Boss')
+        rel = BoltRelationship(10, geek, boss, 'WORK_FOR')
+        result = Result(FakeProxy(
+            [{'g': geek}, {'g': geek}],
+            BoltGraph([geek, boss], [rel])
+        ))
+
+        records = list(result.records)
+        assert records[0]['g'] is records[1]['g']
+
+        graph = result.graph
+        assert len(graph.nodes) == 2
+        assert len(graph.relationships) == 1
+        assert records[0]['g'] in graph.nodes
+        assert next(iter(graph.relationships)).node_from is records[0]['g']
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+import graphic
+from graphic.query.cypher.compiler import compile
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def graph(request):
+    if request.param == 'memory':
+        graph = graphic.use_memory()
+    else:
+        graph = graphic.use_sqlite()
+    graph.push(*[
+        graphic.node('Geek', uid=uid, age=20 + uid % 3)._as('g%d' % uid)
+        for uid in range(10)
+    ])
+    yield graph
+    graph.close()
+
+
+def geeks():
+    return graphic.node('Geek')._as('g').query
+
+
+class TestOrderBy:
+
+    def test_order_by_keys(self):
+        query = geeks().order_by('-g__age', 'g__uid')
+
+        assert query.order_by() == ('-g__age', 'g__uid')
+        assert query.order_keys() == [('g__age', True), ('g__uid', False)]
+        assert compile(query) == \
+            'MATCH (g:Geek) RETURN g ORDER BY g.age DESC, g.uid ASC LIMIT 20'
+        assert geeks().order_by('g__uid').order_by() == 'g__uid'
+
+    def test_mixed_directions(self, graph):
+        query = geeks().select('g__uid').order_by('-g__age', 'g__uid')
+        records = graph.fetch(query.limit(4)).records
+
+        assert [r['g.uid'] for r in records] == [2, 5, 8, 1]
+
+
+class TestPagination:
+
+    def test_pages(self, graph):
+        pagination = geeks().paginate(by='g__uid', page_size=4)
+
+        pages = list(pagination.pages(graph))
+        assert [[r['g']['uid'] for r in page.records] for page in pages] == [
+            [0, 1, 2, 3], [4, 5, 6, 7], [8, 9]
+        ]
+        assert pagination.cursor == pages[-1].cursor
+
+    def test_page_query(self):
+        pagination = geeks().paginate(by=('-g__age', 'g__id'), page_size=2)
+        assert 'WHERE' not in compile(pagination.query())
+
+        pagination = geeks().paginate(
+            by=('-g__age', 'g__id'),
+            cursor=pagination.cursor_of({'g.age': 21, 'id(g)': 7})
+        )
+        assert compile(pagination.query()) == (
+            'MATCH (g:Geek) WHERE (g.age<21 OR (g.age=21 AND id(g)>7)) '
+            'RETURN g ORDER BY g.age DESC, id(g) ASC LIMIT 20'
+        )
+
+    def test_resume_compound_keys(self, graph):
+        by = ('-g__age', 'g__uid')
+        query = geeks().select('g__uid', 'g__age')
+
+        first = query.paginate(by=by, page_size=4).page(graph)
+        assert [r['g.uid'] for r in first.records] == [2, 5, 8, 1]
+
+        # resumed by the cursor, ie: in another process
+        resumed = query.paginate(by=by, page_size=4, cursor=first.cursor)
+        uids = [r['g.uid'] for page in resumed.pages(graph)
+                for r in page.records]
+        assert uids == [4, 7, 0, 3, 6, 9]
+
+        last = resumed.page(graph)
+        assert last.records == [] and last.cursor == resumed.cursor
+
+    def test_invalid(self):
+        pagination = geeks().paginate(by='g__uid')
+
+        with pytest.raises(ValueError):
+            geeks().paginate(by='g__uid', cursor='not a cursor')
+
+        with pytest.raises(ValueError):
+            geeks().paginate(
+                by='g__age', cursor=pagination.cursor_of({'g.uid': 1})
+            )
+
+        with pytest.raises(ValueError):
+            geeks().paginate(by='g__uid', page_size=-1)
+
+        with pytest.raises(KeyError):
+            pagination.cursor_of({'g.age': 1, 'g': {}})
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+from graphic.engine import Result
+
+from .test_hydrator import BoltNode, FakeProxy
+
+
+np = pytest.importorskip('numpy')
+
+
+def result_of(*records):
+    return Result(FakeProxy(list(records)))
+
+
+class TestToColumns:
+
+    def test_typed_columns(self):
+        columns = result_of(
+            {'uid': 1, 'age': 30.5, 'vip': True},
+            {'uid': 2, 'age': 20.0, 'vip': False},
+        ).to_columns()
+
+        assert list(columns) == ['uid', 'age', 'vip']
+        assert columns['uid'].dtype == np.int64
+        assert columns['age'].dtype == np.float64
+        assert columns['vip'].dtype == np.bool_
+        assert columns['uid'].tolist() == [1, 2]
+
+    def test_missing_values_masked(self):
+        columns = result_of({'age': 30}, {'age': None}, {'age': 20}) \
+            .to_columns()
+
+        age = columns['age']
+        assert isinstance(age, np.ma.MaskedArray)
+        assert age.dtype == np.int64
+        assert age.mask.tolist() == [False, True, False]
+        assert age.sum() == 50
+
+    def test_widen(self):
+        columns = result_of(
+            {'a': 1, 'b': 1}, {'a': 1.5, 'b': 'x'}
+        ).to_columns()
+
+        assert columns['a'].dtype == np.float64
+        assert columns['a'].tolist() == [1.0, 1.5]
+        assert columns['b'].dtype == np.object_
+        assert columns['b'].tolist() == [1, 'x']
+
+    def test_strings(self):
+        records = [{'name': 'chuter'}, {'name': None}, {'name': 'bob'}]
+
+        objects = result_of(*records).to_columns()['name']
+        assert objects.dtype == np.object_
+
+        fixed = result_of(*records).to_columns(strings='fixed')['name']
+        assert fixed.dtype == np.dtype('<U6')
+        assert fixed.mask.tolist() == [False, True, False]
+        assert fixed[2] == 'bob'
+
+    def test_grow_beyond_size_hint(self):
+        records = [{'uid': i} for i in range(10)]
+        uid = result_of(*records).to_columns(size_hint=3)['uid']
+
+        assert uid.tolist() == list(range(10))
+
+    def test_dtypes_and_select_columns(self):
+        columns = result_of({'uid': 1, 'age': 30}).to_columns(
+            columns=['age'], dtypes={'age': 'float32'}
+        )
+
+        assert list(columns) == ['age']
+        assert columns['age'].dtype == np.float32
+
+    def test_nodes_in_object_column(self):
+        geek = BoltNode(1, 'Geek')
+        column = result_of({'g': geek}, {'g': geek}).to_columns()['g']
+
+        assert column.dtype == np.object_
+        assert column[0] is column[1]
+        assert column[0].id == 1
+
+    def test_empty(self):
+        assert result_of().to_columns() == {}
+        assert len(result_of().to_columns(columns=['uid'])['uid']) == 0
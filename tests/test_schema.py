@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+import graphic
+from graphic.query import Q
+from graphic.schema import Index, SchemaCatalog, filtered_properties
+
+from .fixtures import FakeNeo4jDriver
+
+
+class TestSchemaCatalog:
+
+    def test_missing(self):
+        schema = SchemaCatalog()
+        schema.declare('Geek', 'uid')
+        schema.declare('Company', 'cid', 'name')
+        schema.observe([('Geek', 'name'), ('Geek', 'name'), ('Geek', 'age')])
+
+        assert schema.missing() == [
+            ('Company', ('cid', 'name')),
+            ('Geek', ('uid', )),
+            ('Geek', ('age', )),
+            ('Geek', ('name', )),
+        ]
+        assert schema.missing(min_count=2) == [
+            ('Company', ('cid', 'name')),
+            ('Geek', ('uid', )),
+            ('Geek', ('name', )),
+        ]
+
+        version = schema.version
+        schema.load([
+            Index('Geek', ('uid', ), True),
+            Index('Geek', ('name', 'age'), False),
+        ])
+        assert schema.version > version
+        assert schema.missing() == [
+            ('Company', ('cid', 'name')),
+            ('Geek', ('age', )),
+        ]
+        assert schema.index_for('Geek', 'uid').unique
+        assert schema.index_for('Geek', 'name') is None
+
+        with pytest.raises(ValueError):
+            schema.declare('Geek')
+
+    def test_filtered_properties(self):
+        geek = graphic.node('Geek', 'Person', uid=1)._as('g')
+        company = graphic.node('Company')._as('c')
+        query = graphic.relationship(geek, company, 'Work')._as('w').query
+        query.filter(Q(c__name__contains='x'), Q(g__age=1) | Q(g__age=2))
+        query.filter(w__since=2010, g__id=3)
+
+        assert list(filtered_properties(query.optimized())) == [
+            ('g', 'Geek', 'uid', True),
+            ('g', 'Person', 'uid', True),
+            ('c', 'Company', 'name', False),
+            # the OR is optimized to g.age IN [1, 2]
+            ('g', 'Geek', 'age', True),
+            ('g', 'Person', 'age', True),
+        ]
+
+
+class TestNeo4jSchema:
+
+    def test_observe_compiled(self, neo4j_graph):
+        neo4j_graph.compile(graphic.node('Geek', uid=1)._as('g').query)
+        neo4j_graph.compile(graphic.node('Geek', uid=2)._as('g').query)
+        neo4j_graph.compile(
+            graphic.node('Geek')._as('g').query.filter(g__uid__gt=1)
+        )
+
+        # counted per compiled query, the cached shapes as well
+        assert neo4j_graph.schema.observed == {('Geek', 'uid'): 3}
+        assert neo4j_graph.compile_cache.info().hits == 1
+
+    def test_observe_fetched(self, mocker, neo4j_graph):
+        query = graphic.node('Geek', uid=1)._as('g').query
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=[]):
+            for _ in range(3):
+                neo4j_graph.fetch(query)
+
+        assert neo4j_graph.schema.observed == {('Geek', 'uid'): 3}
+        assert neo4j_graph.schema.missing(min_count=3) == [
+            ('Geek', ('uid', ))
+        ]
+
+    def test_merge_keys_declared(self):
+        graph = graphic.use_neo4j(MERGE_KEYS={'Geek': 'uid'})
+        assert graph.schema.declared == frozenset([('Geek', ('uid', ))])
+
+    def test_ensure_indexes(self, mocker, neo4j_graph):
+        neo4j_graph.merge_on('Company', 'cid')
+        neo4j_graph.compile(graphic.node('Geek', uid=1)._as('g').query)
+
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=[]):
+            statements = neo4j_graph.ensure_indexes(dry_run=True)
+            assert statements == [
+                'CREATE INDEX IF NOT EXISTS FOR (n:Company) ON (n.cid)',
+                'CREATE INDEX IF NOT EXISTS FOR (n:Geek) ON (n.uid)',
+            ]
+            assert neo4j_graph._driver is None
+
+            assert neo4j_graph.ensure_indexes() == statements
+            assert [
+                call[0][0] for call in FakeNeo4jDriver.run.call_args_list
+            ] == statements
+
+        assert neo4j_graph.schema.missing() == []
+        assert neo4j_graph.ensure_indexes() == []
+
+    def test_refresh_schema(self, mocker, neo4j_graph):
+        records = [
+            {'labelsOrTypes': ['Geek'], 'properties': ['uid'],
+             'owningConstraint': 'geek_uid'},
+            {'labelsOrTypes': ['Geek'], 'properties': ['name', 'age'],
+             'owningConstraint': None},
+        ]
+        with mocker.patch.object(FakeNeo4jDriver, 'run', create=True,
+                                 return_value=records):
+            schema = neo4j_graph.refresh_schema()
+
+        assert schema.indexes == [
+            Index('Geek', ('name', 'age'), False),
+            Index('Geek', ('uid', ), True),
+        ]
+
+    def test_index_hints(self):
+        graph = graphic.use_neo4j(INDEX_HINTS=True)
+        query = graphic.node('Geek', uid=1)._as('g').query.filter(
+            Q(g__name='a') | Q(g__age=3)
+        )
+
+        cypher, _ = graph.compile(query)
+        assert 'USING INDEX' not in cypher
+
+        graph.schema.load([
+            Index('Geek', ('uid', ), True),
+            Index('Geek', ('age', ), False),
+        ])
+        cypher, params = graph.compile(query)
+        assert cypher == (
+            'MATCH (g:Geek) USING INDEX g:Geek(uid) '
+            'WHERE (g.uid=$p0 AND (g.name=$p1 OR g.age=$p2)) '
+            'RETURN g LIMIT 20'
+        )
+        assert params == {'p0': 1, 'p1': 'a', 'p2': 3}
+
+        # never hinted by default
+        neo4j_graph = graphic.use_neo4j()
+        neo4j_graph.schema.load([Index('Geek', ('uid', ), True)])
+        assert 'USING INDEX' not in neo4j_graph.compile(query)[0]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+import graphic
+from graphic.graph import GraphBuilder, SubGraph
+
+
+@pytest.fixture
+def subgraph():
+    a, b, c, d = [graphic.node('Geek', id=id) for id in range(4)]
+    rels = [
+        graphic.relationship(a, b, 'KNOWS', id=0),
+        graphic.relationship(a, c, 'KNOWS', id=1),
+        graphic.relationship(c, a, 'LIKES', id=2),
+        graphic.link(b, c, 'FRIEND', id=3),
+        graphic.relationship(c, c, 'LIKES', id=4),
+    ]
+    return SubGraph(nodes=[d], relationships=rels), (a, b, c, d), rels
+
+
+class TestSubGraphAdjacency:
+
+    def test_neighbors(self, subgraph):
+        graph, (a, b, c, d), _ = subgraph
+
+        assert graph.neighbors(a, SubGraph.OUT) == {b, c}
+        assert graph.neighbors(a, SubGraph.IN) == {c}
+        assert graph.neighbors(a) == {b, c}
+        # the link goes both ways
+        assert graph.neighbors(b, SubGraph.OUT) == {c}
+        assert graph.neighbors(c) == {a, b, c}
+        assert graph.neighbors(d) == frozenset()
+
+        with pytest.raises(ValueError):
+            graph.neighbors(a, 'up')
+
+    def test_degree(self, subgraph):
+        graph, (a, b, c, d), _ = subgraph
+
+        assert graph.degree(a) == 3
+        assert graph.degree(a, SubGraph.OUT) == 2
+        assert graph.degree(c, SubGraph.IN) == 3
+        assert graph.degree(c) == 5
+        assert graph.degree(d) == 0
+
+    def test_edges_between(self, subgraph):
+        graph, (a, b, c, d), rels = subgraph
+
+        assert graph.edges_between(a, c) == {rels[1], rels[2]}
+        assert graph.edges_between(a, c, SubGraph.OUT) == {rels[1]}
+        assert graph.edges_between(a, c, SubGraph.IN) == {rels[2]}
+        assert graph.edges_between(c, b, SubGraph.OUT) == {rels[3]}
+        assert graph.edges_between(a, d) == frozenset()
+
+    def test_relationships_of_type(self, subgraph):
+        graph, _, rels = subgraph
+
+        assert graph.relationships_of_type('LIKES') == {rels[2], rels[4]}
+        assert graph.relationships_of_type('HATES') == frozenset()
+
+    def test_built_once(self, subgraph):
+        graph, (a, _, _, _), _ = subgraph
+
+        graph.degree(a)
+        adjacency = graph._adjacency
+        graph.neighbors(a)
+        assert graph._adjacency is adjacency
+
+
+class TestGraphBuilder:
+
+    def test_add_and_freeze(self, subgraph):
+        graph, (a, b, c, d), rels = subgraph
+
+        builder = GraphBuilder().add(d, *rels)
+        assert builder.freeze() == graph
+        assert len(builder) == len(graph.nodes) + len(graph.relationships)
+
+        builder.add(graphic.node('Geek', id=9))
+        assert graphic.node(id=9) not in graph.nodes
+        assert graphic.node(id=9) in builder.freeze().nodes
+
+    def test_update(self, subgraph):
+        graph, (a, b, c, d), rels = subgraph
+        pages = [
+            SubGraph(relationships=rels[:2]),
+            SubGraph(relationships=rels[1:], nodes=[d]),
+        ]
+
+        builder = GraphBuilder(pages[0]).update(pages[1])
+        assert builder.freeze() == pages[0] | pages[1] == graph
+
+        builder = GraphBuilder().update(rels, [d])
+        assert builder.freeze() == graph
+
+    def test_discard(self, subgraph):
+        graph, (a, b, c, d), rels = subgraph
+
+        builder = GraphBuilder(graph).discard(rels[0])
+        # the endpoints are kept
+        assert builder.freeze() == graph - SubGraph(relationships=rels[:1])
+
+        builder.discard(c)
+        assert builder.relationships == frozenset()
+        assert builder.nodes == {a, b, d}
+
+        builder.update(graph).discard(a)
+        assert builder.relationships == {rels[3], rels[4]}
+        assert builder.nodes == {b, c, d}
+
+    def test_freeze_is_immutable(self, subgraph):
+        graph, _, rels = subgraph
+
+        builder = GraphBuilder(graph)
+        frozen = builder.freeze()
+        builder.discard(*rels)
+
+        assert frozen == graph
+        assert len(builder.relationships) == 0
+
+    def test_freeze_not_copy(self, subgraph):
+        graph, (a, b, c, d), _ = subgraph
+
+        builder = GraphBuilder(graph)
+        nodes = builder._nodes
+        frozen = builder.freeze()
+        assert frozen.nodes is nodes
+        assert builder.freeze() is frozen
+
+        # copied on the next change only
+        builder.discard(a)
+        assert a in frozen.nodes
+        assert a not in builder.freeze().nodes
+        assert builder._nodes is not nodes